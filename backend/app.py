@@ -16,6 +16,7 @@ from codex_agent.repository_manager import clone_repository
 from codex_agent.kernel_agent import execute_terminal_command, ensure_container_running
 from codex_agent.codex_core_agent import complete_task
 from codex_agent.azure_queue import AzureQueueManager
+from web_agent import stream_hub
 from fastapi import Cookie
 from starlette.websockets import WebSocketState
 from contextlib import contextmanager
@@ -85,7 +86,7 @@ class CommandRequest(BaseModel):
     task: str
     repo_url: str
     project_name: Optional[str] = None
-    container_type: Optional[str] = "azure"  # "local" or "azure", defaults to "azure"
+    container_type: Optional[str] = "azure"  # "azure", "local" (docker exec), "http" or "subprocess"; see codex_agent.transports
 
 class AutoAgentRequest(BaseModel):
     git_url: str
@@ -111,6 +112,8 @@ class OrchestratorRequest(BaseModel):
     documentation: Optional[str] = None
     pullRequestMessage: Optional[str] = None
     pullRequestDescription: Optional[str] = None
+    pipeline: Optional[bool] = False  # also run the codex task on repo_info, starting on the first documentation
+    container_type: Optional[str] = "azure"  # sandbox for the pipelined codex task
 
 # Active tasks dictionary for browser automation
 active_tasks = {}
@@ -118,11 +121,9 @@ active_tasks = {}
 # Global dict to hold queues for streaming web agent outputs per session
 web_agent_stream_queues = {}
 
-# Remove the queue-based streaming and use direct WebSocket send for each session
-web_agent_websockets = {}  # session_id -> websocket
-
-# Add a global dict to store session parameters
-web_agent_session_params = {}  # session_id -> {user_task, user_name, cdp_url}
+# Add a global dict to store session parameters; each browser in a session is a sub-stream.
+# managed sessions (orchestrator) already run their agents, the WebSocket only subscribes.
+web_agent_session_params = {}  # session_id -> {"streams": {stream_id: {user_task, user_name, cdp_url, anchor_session_id}}, "managed": bool}
 
 # Global dict to store active codex agent WebSocket connections
 codex_websockets = {}  # connection_id -> websocket
@@ -156,16 +157,8 @@ async def broadcast_to_codex_websockets(message_type: str, data: dict):
             del codex_websockets[connection_id]
             print(f"[DEBUG] Cleaned up disconnected WebSocket {connection_id}")
 
-async def publish_web_agent_thought(session_id: str, message: str):
-    websocket = web_agent_websockets.get(session_id)
-    if websocket:
-        try:
-            if websocket.application_state == WebSocketState.CONNECTED:
-                await websocket.send_text(message)
-        except Exception as e:
-            # Remove disconnected websocket
-            if session_id in web_agent_websockets:
-                del web_agent_websockets[session_id]
+async def publish_web_agent_thought(session_id: str, message: str, stream_id: str = stream_hub.SESSION_STREAM):
+    await stream_hub.publish(session_id, stream_id, message)
 
 # Helper function to check container health
 def check_container_health():
@@ -188,6 +181,42 @@ async def clone_repository_endpoint(request: CloneRequest):
     return result
 
 # Execute Command Endpoint
+_sandbox_deploy_lock = asyncio.Lock()
+
+async def ensure_azure_sandbox() -> str:
+    """Return the Azure sandbox's storage connection string, deploying the sandbox on first use"""
+    global azure_connection_string
+    async with _sandbox_deploy_lock:
+        # Check if we already have a valid connection string from previous deployment
+        if azure_connection_string and len(azure_connection_string) > 50:
+            print(f"\n[INFO] ♻️  Reusing existing Azure storage account from ARM template...")
+            print(f"[DEBUG] Storage connection string: {azure_connection_string[:50]}...")
+            return azure_connection_string
+
+        print("\n[INFO] 🚀 Deploying fresh Azure sandbox (first time)...")
+        try:
+            from sandbox_image.deploy_sandbox import deploy_sandbox
+            # Deployment blocks for minutes; keep the event loop (and any research) running
+            deployment_result = await asyncio.to_thread(deploy_sandbox)
+        except Exception as e:
+            print(f"[ERROR] Error deploying Azure sandbox: {str(e)}")
+            raise RuntimeError(f"Error deploying Azure sandbox: {str(e)}")
+
+        if deployment_result.get("status") != "success":
+            print(f"[ERROR] Failed to deploy Azure sandbox: {deployment_result.get('message')}")
+            raise RuntimeError(f"Failed to deploy Azure sandbox: {deployment_result.get('message')}")
+
+        connection_string = deployment_result.get("storage_connection_string")
+        if not connection_string or len(connection_string) < 50:
+            print(f"[ERROR] Invalid connection string from deployment: '{connection_string}'")
+            raise RuntimeError(f"Invalid connection string from deployment: '{connection_string}'")
+
+        azure_connection_string = connection_string
+        print(f"[INFO] ✅ Azure sandbox deployed successfully")
+        print(f"[INFO] Deployment ID: {deployment_result.get('id')}")
+        print(f"[DEBUG] Storage connection string: {connection_string[:50]}...")
+        return connection_string
+
 @app.post("/execute")
 async def execute_command(request: CommandRequest):
     """
@@ -244,44 +273,13 @@ async def execute_command(request: CommandRequest):
         # For Azure container, deploy sandbox only if not already deployed
         connection_string = None
         if request.container_type == "azure":
-            # Check if we already have a valid connection string from previous deployment
-            if azure_connection_string and len(azure_connection_string) > 50:
-                print(f"\n[INFO] ♻️  Reusing existing Azure storage account from ARM template...")
-                print(f"[DEBUG] Storage connection string: {azure_connection_string[:50]}...")
-                connection_string = azure_connection_string
-            else:
-                print("\n[INFO] 🚀 Deploying fresh Azure sandbox (first time)...")
-                try:
-                    from sandbox_image.deploy_sandbox import deploy_sandbox
-                    deployment_result = deploy_sandbox()
-                    
-                    if deployment_result.get("status") == "success":
-                        connection_string = deployment_result.get("storage_connection_string")
-                        
-                        if not connection_string or len(connection_string) < 50:
-                            print(f"[ERROR] Invalid connection string from deployment: '{connection_string}'")
-                            return {
-                                "success": False,
-                                "message": f"Invalid connection string from deployment: '{connection_string}'"
-                            }
-                        
-                        azure_connection_string = connection_string
-                        print(f"[INFO] ✅ Azure sandbox deployed successfully")
-                        print(f"[INFO] Deployment ID: {deployment_result.get('id')}")
-                        print(f"[DEBUG] Storage connection string: {connection_string[:50]}...")
-                    else:
-                        print(f"[ERROR] Failed to deploy Azure sandbox: {deployment_result.get('message')}")
-                        return {
-                            "success": False,
-                            "message": f"Failed to deploy Azure sandbox: {deployment_result.get('message')}"
-                        }
-                            
-                except Exception as e:
-                    print(f"[ERROR] Error deploying Azure sandbox: {str(e)}")
-                    return {
-                        "success": False,
-                        "message": f"Error deploying Azure sandbox: {str(e)}"
-                    }
+            try:
+                connection_string = await ensure_azure_sandbox()
+            except Exception as e:
+                return {
+                    "success": False,
+                    "message": str(e)
+                }
         
         # Start task in background for real-time streaming
         print("\n[INFO] Starting codex core agent...")
@@ -348,10 +346,10 @@ async def run_browser_task(request: BrowserTaskRequest):
     try:
         logger.info(f"Received browser task request: {request.user_question}")
         logger.info("Starting Anchor Browser session...")
-        from web_agent.anchor_browser.session_management.anchor_session_start import start_anchor_session
+        from web_agent.anchor_browser.session_pool import get_session_pool
 
-        # Start the browser session
-        session_info = start_anchor_session()
+        # Lease a warm browser session; it is returned when the agent run ends
+        session_info = await get_session_pool().lease()
         cdp_url = session_info['data']['cdp_url']
         live_view_url = session_info['data']['live_view_url']
         session_id = session_info['data']['id']
@@ -362,9 +360,15 @@ async def run_browser_task(request: BrowserTaskRequest):
 
         # Store session parameters for use by the WebSocket handler
         web_agent_session_params[session_id] = {
-            'user_task': request.user_question,
-            'user_name': request.user_name,
-            'cdp_url': cdp_url
+            "streams": {
+                "browser_0": {
+                    'user_task': request.user_question,
+                    'user_name': request.user_name,
+                    'cdp_url': cdp_url,
+                    'anchor_session_id': session_id
+                }
+            },
+            "managed": False
         }
 
         # Return immediately with the session information
@@ -384,18 +388,24 @@ async def run_browser_task(request: BrowserTaskRequest):
 async def run_browser_task_background(task_id: str, request: BrowserTaskRequest):
     """Start a browser session in the background and record its result in active_tasks."""
     try:
-        from web_agent.anchor_browser.session_management.anchor_session_start import start_anchor_session
+        from web_agent.anchor_browser.session_pool import get_session_pool
 
-        session_info = start_anchor_session()
+        session_info = await get_session_pool().lease()
         cdp_url = session_info['data']['cdp_url']
         live_view_url = session_info['data']['live_view_url']
         session_id = session_info['data']['id']
 
         # Store session parameters for use by the WebSocket handler
         web_agent_session_params[session_id] = {
-            'user_task': request.user_question,
-            'user_name': request.user_name,
-            'cdp_url': cdp_url
+            "streams": {
+                "browser_0": {
+                    'user_task': request.user_question,
+                    'user_name': request.user_name,
+                    'cdp_url': cdp_url,
+                    'anchor_session_id': session_id
+                }
+            },
+            "managed": False
         }
 
         active_tasks[task_id] = {
@@ -435,7 +445,7 @@ async def get_task_status(task_id: str):
     return active_tasks[task_id]
 
 @app.post("/api/shutdown-all", response_model=dict)
-def shutdown_all_browser_sessions():
+async def shutdown_all_browser_sessions():
     """
     End all active Anchor Browser sessions.
     """
@@ -443,7 +453,9 @@ def shutdown_all_browser_sessions():
         logger.info("Received shutdown request for all sessions")
         from web_agent.anchor_browser.session_management.anchor_browser_end_all_sessions import end_all_anchor_sessions
         
-        result = end_all_anchor_sessions()
+        result = await end_all_anchor_sessions()
+        from web_agent.anchor_browser.session_pool import get_session_pool
+        get_session_pool().forget_all()
         logger.info("All sessions shutdown successful")
         
         return {"status": "success", "message": "All sessions terminated successfully", "result": result}
@@ -456,6 +468,23 @@ def shutdown_all_browser_sessions():
 
 
 
+@app.get("/api/browser-pool/stats")
+async def browser_pool_stats():
+    """
+    Get warm browser session pool statistics.
+    """
+    from web_agent.anchor_browser.session_pool import get_session_pool
+    from web_agent.browser_contexts import get_browser_context_manager
+    return {**get_session_pool().stats(), "cdp_connections": get_browser_context_manager().stats()}
+
+@app.get("/api/page-cache/stats")
+async def page_cache_stats():
+    """
+    Get statistics of the disk-backed page cache shared by browser research sessions.
+    """
+    from web_agent.page_cache import get_page_cache
+    return get_page_cache().stats()
+
 @app.get("/api/container/status")
 def container_status():
     """Check if Azure container is initialized and connection string is available"""
@@ -538,7 +567,7 @@ async def orchestrator_endpoint(request: OrchestratorRequest):
         
         # Run the orchestrator
         browser_count = request.browser_count if request.browser_count is not None else 1
-        result = await run_orchestrator(
+        research = run_orchestrator(
             task_name=request.task,
             repo_info=request.repo_info,
             browser_count=browser_count,
@@ -548,6 +577,33 @@ async def orchestrator_endpoint(request: OrchestratorRequest):
             pull_request_description=request.pullRequestDescription
         )
         
+        repo_url = request.repo_info.get("cloneUrl") if request.repo_info else None
+        if request.pipeline and repo_url and not request.documentation:
+            # Pipeline mode: warm the sandbox and clone while the browsers research,
+            # then start the codex task on the first documentation
+            from orchestrator.pipeline import start_research_to_code
+            container_type = request.container_type or "azure"
+
+            async def provision_sandbox():
+                if container_type == "azure":
+                    return await ensure_azure_sandbox()
+                return None
+
+            result = await start_research_to_code(
+                task_name=request.task,
+                repo_url=repo_url,
+                project_name=request.repo_info.get("repoName") or repo_url.split('/')[-1].replace('.git', ''),
+                container_type=container_type,
+                provision_sandbox=provision_sandbox,
+                research=research,
+                broadcast_func=broadcast_to_codex_websockets,
+                task_id=f"task_{int(time.time())}"
+            )
+        else:
+            if request.pipeline:
+                logger.warning("[Orchestrator] Pipeline mode needs repo_info.cloneUrl and no documentation; running research only")
+            result = await research
+
         logger.info(f"[Orchestrator] Completed orchestration: {result}")
         
         return result
@@ -575,7 +631,10 @@ async def get_browser_session_status(session_id: str):
             "session_id": session_id,
             "status": session["status"],
             "browsers": session["browsers"],
-            "task": session["task"]
+            "task": session["task"],
+            "documentation": session.get("documentation", {}),
+            "completion_reason": session.get("completion_reason"),
+            "url_stats": session.get("url_stats")
         }
         
     except Exception as e:
@@ -588,27 +647,45 @@ async def get_browser_session_status(session_id: str):
 
 @app.websocket("/ws/web-agent/{session_id}")
 async def websocket_web_agent_stream(websocket: WebSocket, session_id: str):
+    """
+    Stream step events of every browser in the session over one socket, as
+    JSON frames tagged with a per-browser sub-stream ID (see web_agent.stream_hub).
+    """
     await websocket.accept()
-    web_agent_websockets[session_id] = websocket
-    # Send initial connection confirmation
-    await websocket.send_text("🔗 WebSocket connection established")
+    # Send initial connection confirmation, then replay anything published before we connected
+    await websocket.send_text(stream_hub.frame(session_id, stream_hub.SESSION_STREAM, "🔗 WebSocket connection established", "status"))
+    await stream_hub.subscribe(session_id, websocket)
     
     # Retrieve session parameters
     params = web_agent_session_params.get(session_id)
-    agent_bg_task = None
-    if params:
+    agent_bg_tasks = []
+    if params and not params.get("managed"):
         from web_agent.openai_test import run_search
-        await websocket.send_text("🚀 Starting web agent task...")
-        # Start the agent as a background task
-        agent_bg_task = asyncio.create_task(run_search(
-            user_task=params['user_task'],
-            cdp_url=params['cdp_url'],
-            user_name=params['user_name'],
-            session_id=session_id,
-            publish_thought_func=publish_web_agent_thought
-        ))
-    else:
-        await websocket.send_text("❌ No session parameters found - agent will not start")
+        from web_agent.anchor_browser.session_pool import get_session_pool
+
+        async def run_and_release(stream_id: str, stream: dict):
+            reusable = False
+            try:
+                await stream_hub.publish(session_id, stream_id, "🚀 Starting web agent task...", "status")
+                result = await run_search(
+                    user_task=stream['user_task'],
+                    cdp_url=stream['cdp_url'],
+                    user_name=stream['user_name'],
+                    session_id=session_id,
+                    publish_thought_func=stream_hub.stream_publisher(stream_id)
+                )
+                reusable = True
+                await stream_hub.publish(session_id, stream_id, "✅ Web agent task finished", "done")
+                return result
+            finally:
+                # Return the browser to the pool (or end it if the run was cut short)
+                await get_session_pool().release(stream['anchor_session_id'], reusable=reusable)
+
+        # Start one agent per browser as background tasks
+        for stream_id, stream in params["streams"].items():
+            agent_bg_tasks.append(asyncio.create_task(run_and_release(stream_id, stream)))
+    elif not params:
+        await websocket.send_text(stream_hub.frame(session_id, stream_hub.SESSION_STREAM, "❌ No session parameters found - agent will not start", "error"))
 
     try:
         while True:
@@ -618,23 +695,48 @@ async def websocket_web_agent_stream(websocket: WebSocket, session_id: str):
     except WebSocketDisconnect:
         pass
     finally:
-        if session_id in web_agent_websockets:
-            del web_agent_websockets[session_id]
-        if session_id in web_agent_session_params:
-            del web_agent_session_params[session_id]
-        if agent_bg_task:
-            agent_bg_task.cancel()
+        stream_hub.unsubscribe(session_id, websocket)
+        if agent_bg_tasks:
+            # This socket owned the agents: stop them and forget the session
+            web_agent_session_params.pop(session_id, None)
+            for task in agent_bg_tasks:
+                task.cancel()
+            stream_hub.drop_session(session_id)
 
 # Event handlers
 @app.on_event("startup")
 async def startup_event():
     """Initialize resources on startup"""
     logger.info("Combined API Server is starting up...")
+    # Pre-provision warm browser sessions in the background
+    if os.getenv("ANCHOR_API_KEY"):
+        from web_agent.anchor_browser.session_pool import get_session_pool
+        asyncio.create_task(get_session_pool().start())
+    # Build the orchestrator once so requests don't pay for kernel/client setup
+    try:
+        from orchestrator.orchestrator import get_orchestrator
+        get_orchestrator()
+    except Exception as e:
+        logger.warning(f"Orchestrator not initialized at startup, will retry on first request: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown"""
     logger.info("Combined API Server is shutting down...")
+    from codex_agent.async_azure_queue import close_shared_transport
+    await close_shared_transport()
+    from orchestrator.orchestrator import close_orchestrator
+    await close_orchestrator()
+    from web_agent.anchor_browser.session_pool import close_session_pool
+    await close_session_pool()
+    from web_agent.browser_contexts import close_browser_context_manager
+    await close_browser_context_manager()
+    from web_agent.fast_fetch import close_fast_fetch_session
+    await close_fast_fetch_session()
+    from web_agent.anchor_browser.anchor_client import close_anchor_client
+    await close_anchor_client()
+    from orchestrator.github_client import close_github_session
+    await close_github_session()
 
 @contextmanager
 def stream_print_to_web_agent(session_id):
@@ -0,0 +1,27 @@
+"""Helpers shared by the benchmark scripts"""
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent.parent / "bench_results"
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+def summarize(samples: List[float]) -> Dict:
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000 if samples else None,
+        "p95_ms": percentile(samples, 0.95) * 1000 if samples else None,
+        "p99_ms": percentile(samples, 0.99) * 1000 if samples else None,
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else None,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
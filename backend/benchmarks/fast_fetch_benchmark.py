@@ -0,0 +1,181 @@
+"""
+Benchmarks for the HTTP fast-path fetcher, run against a local static site so
+results don't depend on the network or on third-party pages.
+
+From backend/:
+    python -m benchmarks.fast_fetch_benchmark                 # generated site
+    python -m benchmarks.fast_fetch_benchmark --quick         # fewer iterations / concurrency levels
+    python -m benchmarks.fast_fetch_benchmark --site ./mirror # serve a directory of saved pages instead
+
+The generated site has documentation pages (which the fast path should answer),
+JavaScript-only shells and a login page (which should be handed to a browser).
+Measured: cold fetch latency, warm page-cache latency, revalidation latency
+(304 Not Modified), throughput by concurrency, hand-off classification accuracy
+and HTML -> markdown size. Results are written to bench_results/ tagged with
+the git commit.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.common import RESULTS_DIR, git_commit, summarize
+from web_agent import fast_fetch, page_cache
+
+DOC_PAGE = """<!doctype html><html><head><title>{title}</title><script src="/analytics.js"></script></head>
+<body><header><a href="/">Docs home</a></header>
+<nav><ul>{nav}</ul></nav>
+<main><h1>{title}</h1>
+{sections}
+</main>
+<footer>Copyright Example Corp</footer></body></html>"""
+
+SECTION = """<h2>{name}</h2>
+<p>The <code>{name}</code> option controls how the client behaves when {topic}. It accepts a string or a
+mapping and defaults to <a href="/reference/defaults.html">the documented defaults</a>. Values set in the
+environment take precedence over values passed to the constructor.</p>
+<ul><li>Supported since version 2.{index}</li><li>Thread-safe: yes</li></ul>
+<pre>client = Client({name}="value")
+client.connect()</pre>
+<table><tr><th>Parameter</th><th>Type</th></tr><tr><td>{name}</td><td>str</td></tr></table>"""
+
+JS_SHELL = """<!doctype html><html><head><title>App</title>
+<script src="/runtime.js"></script><script src="/vendor.js"></script><script src="/main.js"></script></head>
+<body><noscript>You need to enable JavaScript to run this app.</noscript><div id="root"></div></body></html>"""
+
+LOGIN_PAGE = """<!doctype html><html><head><title>Sign in</title></head><body><main>
+<h1>Sign in to continue</h1><form><input name="user"><input type="password" name="password"></form>
+</main></body></html>"""
+
+def generate_site(root: Path, pages: int) -> Dict[str, Optional[str]]:
+    """Write the benchmark site; returns path -> expected hand-off reason (None = fast path answers)"""
+    expected = {}
+    nav = "".join(f'<li><a href="/docs/page{i}.html">Page {i}</a></li>' for i in range(pages))
+    (root / "docs").mkdir(parents=True)
+    for i in range(pages):
+        sections = "\n".join(SECTION.format(name=f"option_{i}_{j}", topic=f"feature {j} is enabled", index=j)
+                             for j in range(6))
+        (root / "docs" / f"page{i}.html").write_text(DOC_PAGE.format(title=f"Configuration guide {i}", nav=nav, sections=sections))
+        expected[f"/docs/page{i}.html"] = None
+    for i in range(max(1, pages // 5)):
+        (root / f"app{i}.html").write_text(JS_SHELL)
+        expected[f"/app{i}.html"] = "javascript_required"
+    (root / "login").mkdir()
+    (root / "login" / "index.html").write_text(LOGIN_PAGE)
+    expected["/login/"] = "login_required"
+    return expected
+
+def site_pages(root: Path) -> Dict[str, Optional[str]]:
+    """Pages of an existing directory; the expected hand-off is unknown"""
+    return {"/" + p.relative_to(root).as_posix(): "unknown" for p in sorted(root.rglob("*.html"))}
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve(root: Path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+async def timed_fetches(urls: List[str], iterations: int, use_cache: bool) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        for url in urls:
+            start = time.perf_counter()
+            await fast_fetch.fetch_page(url, use_cache=use_cache)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+async def throughput(urls: List[str], concurrency: int, total: int) -> Dict:
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(urls[i % len(urls)])
+
+    async def worker():
+        while not queue.empty():
+            await fast_fetch.fetch_page(queue.get_nowait(), use_cache=False)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "pages": total, "pages_per_second": total / elapsed}
+
+async def run_suite(args) -> Path:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if args.site:
+            root = Path(args.site)
+            expected = site_pages(root)
+        else:
+            root = tmp / "site"
+            expected = generate_site(root, 10 if args.quick else args.pages)
+        server, base = serve(root)
+        urls = [base + path for path in expected]
+        doc_urls = [base + path for path, reason in expected.items() if reason in (None, "unknown")]
+        iterations = 3 if args.quick else args.iterations
+        concurrency_levels = [1, 4, 16] if args.quick else [1, 2, 4, 8, 16, 32]
+        try:
+            # Classification and conversion size, uncached
+            classification, html_bytes, markdown_chars = [], 0, 0
+            for path, url in zip(expected, urls):
+                result = await fast_fetch.fetch_page(url, use_cache=False)
+                classification.append({"path": path, "expected": expected[path], "handoff": result["handoff"]})
+                if result["handoff"] is None:
+                    html_bytes += (root / path.lstrip("/")).stat().st_size if (root / path.lstrip("/")).is_file() else 0
+                    markdown_chars += len(result["markdown"])
+            judged = [c for c in classification if c["expected"] != "unknown"]
+            correct = sum(c["expected"] == c["handoff"] for c in judged)
+
+            cold = await timed_fetches(doc_urls, iterations, use_cache=False)
+
+            # Private cache so the run neither reads nor pollutes the real one
+            page_cache._page_cache = page_cache.PageCache(tmp / "cache")
+            await timed_fetches(doc_urls, 1, use_cache=True)
+            warm = await timed_fetches(doc_urls, iterations, use_cache=True)
+            # ttl=0: every lookup is stale, so each fetch is a conditional request answered with 304
+            page_cache._page_cache.ttl = 0
+            revalidated = await timed_fetches(doc_urls, iterations, use_cache=True)
+            cache_stats = page_cache._page_cache.stats()
+
+            scaling = [await throughput(doc_urls, c, max(c * 4, 40 if args.quick else 200)) for c in concurrency_levels]
+        finally:
+            page_cache._page_cache = None
+            await fast_fetch.close_fast_fetch_session()
+            server.shutdown()
+
+    results = {
+        "pages": len(expected),
+        "classification": {"judged": len(judged), "correct": correct, "pages": classification},
+        "conversion": {"html_bytes": html_bytes, "markdown_chars": markdown_chars},
+        "latency": {"cold": summarize(cold), "warm_cache": summarize(warm), "revalidated": summarize(revalidated)},
+        "cache": cache_stats,
+        "throughput": scaling,
+    }
+    print(f"classification: {correct}/{len(judged)} correct")
+    for name, summary in results["latency"].items():
+        print(f"{name:<12} p50 {summary['p50_ms']:.2f} ms  p95 {summary['p95_ms']:.2f} ms")
+    for row in scaling:
+        print(f"concurrency {row['concurrency']:<3} {row['pages_per_second']:.0f} pages/s")
+
+    commit = git_commit()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"fast_fetch_{commit}_{int(time.time())}.json"
+    output.write_text(json.dumps({"commit": commit, "timestamp": time.time(), "iterations": iterations, **results}, indent=2))
+    print(f"\nResults written to {output}")
+    return output
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP fast-path fetch benchmarks against a local static site")
+    parser.add_argument("--quick", action="store_true", help="Fewer pages, iterations and concurrency levels")
+    parser.add_argument("--pages", type=int, default=50, help="Documentation pages in the generated site")
+    parser.add_argument("--iterations", type=int, default=5, help="Passes over the pages per latency measurement")
+    parser.add_argument("--site", help="Serve this directory of .html files instead of a generated site")
+    parser.add_argument("--output", help="Result file path (default: bench_results/fast_fetch_<commit>_<time>.json)")
+    asyncio.run(run_suite(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Per-request setup cost of the orchestrator: building a new Orchestrator for
+every request (the old run_orchestrator behaviour) versus reusing the shared
+instance from get_orchestrator().
+
+From backend/ (OPENAI_API_KEY must be set; construction makes no API calls):
+    python -m benchmarks.orchestrator_benchmark              # setup cost only
+    python -m benchmarks.orchestrator_benchmark --live       # also time one tiny chat call per request
+    python -m benchmarks.orchestrator_benchmark --quick
+
+With --live each request also sends a one-token chat completion, so the
+numbers include TLS/connection setup that a fresh OpenAI client pays and a
+reused one doesn't. Results are written to bench_results/ tagged with the
+git commit.
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatPromptExecutionSettings
+from semantic_kernel.contents import ChatHistory
+
+from benchmarks.common import RESULTS_DIR, git_commit, summarize
+from orchestrator.orchestrator import Orchestrator, close_orchestrator, get_orchestrator
+
+async def ping(orchestrator: Orchestrator) -> None:
+    history = ChatHistory()
+    history.add_user_message("Reply with OK.")
+    await orchestrator.service.get_chat_message_content(
+        chat_history=history, settings=OpenAIChatPromptExecutionSettings(max_tokens=1)
+    )
+
+async def per_request(iterations: int, live: bool) -> List[float]:
+    """Old behaviour: a new Orchestrator (kernel, service, HTTP client) per request"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        orchestrator = Orchestrator()
+        if live:
+            await ping(orchestrator)
+        samples.append(time.perf_counter() - start)
+        await orchestrator.close()
+    return samples
+
+async def shared(iterations: int, live: bool) -> List[float]:
+    """Current behaviour: every request reuses the application-scoped Orchestrator"""
+    get_orchestrator()  # created at startup in the app, so not part of a request
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        orchestrator = get_orchestrator()
+        if live:
+            await ping(orchestrator)
+        samples.append(time.perf_counter() - start)
+    await close_orchestrator()
+    return samples
+
+async def run_suite(args) -> Path:
+    iterations = 5 if args.quick else args.iterations
+    results: Dict[str, Dict] = {
+        "per_request": summarize(await per_request(iterations, args.live)),
+        "shared": summarize(await shared(iterations, args.live)),
+    }
+    for name, summary in results.items():
+        print(f"{name:<12} p50 {summary['p50_ms']:.2f} ms  p95 {summary['p95_ms']:.2f} ms")
+    saved = results["per_request"]["mean_ms"] - results["shared"]["mean_ms"]
+    print(f"saved per request: {saved:.2f} ms (mean)")
+
+    commit = git_commit()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"orchestrator_{commit}_{int(time.time())}.json"
+    output.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": time.time(),
+        "iterations": iterations,
+        "live": args.live,
+        "scenarios": results,
+        "saved_ms_per_request": saved,
+    }, indent=2))
+    print(f"\nResults written to {output}")
+    return output
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request orchestrator setup: new instance vs shared instance")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations")
+    parser.add_argument("--iterations", type=int, default=30, help="Requests per scenario")
+    parser.add_argument("--live", action="store_true", help="Also send a one-token chat completion per request")
+    parser.add_argument("--output", help="Result file path (default: bench_results/orchestrator_<commit>_<time>.json)")
+    asyncio.run(run_suite(parser.parse_args()))
@@ -0,0 +1,216 @@
+"""
+Round-trip benchmarks for the Azure queue sandbox transport, run against a local
+Azurite emulator with an in-process stub worker (no real commands are executed).
+
+Start Azurite first, e.g.
+    docker run -p 10000:10000 -p 10001:10001 mcr.microsoft.com/azure-storage/azurite
+
+then from backend/:
+    python -m benchmarks.queue_benchmark                 # full suite
+    python -m benchmarks.queue_benchmark --quick         # fewer iterations / concurrency levels
+    python -m benchmarks.queue_benchmark --compare bench_results/a.json bench_results/b.json
+
+Each run writes machine-readable results (tagged with the git commit) to
+bench_results/ so numbers can be compared across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.queue.aio import QueueClient
+
+from benchmarks.common import RESULTS_DIR, git_commit, summarize
+from codex_agent import azure_queue, queue_payload
+from codex_agent.async_azure_queue import AsyncAzureQueueManager, close_shared_transport
+from codex_agent.sandbox_worker import SandboxWorker
+from codex_agent.transports import SandboxTransport
+
+AZURITE_CONNECTION_STRING = "UseDevelopmentStorage=true"
+
+# Settings varied per scenario; anything unset uses the defaults below
+DEFAULT_SETTINGS = {
+    "poll_fast_window": azure_queue.POLL_FAST_WINDOW,
+    "poll_min_interval": azure_queue.POLL_MIN_INTERVAL,
+    "poll_max_interval": azure_queue.POLL_MAX_INTERVAL,
+    "batch_size": 32,
+    "compress_threshold": queue_payload.COMPRESS_THRESHOLD,
+    "output_bytes": 64,
+    "per_task_queues": False,
+}
+
+SCENARIOS = {
+    "baseline": {},
+    # roughly the old fixed 5s sleep between polls
+    "fixed-poll": {"poll_fast_window": 0.0, "poll_min_interval": 5.0, "poll_max_interval": 5.0},
+    "no-batching": {"batch_size": 1},
+    "per-task-queues": {"per_task_queues": True},
+    "large-output-uncompressed": {"output_bytes": 40_000, "compress_threshold": 10 ** 9},
+    "large-output-compressed": {"output_bytes": 40_000},
+    "claim-check": {"output_bytes": 400_000},
+}
+
+class StubTransport(SandboxTransport):
+    """Answers every command instantly with output_bytes of stdout"""
+
+    name = "stub"
+
+    def __init__(self, output_bytes: int):
+        super().__init__()
+        self.output_bytes = output_bytes
+
+    async def _execute(self, command: str, project_name: Optional[str]) -> Dict:
+        # Mildly compressible output, like real build logs
+        line = f"{command} ok {uuid.uuid4().hex}\n"
+        stdout = (line * (self.output_bytes // len(line) + 1))[:self.output_bytes]
+        return {"success": True, "stdout": stdout, "stderr": ""}
+
+def apply_settings(settings: Dict) -> None:
+    """Point the queue modules at a scenario's polling and compression settings"""
+    azure_queue.POLL_FAST_WINDOW = settings["poll_fast_window"]
+    azure_queue.POLL_MIN_INTERVAL = settings["poll_min_interval"]
+    azure_queue.POLL_MAX_INTERVAL = settings["poll_max_interval"]
+    queue_payload.COMPRESS_THRESHOLD = settings["compress_threshold"]
+
+async def create_queues(connection_string: str, names: List[str]) -> None:
+    for name in names:
+        async with QueueClient.from_connection_string(connection_string, name) as queue:
+            try:
+                await queue.create_queue()
+            except ResourceExistsError:
+                await queue.clear_messages()
+
+async def delete_queues(connection_string: str, names: List[str]) -> None:
+    for name in names:
+        async with QueueClient.from_connection_string(connection_string, name) as queue:
+            try:
+                await queue.delete_queue()
+            except Exception:
+                pass
+
+async def timed_client(connection_string: str, commands: int, per_task_queue: bool, shared: Optional[AsyncAzureQueueManager]) -> List[float]:
+    """Run commands sequentially and return their round-trip latencies"""
+    queue = AsyncAzureQueueManager(connection_string, task_id=uuid.uuid4().hex[:12]) if per_task_queue else shared
+    if per_task_queue:
+        await queue.setup()
+    latencies = []
+    try:
+        for i in range(commands):
+            start = time.perf_counter()
+            result = await queue.execute_command(f"bench-{i}", None)
+            if not result.get("success"):
+                raise RuntimeError(f"Stub command failed: {result}")
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if per_task_queue:
+            await queue.close()
+    return latencies
+
+async def run_scenario(connection_string: str, name: str, overrides: Dict, iterations: int, concurrency_levels: List[int]) -> Dict:
+    settings = {**DEFAULT_SETTINGS, **overrides}
+    apply_settings(settings)
+    print(f"\n=== {name} ===  {overrides or 'defaults'}")
+
+    worker_queue = AsyncAzureQueueManager(connection_string)
+    worker = SandboxWorker(
+        worker_queue,
+        concurrency=max(concurrency_levels) * 2,
+        batch_size=settings["batch_size"],
+        transport=StubTransport(settings["output_bytes"]),
+    )
+    worker_task = asyncio.create_task(worker.run())
+    shared = AsyncAzureQueueManager(connection_string)
+    try:
+        latencies = await timed_client(connection_string, iterations, settings["per_task_queues"], shared)
+        latency = summarize(latencies)
+        print(f"latency: p50={latency['p50_ms']:.1f}ms p95={latency['p95_ms']:.1f}ms p99={latency['p99_ms']:.1f}ms")
+
+        throughput = []
+        for clients in concurrency_levels:
+            per_client = max(1, iterations // clients)
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                timed_client(connection_string, per_client, settings["per_task_queues"], shared)
+                for _ in range(clients)
+            ])
+            elapsed = time.perf_counter() - start
+            samples = [s for client in results for s in client]
+            row = {"clients": clients, "commands": len(samples), "seconds": elapsed,
+                   "commands_per_second": len(samples) / elapsed, **summarize(samples)}
+            throughput.append(row)
+            print(f"clients={clients:>3}  {row['commands_per_second']:>8.1f} cmd/s  p95={row['p95_ms']:.1f}ms")
+    finally:
+        worker.stop()
+        await worker_task
+        await shared.close()
+        await worker_queue.close()
+    return {"settings": settings, "latency": latency, "throughput": throughput, "worker": worker.stats}
+
+async def run_suite(args) -> Path:
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING", AZURITE_CONNECTION_STRING)
+    run_id = uuid.uuid4().hex[:8]
+    # Private queues so a run never competes with a real sandbox or leftovers
+    os.environ["COMMAND_QUEUE"] = f"benchcmd{run_id}"
+    os.environ["RESPONSE_QUEUE"] = f"benchrsp{run_id}"
+    queue_names = [os.environ["COMMAND_QUEUE"], os.environ["RESPONSE_QUEUE"]]
+    await create_queues(connection_string, queue_names)
+
+    concurrency_levels = [1, 4, 16] if args.quick else [1, 2, 4, 8, 16, 32, 64]
+    iterations = 20 if args.quick else args.iterations
+    scenarios = {name: SCENARIOS[name] for name in (args.scenarios or SCENARIOS)}
+    results = {}
+    try:
+        for name, overrides in scenarios.items():
+            results[name] = await run_scenario(connection_string, name, overrides, iterations, concurrency_levels)
+    finally:
+        await delete_queues(connection_string, queue_names)
+        await close_shared_transport()
+
+    commit = git_commit()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"queue_{commit}_{int(time.time())}.json"
+    output.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": time.time(),
+        "iterations": iterations,
+        "concurrency_levels": concurrency_levels,
+        "scenarios": results,
+    }, indent=2))
+    print(f"\nResults written to {output}")
+    return output
+
+def compare(old_path: str, new_path: str) -> None:
+    """Print per-scenario latency and peak-throughput deltas between two result files"""
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{old['commit']} -> {new['commit']}")
+    print(f"{'scenario':<28}{'metric':<14}{'old':>12}{'new':>12}{'change':>10}")
+    for name in new["scenarios"]:
+        if name not in old["scenarios"]:
+            continue
+        o, n = old["scenarios"][name], new["scenarios"][name]
+        rows = [(metric, o["latency"][metric], n["latency"][metric]) for metric in ("p50_ms", "p95_ms", "p99_ms")]
+        rows.append(("peak cmd/s",
+                     max(r["commands_per_second"] for r in o["throughput"]),
+                     max(r["commands_per_second"] for r in n["throughput"])))
+        for metric, before, after in rows:
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{name:<28}{metric:<14}{before:>12.1f}{after:>12.1f}{change:>9.1f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Azure queue round-trip benchmarks against Azurite")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations and concurrency levels")
+    parser.add_argument("--iterations", type=int, default=200, help="Commands per latency measurement")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS))
+    parser.add_argument("--output", help="Result file path (default: bench_results/queue_<commit>_<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        asyncio.run(run_suite(args))
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import time
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob.aio import ContainerClient
+from azure.storage.queue import QueueMessage
+from azure.storage.queue.aio import QueueClient
+
+from .azure_queue import (
+    HEARTBEAT_TIME_TO_LIVE,
+    MAX_COMMAND_SECONDS,
+    QueueMetrics,
+    RESPONSE_SCAN_VISIBILITY_TIMEOUT,
+    build_command_message,
+    is_heartbeat,
+    is_stale_response,
+    poll_intervals,
+    task_queue_name,
+    _env_flag,
+)
+from .queue_payload import OVERFLOW_CONTAINER, blob_ref, pack, unpack
+
+# One aiohttp session (and connection pool) per event loop, shared by every
+# async queue client so commands reuse warm keep-alive connections.
+_shared_sessions: Dict[int, aiohttp.ClientSession] = {}
+
+def get_shared_transport() -> AioHttpTransport:
+    """Return an Azure transport backed by the shared aiohttp session of the running loop"""
+    loop = asyncio.get_running_loop()
+    session = _shared_sessions.get(id(loop))
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=int(os.getenv("QUEUE_HTTP_POOL_SIZE", "64")), keepalive_timeout=60)
+        )
+        _shared_sessions[id(loop)] = session
+    # session_owner=False keeps the pool alive when an individual client closes
+    return AioHttpTransport(session=session, session_owner=False)
+
+async def close_shared_transport() -> None:
+    """Close the shared aiohttp session of the running loop (call on app shutdown)"""
+    session = _shared_sessions.pop(id(asyncio.get_running_loop()), None)
+    if session and not session.closed:
+        await session.close()
+
+class AsyncAzureQueueManager(QueueMetrics):
+    """asyncio counterpart of AzureQueueManager built on azure.storage.queue.aio.
+
+    Exposes the same send_command / wait_for_response / execute_command /
+    receive_command / receive_response surface as coroutines, so the codex loop
+    can await sandbox results without blocking the event loop.
+    """
+
+    def __init__(self, connection_string: str, queue_name: str = "commandqueue", debug: Optional[bool] = None, task_id: Optional[str] = None):
+        """Create async queue clients; must be called from within a running event loop.
+
+        With a task_id, use a private per-task response queue; call setup() to
+        create it and close() to delete it.
+        """
+        self.debug = _env_flag("AZURE_QUEUE_DEBUG") if debug is None else debug
+        cmd_queue = os.getenv("COMMAND_QUEUE", queue_name)
+        resp_queue = os.getenv("RESPONSE_QUEUE", "responsequeue")
+        self.reply_to = task_queue_name(resp_queue, task_id) if task_id else None
+        if self.reply_to:
+            resp_queue = self.reply_to
+        self.connection_string = connection_string
+        self._overflow = None  # Lazily created blob container for oversized payloads
+        print(f"[DEBUG] Initializing AsyncAzureQueueManager (command queue: {cmd_queue}, response queue: {resp_queue})")
+        try:
+            self.queue_client = QueueClient.from_connection_string(
+                connection_string, cmd_queue, transport=get_shared_transport()
+            )
+            self.response_queue = QueueClient.from_connection_string(
+                connection_string, resp_queue, transport=get_shared_transport()
+            )
+            self.pending_messages = set()  # Track pending message IDs
+            self._init_metrics()
+        except Exception as e:
+            print(f"[ERROR] Failed to create async QueueClient: {str(e)}")
+            raise
+
+    async def setup(self) -> None:
+        """Create the per-task response queue, if this manager owns one"""
+        if not self.reply_to:
+            return
+        try:
+            await self.response_queue.create_queue()
+        except ResourceExistsError:
+            pass
+        print(f"[DEBUG] ✅ Per-task response queue '{self.reply_to}' ready")
+
+    async def cleanup(self) -> None:
+        """Delete the per-task response queue, if this manager owns one"""
+        if not self.reply_to:
+            return
+        try:
+            await self.response_queue.delete_queue()
+            print(f"[DEBUG] 🧹 Deleted per-task response queue '{self.reply_to}'")
+        except ResourceNotFoundError:
+            pass
+
+    async def close(self) -> None:
+        """Delete any per-task queue and close the queue clients; the shared HTTP session stays open"""
+        try:
+            await self.cleanup()
+        finally:
+            await self.queue_client.close()
+            await self.response_queue.close()
+            if self._overflow is not None:
+                await self._overflow.close()
+
+    async def __aenter__(self) -> "AsyncAzureQueueManager":
+        await self.setup()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _overflow_container(self) -> ContainerClient:
+        """Blob container holding claim-checked payloads (created on first use)"""
+        if self._overflow is None:
+            self._overflow = ContainerClient.from_connection_string(
+                self.connection_string, OVERFLOW_CONTAINER, transport=get_shared_transport()
+            )
+            try:
+                await self._overflow.create_container()
+            except ResourceExistsError:
+                pass
+        return self._overflow
+
+    async def _send(self, queue: QueueClient, body: Dict) -> None:
+        """Send a message body, compressing or claim-checking it to blob storage when large"""
+        if is_heartbeat(body):
+            await queue.send_message(json.dumps(body), time_to_live=HEARTBEAT_TIME_TO_LIVE)
+            return
+        text, upload = pack(body)
+        if upload:
+            blob_name, data = upload
+            container = await self._overflow_container()
+            await container.upload_blob(blob_name, data, overwrite=True)
+            print(f"[DEBUG] 📦 Payload for {body.get('message_id')} overflowed to blob {blob_name} ({len(data)} bytes)")
+        await queue.send_message(text)
+
+    async def _unpack(self, envelope: Dict) -> Dict:
+        """Decode a received message, fetching and deleting its overflow blob if claim-checked"""
+        blob_name = blob_ref(envelope)
+        if not blob_name:
+            return unpack(envelope)
+        container = await self._overflow_container()
+        downloader = await container.download_blob(blob_name)
+        body = unpack(envelope, await downloader.readall())
+        await self._discard_overflow(envelope)
+        return body
+
+    async def _discard_overflow(self, envelope: Dict) -> None:
+        """Delete the overflow blob of a claim-checked message, if any"""
+        blob_name = blob_ref(envelope)
+        if not blob_name:
+            return
+        container = await self._overflow_container()
+        try:
+            await container.delete_blob(blob_name)
+        except ResourceNotFoundError:
+            pass
+
+    async def send_command(self, command: str, project_name: Optional[str] = None) -> str:
+        """Send a command to the Azure queue and return message ID"""
+        message = build_command_message(command, project_name, self.reply_to)
+        message_id = message["message_id"]
+        if self.debug:
+            print(f"[DEBUG] Sending message to queue: {json.dumps(message, indent=2)}")
+        try:
+            await self._send(self.queue_client, message)
+        except Exception as e:
+            print(f"[DEBUG] ❌ Failed to send message: {e}")
+            raise
+        if self.debug:
+            properties = await self.queue_client.get_queue_properties()
+            print(f"[DEBUG] 📊 Queue depth after sending: {properties.approximate_message_count} messages")
+
+        self.sent_at[message_id] = time.monotonic()
+        self.pending_messages.add(message_id)
+        self.metrics["commands_sent"] += 1
+        return message_id
+
+    async def send_response(self, response: Dict, reply_to: Optional[str] = None) -> None:
+        """Publish a worker response (must carry message_id) to reply_to or the response queue"""
+        if not reply_to or reply_to == self.reply_to:
+            await self._send(self.response_queue, response)
+            return
+        async with QueueClient.from_connection_string(
+            self.connection_string, reply_to, transport=get_shared_transport()
+        ) as queue:
+            await self._send(queue, response)
+
+    async def wait_for_response(self, message_id: str, timeout: int = 300, on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Wait for response from the container instance, polling adaptively.
+
+        timeout is the longest the waiter tolerates silence: every heartbeat for
+        message_id pushes the deadline out again (up to MAX_COMMAND_SECONDS) and is
+        passed to on_progress.
+        """
+        if message_id not in self.pending_messages:
+            self.pending_messages.add(message_id)
+
+        started = time.monotonic()
+        deadline = started + timeout
+        intervals = poll_intervals()
+        while time.monotonic() < deadline:
+            self.metrics["polls"] += 1
+            messages = self.response_queue.receive_messages(
+                messages_per_page=32,
+                visibility_timeout=RESPONSE_SCAN_VISIBILITY_TIMEOUT
+            )
+            async for message in messages:
+                try:
+                    response = json.loads(message.content)
+                except json.JSONDecodeError:
+                    continue
+                if response.get("message_id") == message_id:
+                    # Unpack first: a packed envelope hides the body's "type"
+                    response = await self._unpack(response)
+                    if is_heartbeat(response):
+                        # Command is still running; consume the heartbeat and extend the deadline
+                        await self.response_queue.delete_message(message.id, message.pop_receipt)
+                        deadline = min(time.monotonic() + timeout, started + MAX_COMMAND_SECONDS)
+                        if on_progress:
+                            on_progress(response)
+                        continue
+                    # Delete the response message after receiving it
+                    await self.response_queue.delete_message(message.id, message.pop_receipt)
+                    self.pending_messages.discard(message_id)
+                    self.metrics["responses_received"] += 1
+                    self._record_rtt(message_id, response)
+                    return response
+                if self.reply_to and is_stale_response(response, self.pending_messages):
+                    await self.response_queue.delete_message(message.id, message.pop_receipt)
+                    await self._discard_overflow(response)
+            await asyncio.sleep(min(next(intervals), max(0.0, deadline - time.monotonic())))
+        self.metrics["timeouts"] += 1
+        self.sent_at.pop(message_id, None)
+        self.pending_messages.discard(message_id)
+        raise TimeoutError(f"No response received for message {message_id} within {timeout} seconds")
+
+    async def execute_command(self, command: str, project_name: Optional[str] = None, on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Execute a command and wait for response"""
+        message_id = await self.send_command(command, project_name)
+        return await self.wait_for_response(message_id, on_progress=on_progress)
+
+    async def _receive_one(self, queue: QueueClient, timeout: int) -> Optional[Dict]:
+        async for msg in queue.receive_messages(messages_per_page=1, visibility_timeout=timeout):
+            # remove message from queue; invalid JSON is discarded
+            await queue.delete_message(msg.id, msg.pop_receipt)
+            try:
+                payload = json.loads(msg.content)
+            except json.JSONDecodeError:
+                continue
+            return await self._unpack(payload)
+        return None
+
+    async def receive_command(self, timeout: int = 30) -> Optional[Dict]:
+        """Receive a single command message from the command queue"""
+        return await self._receive_one(self.queue_client, timeout)
+
+    async def receive_response(self, timeout: int = 30) -> Optional[Dict]:
+        """Receive a single response message from the response queue"""
+        return await self._receive_one(self.response_queue, timeout)
+
+    async def receive_commands(self, max_messages: int = 32, visibility_timeout: int = 60) -> List[Tuple[Dict, QueueMessage]]:
+        """Receive a batch of commands without deleting them.
+
+        Returns (payload, message) pairs; keep long commands hidden with
+        extend_visibility() and delete them with complete_command() once answered.
+        """
+        batch = []
+        messages = self.queue_client.receive_messages(
+            messages_per_page=max_messages, max_messages=max_messages, visibility_timeout=visibility_timeout
+        )
+        async for msg in messages:
+            try:
+                payload = json.loads(msg.content)
+            except json.JSONDecodeError:
+                # discard invalid message
+                await self.queue_client.delete_message(msg.id, msg.pop_receipt)
+                continue
+            batch.append((await self._unpack(payload), msg))
+        return batch
+
+    async def extend_visibility(self, message: QueueMessage, visibility_timeout: int = 60) -> QueueMessage:
+        """Keep a received command hidden from other workers; returns the message with its new pop receipt"""
+        return await self.queue_client.update_message(message, visibility_timeout=visibility_timeout)
+
+    async def complete_command(self, message: QueueMessage) -> None:
+        """Delete a command received with receive_commands() once its response is published"""
+        await self.queue_client.delete_message(message.id, message.pop_receipt)
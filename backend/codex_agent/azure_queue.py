@@ -1,132 +1,325 @@
-from azure.storage.queue import QueueClient
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import ContainerClient
+from azure.storage.queue import QueueClient, QueueMessage
+import math
 import time
 import json
 import uuid
 import os
-from typing import Dict, Optional
+import random
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
 
-class AzureQueueManager:
-    def __init__(self, connection_string: str, queue_name: str = "commandqueue"):
-        """Initialize Azure Queue Manager with connection string and queue names (override via COMMAND_QUEUE/RESPONSE_QUEUE env vars)"""
-        print(f"[DEBUG] Initializing AzureQueueManager with connection string: {connection_string[:50]}...")
+from .queue_payload import OVERFLOW_CONTAINER, blob_ref, pack, unpack
+
+# Adaptive polling defaults for wait_for_response (seconds). The waiter polls
+# back-to-back during the fast window, then backs off exponentially with jitter
+# up to the max interval.
+POLL_FAST_WINDOW = float(os.getenv("QUEUE_POLL_FAST_WINDOW", "0.3"))
+POLL_MIN_INTERVAL = float(os.getenv("QUEUE_POLL_MIN_INTERVAL", "0.05"))
+POLL_MAX_INTERVAL = float(os.getenv("QUEUE_POLL_MAX_INTERVAL", "2.0"))
+POLL_BACKOFF_FACTOR = 1.5
+POLL_JITTER = 0.2
+
+# Every poll receives the responses (and heartbeats) it isn't waiting for too:
+# other tasks' in the shared queue, other commands' in a per-task queue. Keep
+# them hidden only briefly so their own waiter sees them on its next poll.
+RESPONSE_SCAN_VISIBILITY_TIMEOUT = 1
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes", "on")
+
+def task_queue_name(base: str, task_id: str) -> str:
+    """Derive a valid Azure queue name (3-63 chars, lowercase alphanumerics and single hyphens) for a per-task queue"""
+    slug = re.sub(r"[^a-z0-9]+", "-", task_id.lower()).strip("-")
+    name = f"{base}-{slug}" if slug else base
+    return name[:63].rstrip("-")
+
+# Interim messages a worker sends for a still-running command, sharing its message_id:
+# {"message_id", "type": "heartbeat", "state", "elapsed", "output_bytes", "tail": [last lines]}
+HEARTBEAT = "heartbeat"
+HEARTBEAT_TAIL_LINES = 5
+# Heartbeats are sent as plain JSON (never packed) so waiters can recognise them;
+# capping tail lines keeps one well below the compression threshold and the 64 KiB limit
+HEARTBEAT_TAIL_LINE_CHARS = 200
+# How often workers send heartbeats (same setting as the Node worker's HEARTBEAT_MS)
+HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_MS", "15000")) / 1000
+# Heartbeats expire after two intervals, so ones nobody consumes (the response was
+# already taken or the waiter gave up) don't pile up in the shared response queue
+HEARTBEAT_TIME_TO_LIVE = max(1, math.ceil(2 * HEARTBEAT_INTERVAL))
+# Heartbeats keep extending a waiter's deadline, but never beyond this many seconds in total
+MAX_COMMAND_SECONDS = float(os.getenv("QUEUE_MAX_COMMAND_SECONDS", "3600"))
+
+def is_heartbeat(response: Dict) -> bool:
+    return response.get("type") == HEARTBEAT
+
+def heartbeat_tail(lines) -> List[str]:
+    """Last output lines for a heartbeat, each cut to HEARTBEAT_TAIL_LINE_CHARS"""
+    return [line[:HEARTBEAT_TAIL_LINE_CHARS] for line in list(lines)[-HEARTBEAT_TAIL_LINES:]]
+
+def is_stale_response(response: Dict, pending_messages: set) -> bool:
+    """A response nobody is waiting for (e.g. its waiter timed out) in a per-task queue"""
+    return response.get("message_id") not in pending_messages
+
+def poll_intervals(fast_window: Optional[float] = None,
+                   min_interval: Optional[float] = None,
+                   max_interval: Optional[float] = None):
+    """Yield sleep intervals for an adaptive poll loop.
+
+    Yields 0 while still inside the fast window (measured from the first call),
+    then an exponentially growing, jittered interval capped at max_interval.
+    Unset arguments use the module-level POLL_* settings at call time.
+    """
+    fast_window = POLL_FAST_WINDOW if fast_window is None else fast_window
+    min_interval = POLL_MIN_INTERVAL if min_interval is None else min_interval
+    max_interval = POLL_MAX_INTERVAL if max_interval is None else max_interval
+    start = time.monotonic()
+    interval = min_interval
+    while True:
+        if time.monotonic() - start < fast_window:
+            yield 0.0
+            continue
+        jitter = interval * POLL_JITTER
+        yield max(0.0, interval + random.uniform(-jitter, jitter))
+        interval = min(interval * POLL_BACKOFF_FACTOR, max_interval)
+
+def build_command_message(command: str, project_name: Optional[str] = None, reply_to: Optional[str] = None) -> Dict:
+    """Build the JSON payload the sandbox worker expects on the command queue"""
+    message = {
+        "command": command,
+        "project_name": project_name,
+        "message_id": str(uuid.uuid4()),  # Generate unique message ID
+        "timestamp": time.time()
+    }
+    if reply_to:
+        # Worker sends the response to this queue instead of the shared one
+        message["reply_to"] = reply_to
+    return message
+
+class QueueMetrics:
+    """RTT and counter bookkeeping shared by the sync and async queue managers"""
+
+    def _init_metrics(self) -> None:
+        self.sent_at = {}  # message_id -> send timestamp, for RTT
+        self.rtt_samples = deque(maxlen=256)  # Recent end-to-end command RTTs (seconds)
+        self.metrics = {"commands_sent": 0, "responses_received": 0, "timeouts": 0, "polls": 0}
+
+    def _record_rtt(self, message_id: str, response: Dict) -> None:
+        """Attach the end-to-end round-trip time to a response and record it"""
+        sent = self.sent_at.pop(message_id, None)
+        if sent is None:
+            return
+        rtt = time.monotonic() - sent
+        self.rtt_samples.append(rtt)
+        response["rtt_seconds"] = rtt
+        print(f"[METRIC] queue_command_rtt_seconds={rtt:.3f} message_id={message_id}")
+
+    def get_metrics(self) -> Dict:
+        """Return queue transport counters and RTT percentiles over recent commands"""
+        samples = sorted(self.rtt_samples)
+        def pct(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+        return {
+            **self.metrics,
+            "rtt_last": self.rtt_samples[-1] if self.rtt_samples else None,
+            "rtt_p50": pct(0.50),
+            "rtt_p95": pct(0.95),
+            "rtt_max": samples[-1] if samples else None,
+        }
+
+class AzureQueueManager(QueueMetrics):
+    def __init__(self, connection_string: str, queue_name: str = "commandqueue", debug: Optional[bool] = None, task_id: Optional[str] = None):
+        """Initialize Azure Queue Manager with connection string and queue names (override via COMMAND_QUEUE/RESPONSE_QUEUE env vars).
+
+        Set debug=True (or AZURE_QUEUE_DEBUG=1) to log queue diagnostics; these cost
+        extra storage round-trips per command and are off by default.
+
+        With a task_id, responses go to a private "<RESPONSE_QUEUE>-<task_id>" queue
+        that is created here and removed by cleanup(), so waiters never scan other
+        tasks' responses.
+        """
+        self.debug = _env_flag("AZURE_QUEUE_DEBUG") if debug is None else debug
         cmd_queue = os.getenv("COMMAND_QUEUE", queue_name)
         resp_queue = os.getenv("RESPONSE_QUEUE", "responsequeue")
+        self.reply_to = task_queue_name(resp_queue, task_id) if task_id else None
+        if self.reply_to:
+            resp_queue = self.reply_to
+        self.connection_string = connection_string
+        self._overflow = None  # Lazily created blob container for oversized payloads
+        print(f"[DEBUG] Initializing AzureQueueManager with connection string: {connection_string[:50]}...")
         print(f"[DEBUG] Command queue name: {cmd_queue}")
         print(f"[DEBUG] Response queue name: {resp_queue}")
-        print(f"[DEBUG] Connection string: {connection_string}")
-        print(f"[DEBUG] The command being sent is")
         try:
             self.queue_client = QueueClient.from_connection_string(connection_string, cmd_queue)
             self.response_queue = QueueClient.from_connection_string(connection_string, resp_queue)
             self.pending_messages = set()  # Track pending message IDs
-            # Queue creation is disabled; only connect to existing queues
-            # try:
-            
-            #     self.queue_client.create_queue()
-            #     print(f"[DEBUG] ✅ Command queue '{queue_name}' created/verified")
-            # except Exception as e:
-            #     if "QueueAlreadyExists" in str(e):
-            #         print(f"[DEBUG] ✅ Command queue '{queue_name}' already exists")
-            #     else:
-            #         print(f"[DEBUG] ⚠️  Command queue creation issue: {e}")
-            # try:
-            #     self.response_queue.create_queue()
-            #     print(f"[DEBUG] ✅ Response queue 'responsequeue' created/verified")
-            # except Exception as e:
-            #     if "QueueAlreadyExists" in str(e):
-            #         print(f"[DEBUG] ✅ Response queue 'responsequeue' already exists")
-            #     else:
-            #         print(f"[DEBUG] ⚠️  Response queue creation issue: {e}")
+            self._init_metrics()
+            # Shared queues are created by the ARM template; only per-task reply queues are created here.
+            if self.reply_to:
+                try:
+                    self.response_queue.create_queue()
+                except ResourceExistsError:
+                    pass
+                print(f"[DEBUG] ✅ Per-task response queue '{self.reply_to}' ready")
             print("[DEBUG] AzureQueueManager initialized successfully")
         except Exception as e:
             print(f"[ERROR] Failed to create QueueClient: {str(e)}")
             raise
-    
-    def send_command(self, command: str, project_name: Optional[str] = None) -> str:
-        """Send a command to the Azure queue and return message ID"""
-        # Log the connection string (masked for security)
-        masked_conn_str = self.queue_client.credential.account_key[:4] + '...' + self.queue_client.credential.account_key[-4:] if hasattr(self.queue_client.credential, 'account_key') else 'N/A'
-        print(f"[DEBUG] Sending command using connection string (masked): {self.queue_client.account_name} ... {masked_conn_str}")
-        message_id = str(uuid.uuid4())  # Generate unique message ID
-        message = {
-            "command": command,
-            "project_name": project_name,
-            "message_id": message_id,
-            "timestamp": time.time()
-        }
-        print(f"[DEBUG] Sending message to queue: {json.dumps(message, indent=2)}")
-        
-        # Test queue connection before sending
+
+    def cleanup(self) -> None:
+        """Delete the per-task response queue, if this manager owns one"""
+        if not self.reply_to:
+            return
         try:
-            properties = self.queue_client.get_queue_properties()
-            print(f"[DEBUG] ✅ Command queue exists: {properties.name}, message count: {properties.approximate_message_count}")
-            
-            # Extract storage account name from connection string for verification
-            storage_account = self.queue_client.account_name
-            queue_url = self.queue_client.url
-            print(f"[DEBUG] 🔗 Sending to Storage Account: {storage_account}")
-            print(f"[DEBUG] 🔗 Queue URL: {queue_url}")
-            
-        except Exception as e:
-            print(f"[DEBUG] ❌ Command queue connection error: {e}")
-            raise
-        
-        # Send message
+            self.response_queue.delete_queue()
+            print(f"[DEBUG] 🧹 Deleted per-task response queue '{self.reply_to}'")
+        except ResourceNotFoundError:
+            pass
+
+    def _overflow_container(self) -> ContainerClient:
+        """Blob container holding claim-checked payloads (created on first use)"""
+        if self._overflow is None:
+            self._overflow = ContainerClient.from_connection_string(self.connection_string, OVERFLOW_CONTAINER)
+            try:
+                self._overflow.create_container()
+            except ResourceExistsError:
+                pass
+        return self._overflow
+
+    def _send(self, queue: QueueClient, body: Dict) -> None:
+        """Send a message body, compressing or claim-checking it to blob storage when large"""
+        if is_heartbeat(body):
+            queue.send_message(json.dumps(body), time_to_live=HEARTBEAT_TIME_TO_LIVE)
+            return
+        text, upload = pack(body)
+        if upload:
+            blob_name, data = upload
+            self._overflow_container().upload_blob(blob_name, data, overwrite=True)
+            print(f"[DEBUG] 📦 Payload for {body.get('message_id')} overflowed to blob {blob_name} ({len(data)} bytes)")
+        queue.send_message(text)
+
+    def _unpack(self, envelope: Dict) -> Dict:
+        """Decode a received message, fetching and deleting its overflow blob if claim-checked"""
+        blob_name = blob_ref(envelope)
+        if not blob_name:
+            return unpack(envelope)
+        blob = self._overflow_container().get_blob_client(blob_name)
+        body = unpack(envelope, blob.download_blob().readall())
+        self._discard_overflow(envelope)
+        return body
+
+    def _discard_overflow(self, envelope: Dict) -> None:
+        """Delete the overflow blob of a claim-checked message, if any"""
+        blob_name = blob_ref(envelope)
+        if not blob_name:
+            return
         try:
-            result = self.queue_client.send_message(json.dumps(message))
-            print(f"[DEBUG] ✅ Message sent successfully. Result: {result}")
-        except Exception as e:
-            print(f"[DEBUG] ❌ Failed to send message: {e}")
-            raise
-        
-        # Verify message was added to queue
+            self._overflow_container().delete_blob(blob_name)
+        except ResourceNotFoundError:
+            pass
+
+    def _log_queue_diagnostics(self) -> None:
+        """Log queue depth and peek at pending messages (debug mode only; costs two round-trips)"""
         try:
             properties = self.queue_client.get_queue_properties()
+            print(f"[DEBUG] 🔗 Storage Account: {self.queue_client.account_name}, Queue URL: {self.queue_client.url}")
             print(f"[DEBUG] 📊 Queue depth after sending: {properties.approximate_message_count} messages")
-            
-            # Double-check by trying to peek at the message
             peeked_messages = self.queue_client.peek_messages(max_messages=5)
             print(f"[DEBUG] 👀 Peeked {len(peeked_messages)} messages from queue:")
             for i, msg in enumerate(peeked_messages):
                 try:
                     content = json.loads(msg.content)
                     print(f"[DEBUG]   Message {i+1}: ID={content.get('message_id', 'unknown')}, command='{content.get('command', 'unknown')[:50]}...'")
-                except:
+                except Exception:
                     print(f"[DEBUG]   Message {i+1}: Raw content={msg.content[:100]}...")
-                    
         except Exception as e:
             print(f"[DEBUG] ⚠️  Could not verify queue depth: {e}")
-        
+
+    def send_command(self, command: str, project_name: Optional[str] = None) -> str:
+        """Send a command to the Azure queue and return message ID"""
+        message = build_command_message(command, project_name, self.reply_to)
+        message_id = message["message_id"]
+        if self.debug:
+            print(f"[DEBUG] Sending message to queue: {json.dumps(message, indent=2)}")
+
+        try:
+            self._send(self.queue_client, message)
+        except Exception as e:
+            print(f"[DEBUG] ❌ Failed to send message: {e}")
+            raise
+
+        if self.debug:
+            self._log_queue_diagnostics()
+
+        self.sent_at[message_id] = time.monotonic()
         self.pending_messages.add(message_id)
-        print(f"[DEBUG] Message ID {message_id} added to pending_messages")
+        self.metrics["commands_sent"] += 1
         return message_id
-    
-    def wait_for_response(self, message_id: str, timeout: int = 300) -> Dict:
-        """Wait for response from the container instance"""
+
+    def send_response(self, response: Dict, reply_to: Optional[str] = None) -> None:
+        """Publish a worker response (must carry message_id) to reply_to or the response queue"""
+        queue = self.response_queue
+        if reply_to and reply_to != self.reply_to:
+            queue = QueueClient.from_connection_string(self.connection_string, reply_to)
+        self._send(queue, response)
+
+    def wait_for_response(self, message_id: str, timeout: int = 300, on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Wait for response from the container instance, polling adaptively.
+
+        timeout is the longest the waiter tolerates silence: every heartbeat for
+        message_id pushes the deadline out again (up to MAX_COMMAND_SECONDS) and is
+        passed to on_progress.
+        """
         # Add message_id to pending_messages if not already there
         if message_id not in self.pending_messages:
             self.pending_messages.add(message_id)
-            
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            messages = self.response_queue.receive_messages(messages_per_page=32)
+
+        started = time.monotonic()
+        deadline = started + timeout
+        intervals = poll_intervals()
+        while time.monotonic() < deadline:
+            self.metrics["polls"] += 1
+            messages = self.response_queue.receive_messages(
+                messages_per_page=32,
+                visibility_timeout=RESPONSE_SCAN_VISIBILITY_TIMEOUT
+            )
             for message in messages:
                 try:
                     response = json.loads(message.content)
-                    if response.get("message_id") == message_id:
-                        # Delete the response message after receiving it
-                        self.response_queue.delete_message(message.id, message.pop_receipt)
-                        self.pending_messages.remove(message_id)
-                        return response
                 except json.JSONDecodeError:
                     continue
-            time.sleep(5)  # Wait 5 seconds before checking again
+                if response.get("message_id") == message_id:
+                    # Unpack first: a packed envelope hides the body's "type"
+                    response = self._unpack(response)
+                    if is_heartbeat(response):
+                        # Command is still running; consume the heartbeat and extend the deadline
+                        self.response_queue.delete_message(message.id, message.pop_receipt)
+                        deadline = min(time.monotonic() + timeout, started + MAX_COMMAND_SECONDS)
+                        if on_progress:
+                            on_progress(response)
+                        continue
+                    # Delete the response message after receiving it
+                    self.response_queue.delete_message(message.id, message.pop_receipt)
+                    self.pending_messages.discard(message_id)
+                    self.metrics["responses_received"] += 1
+                    self._record_rtt(message_id, response)
+                    return response
+                if self.reply_to and is_stale_response(response, self.pending_messages):
+                    self.response_queue.delete_message(message.id, message.pop_receipt)
+                    self._discard_overflow(response)
+            time.sleep(min(next(intervals), max(0.0, deadline - time.monotonic())))
+        self.metrics["timeouts"] += 1
+        self.sent_at.pop(message_id, None)
+        self.pending_messages.discard(message_id)
         raise TimeoutError(f"No response received for message {message_id} within {timeout} seconds")
-    
-    def execute_command(self, command: str, project_name: Optional[str] = None) -> Dict:
+
+    def execute_command(self, command: str, project_name: Optional[str] = None, on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
         """Execute a command and wait for response"""
         message_id = self.send_command(command, project_name)
-        return self.wait_for_response(message_id) 
+        return self.wait_for_response(message_id, on_progress=on_progress)
 
     def receive_command(self, timeout: int = 30) -> Optional[Dict]:
         """Receive a single command message from the command queue"""
@@ -142,7 +335,7 @@ class AzureQueueManager:
                 continue
             # remove message from queue and return payload
             self.queue_client.delete_message(msg.id, msg.pop_receipt)
-            return payload
+            return self._unpack(payload)
         return None
 
     def receive_response(self, timeout: int = 30) -> Optional[Dict]:
@@ -159,5 +352,33 @@ class AzureQueueManager:
                 continue
             # remove message from queue and return payload
             self.response_queue.delete_message(msg.id, msg.pop_receipt)
-            return payload
-        return None
\ No newline at end of file
+            return self._unpack(payload)
+        return None
+
+    def receive_commands(self, max_messages: int = 32, visibility_timeout: int = 60) -> List[Tuple[Dict, QueueMessage]]:
+        """Receive a batch of commands without deleting them.
+
+        Returns (payload, message) pairs; keep long commands hidden with
+        extend_visibility() and delete them with complete_command() once answered.
+        """
+        batch = []
+        messages = self.queue_client.receive_messages(
+            messages_per_page=max_messages, max_messages=max_messages, visibility_timeout=visibility_timeout
+        )
+        for msg in messages:
+            try:
+                payload = json.loads(msg.content)
+            except json.JSONDecodeError:
+                # discard invalid message
+                self.queue_client.delete_message(msg.id, msg.pop_receipt)
+                continue
+            batch.append((self._unpack(payload), msg))
+        return batch
+
+    def extend_visibility(self, message: QueueMessage, visibility_timeout: int = 60) -> QueueMessage:
+        """Keep a received command hidden from other workers; returns the message with its new pop receipt"""
+        return self.queue_client.update_message(message, visibility_timeout=visibility_timeout)
+
+    def complete_command(self, message: QueueMessage) -> None:
+        """Delete a command received with receive_commands() once its response is published"""
+        self.queue_client.delete_message(message.id, message.pop_receipt)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import json
 import logging
@@ -13,6 +14,10 @@ from jinja2 import Environment, FileSystemLoader
 from codex_agent.kernel_agent import execute_terminal_command
 from codex_agent.models import TaskState, CommandEntry
 from codex_agent.azure_queue import AzureQueueManager
+from codex_agent.async_azure_queue import AsyncAzureQueueManager
+from codex_agent.transports import SandboxTransport, create_transport
+from codex_agent.documentation_feed import DocumentationFeed
+from codex_agent.doc_retrieval import DocumentationIndex, build_query, estimate_tokens
 
 # Configure logging to print to terminal
 logging.basicConfig(
@@ -96,85 +101,165 @@ def execute_command(command: str, project_name: Optional[str], container_type: s
         print(f"[DEBUG] Executing command locally: {command}")
         return execute_terminal_command(command)
 
-async def complete_task_with_ws_streaming(task_name: str, repo_url: str, project_name: str, container_type: str, connection_string: str, broadcast_func, task_id: str) -> List[Tuple[str, str]]:
-    """
-    Complete task with WebSocket streaming - broadcasts commands/responses in real-time
-    """
-    import asyncio
-    
-    print(f"\n[INFO] Starting task: {task_name}")
-    logger.info(f"Starting task: {task_name} with {container_type} container")
-    
-    # Initialize Azure queue if using azure container
-    azure_queue = None
-    if container_type == "azure" and connection_string:
-        azure_queue = initialize_azure_queue(connection_string)
+async def initialize_async_azure_queue(connection_string: str, task_id: Optional[str] = None) -> Optional[AsyncAzureQueueManager]:
+    """Initialize the asyncio Azure Queue Manager; with PER_TASK_RESPONSE_QUEUES set, responses use a private queue for task_id"""
+    try:
+        per_task = os.getenv("PER_TASK_RESPONSE_QUEUES", "").lower() in ("1", "true", "yes", "on")
+        azure_queue = AsyncAzureQueueManager(connection_string, task_id=task_id if per_task else None)
+        await azure_queue.setup()
+        return azure_queue
+    except Exception as e:
+        print(f"[ERROR] Failed to initialize async Azure Queue Manager: {str(e)}")
+        return None
+
+async def initialize_transport(container_type: str, connection_string: Optional[str], task_id: Optional[str] = None) -> SandboxTransport:
+    """Build the sandbox transport selected by the task's container_type (see codex_agent.transports)"""
+    if container_type == "azure":
+        if not connection_string:
+            print("[INFO] No Azure connection string - falling back to local container")
+            return create_transport("local")
+        azure_queue = await initialize_async_azure_queue(connection_string, task_id)
         if not azure_queue:
             raise Exception("Failed to initialize Azure queue")
-        print("[INFO] Using azure container instance")
-    else:
-        print("[INFO] Using local container")
+        return create_transport("azure", queue=azure_queue)
+    return create_transport(container_type)
+
+# Minimum seconds between "progress" broadcasts built from streamed output lines
+PROGRESS_FLUSH_SECONDS = 0.5
+
+async def execute_with_progress(transport: SandboxTransport, command: str, project_path: Optional[str], broadcast_func, task_id: str, message_id: str) -> Dict:
+    """Execute a command through the transport, forwarding heartbeats and output to the WebSocket stream as "progress" events"""
+    result = {"success": False, "stdout": "", "stderr": "", "error": "No result from sandbox"}
+    pending_output = []
+    last_flush = time.monotonic()
+    async for chunk in transport.stream(command, project_path):
+        if chunk["type"] == "result":
+            result = {k: v for k, v in chunk.items() if k != "type"}
+        elif chunk["type"] == "progress":
+            await broadcast_func("progress", {
+                "task_id": task_id,
+                "message_id": message_id,
+                "elapsed": chunk.get("elapsed"),
+                "output_bytes": chunk.get("output_bytes"),
+                "tail": chunk.get("tail", [])
+            })
+        elif chunk["type"] == "output":
+            pending_output.append(chunk["data"])
+            if time.monotonic() - last_flush >= PROGRESS_FLUSH_SECONDS:
+                await broadcast_func("progress", {
+                    "task_id": task_id,
+                    "message_id": message_id,
+                    "output": "".join(pending_output)
+                })
+                pending_output = []
+                last_flush = time.monotonic()
+    return result
+
+async def prepare_workspace(repo_url: str, project_name: str, container_type: str, connection_string: Optional[str], broadcast_func, task_id: str) -> Tuple[SandboxTransport, str]:
+    """Open the sandbox transport and clone the repository; returns the transport and project path.
+
+    Split out of complete_task_with_ws_streaming so the research pipeline can run
+    it while browsers are still collecting documentation.
+    """
+    # Select the sandbox transport for this task
+    transport = await initialize_transport(container_type, connection_string, task_id)
+    print(f"[INFO] Using {transport.name} sandbox transport")
     
-    # Clone repository first
-    print(f"\n[INFO] Cloning repository: {repo_url}")
-    logger.info(f"Cloning repository: {repo_url}")
+    try:
+        # Clone repository first
+        print(f"\n[INFO] Cloning repository: {repo_url}")
+        logger.info(f"Cloning repository: {repo_url}")
     
-    project_path = f"/projects/{project_name}"
-    clone_command = f"git clone {repo_url} {project_path}"
+        project_path = f"/projects/{project_name}"
+        clone_command = f"git clone {repo_url} {project_path}"
     
-    # Broadcast git clone command
-    await broadcast_func("command", {
-        "command": clone_command,
-        "task_id": task_id,
-        "timestamp": time.time(),
-        "message_id": f"clone_{task_id}"
-    })
+        # Broadcast git clone command
+        await broadcast_func("command", {
+            "command": clone_command,
+            "task_id": task_id,
+            "timestamp": time.time(),
+            "message_id": f"clone_{task_id}"
+        })
     
-    clone_result = execute_command(clone_command, None, container_type, azure_queue)
+        clone_result = await execute_with_progress(transport, clone_command, None, broadcast_func, task_id, f"clone_{task_id}")
     
-    # Broadcast git clone response
-    await broadcast_func("response", {
-        "task_id": task_id,
-        "message_id": f"clone_{task_id}",
-        "success": clone_result.get("success"),
-        "stdout": clone_result.get("stdout", ""),
-        "stderr": clone_result.get("stderr", ""),
-        "output": clone_result.get("stdout", clone_result.get("stderr", ""))
-    })
+        # Broadcast git clone response
+        await broadcast_func("response", {
+            "task_id": task_id,
+            "message_id": f"clone_{task_id}",
+            "success": clone_result.get("success"),
+            "stdout": clone_result.get("stdout", ""),
+            "stderr": clone_result.get("stderr", ""),
+            "output": clone_result.get("stdout", clone_result.get("stderr", ""))
+        })
     
-    if not clone_result.get("success"):
-        error_msg = f"Failed to clone repository: {clone_result.get('error', 'Unknown error')}"
-        await broadcast_func("error", {"task_id": task_id, "message": error_msg})
-        raise Exception(error_msg)
+        if not clone_result.get("success"):
+            error_msg = f"Failed to clone repository: {clone_result.get('error', 'Unknown error')}"
+            await broadcast_func("error", {"task_id": task_id, "message": error_msg})
+            raise Exception(error_msg)
     
-    print(f"\n[INFO] Repository cloned successfully. Working directory: {project_path}")
+        print(f"\n[INFO] Repository cloned successfully. Working directory: {project_path}")
     
+        return transport, project_path
+    except BaseException:
+        await transport.close()
+        raise
+
+async def run_codex_loop(transport: SandboxTransport, task_name: str, project_path: str, broadcast_func, task_id: str, documentation: Optional[DocumentationFeed] = None) -> List[Tuple[str, str]]:
+    """Generate and execute commands until TASK_COMPLETED; documentation that reaches the feed is indexed
+    and each prompt carries the chunks most relevant to the last command (see codex_agent.doc_retrieval)"""
     # Initialize command history
     command_history = []
-    
+    injected_docs = 0
+    doc_index = DocumentationIndex()
+
     # Main task loop
     for iteration in range(50):  # Max 50 commands
         print(f"\n[INFO] === Iteration {iteration + 1} ===")
-        
+
+        # Index documentation that arrived since the last prompt
+        doc_entries = documentation.entries() if documentation else []
+        if len(doc_entries) > injected_docs:
+            new_sources = [key for key, _ in doc_entries[injected_docs:]]
+            chunk_count = sum(doc_index.add(key, text) for key, text in doc_entries[injected_docs:])
+            print(f"[INFO] Indexed {chunk_count} chunks from {len(new_sources)} new documentation source(s): {new_sources}")
+            await broadcast_func("documentation", {
+                "task_id": task_id,
+                "sources": new_sources,
+                "total_sources": len(doc_entries),
+                "indexed_chunks": len(doc_index),
+                "message": f"Indexed {len(new_sources)} documentation source(s) for the prompt"
+            })
+            injected_docs = len(doc_entries)
+
+        # Only the chunks relevant to the last command and output go into the prompt
+        doc_chunks = doc_index.select(build_query(task_name, command_history))
+        if doc_chunks:
+            doc_tokens = sum(estimate_tokens(text) for _, text in doc_chunks)
+            print(f"[DEBUG] Prompt documentation: {len(doc_chunks)} of {len(doc_index)} chunks (~{doc_tokens} tokens)")
+
         # Generate command prompt
         prompt = template.render(
             task_name=task_name,
             command_history=command_history,
+            documentation=doc_chunks,
             current_time=datetime.now().isoformat(),
             total_commands=len(command_history)
         )
-        
+
         print(f"\n[INFO] Generated prompt:")
         print("-" * 50)
         print(prompt)
         print("-" * 50)
-        
+
         # Get command from OpenAI API
         print("\n[INFO] Calling OpenAI API...")
         logger.info("Making OpenAI API call with gpt-4o-mini model")
-        
+
         try:
-            response = get_openai_client().chat.completions.create(
+            # Off the event loop: the research browsers and WebSocket streams share it
+            response = await asyncio.to_thread(
+                get_openai_client().chat.completions.create,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -185,7 +270,7 @@ async def complete_task_with_ws_streaming(task_name: str, repo_url: str, project
                 temperature=0.1,
                 max_tokens=500
             )
-            
+
             # Debug the full API response
             print(f"[DEBUG] 🤖 OpenAI API Response:")
             print(f"[DEBUG] 🤖 Response ID: {getattr(response, 'id', 'No ID')}")
@@ -195,32 +280,32 @@ async def complete_task_with_ws_streaming(task_name: str, repo_url: str, project
             print(f"[DEBUG] 🤖 Message role: {response.choices[0].message.role if response.choices and len(response.choices) > 0 and response.choices[0].message else 'No role'}")
             print(f"[DEBUG] 🤖 Raw content: '{response.choices[0].message.content if response.choices and len(response.choices) > 0 and response.choices[0].message else 'No content'}'")
             print(f"[DEBUG] 🤖 Content length: {len(response.choices[0].message.content) if response.choices and len(response.choices) > 0 and response.choices[0].message and response.choices[0].message.content else 0}")
-            
+
             if response.choices and len(response.choices) > 0:
                 command = response.choices[0].message.content.strip()
             else:
                 print("[ERROR] 🤖 No choices in OpenAI API response!")
                 logger.error("No choices in OpenAI API response")
                 command = ""
-                
+
         except Exception as api_error:
             print(f"[ERROR] 🤖 OpenAI API call failed: {str(api_error)}")
             logger.error(f"OpenAI API call failed: {str(api_error)}")
             print("[INFO] Retrying with a simple fallback command...")
             command = "pwd"  # Simple fallback command
-        
+
         print(f"\n[INFO] Generated command: '{command}'")
         logger.info(f"Generated command: '{command}'")
-        
+
         # Log empty commands but continue execution
         if not command or command.strip() == "":
             print("\n[WARNING] 🤖 OpenAI API returned empty command - will attempt to execute anyway")
             logger.warning("OpenAI API returned empty command - will attempt to execute anyway")
             print("[INFO] This might be due to API rate limiting or model issues")
-        
+
         print(f"\n[INFO] Executing command: {command}")
         logger.info(f"Executing command: {command}")
-        
+
         # Check for completion signal
         if command == "TASK_COMPLETED":
             print("\n[INFO] ✅ Task completed successfully!")
@@ -231,10 +316,10 @@ async def complete_task_with_ws_streaming(task_name: str, repo_url: str, project
                 "message": "Task completed - TASK_COMPLETED signal received"
             })
             break
-        
+
         # Generate message ID for this command
         message_id = f"cmd_{task_id}_{iteration}"
-        
+
         # Broadcast command before execution
         await broadcast_func("command", {
             "command": command,
@@ -242,13 +327,13 @@ async def complete_task_with_ws_streaming(task_name: str, repo_url: str, project
             "timestamp": time.time(),
             "message_id": message_id
         })
-        
+
         # Execute command
-        result = execute_command(command, project_path, container_type, azure_queue)
-        
+        result = await execute_with_progress(transport, command, project_path, broadcast_func, task_id, message_id)
+
         # Extract output
         output = result.get("stdout") or result.get("output") or result.get("stderr") or "No output"
-        
+
         # Broadcast response after execution
         await broadcast_func("response", {
             "task_id": task_id,
@@ -256,24 +341,38 @@ async def complete_task_with_ws_streaming(task_name: str, repo_url: str, project
             "success": result.get("success"),
             "stdout": result.get("stdout", ""),
             "stderr": result.get("stderr", ""),
-            "output": output
+            "output": output,
+            "rtt_seconds": result.get("rtt_seconds")
         })
-        
+
         print(f"\n[INFO] Command output:")
         print("-" * 50)
         print(output)
         print("-" * 50)
         logger.info(f"Command output: {output}")
-        
+
         # Add to command history
         command_history.append((command, output))
-        
+
         # Simulated approval for streaming mode
         print("Do you want to continue with the next command? (y/n): y")
         print("[INFO] Auto-approved command for real-time streaming")
-    
+
     return command_history
 
+async def complete_task_with_ws_streaming(task_name: str, repo_url: str, project_name: str, container_type: str, connection_string: str, broadcast_func, task_id: str, documentation: Optional[DocumentationFeed] = None) -> List[Tuple[str, str]]:
+    """
+    Complete task with WebSocket streaming - broadcasts commands/responses in real-time
+    """
+    print(f"\n[INFO] Starting task: {task_name}")
+    logger.info(f"Starting task: {task_name} with {container_type} container")
+
+    transport, project_path = await prepare_workspace(repo_url, project_name, container_type, connection_string, broadcast_func, task_id)
+    try:
+        return await run_codex_loop(transport, task_name, project_path, broadcast_func, task_id, documentation)
+    finally:
+        await transport.close()
+
 def complete_task(task_name: str, repo_url: str, project_name: str, container_type: str = "azure", connection_string: Optional[str] = None) -> List[Tuple[str, str]]:
     """
     Execute a task using GPT-4 to generate and execute Linux commands.
@@ -0,0 +1,134 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+# Documentation added to each codex prompt: at most DOCS_PROMPT_TOP_K chunks and
+# roughly DOCS_PROMPT_TOKEN_BUDGET tokens, picked for the latest command and output
+DOCS_PROMPT_TOP_K = int(os.getenv("CODEX_DOCS_TOP_K", "4"))
+DOCS_PROMPT_TOKEN_BUDGET = int(os.getenv("CODEX_DOCS_TOKEN_BUDGET", "1500"))
+# Shared with the documentation knowledge base so both split documentation the same way
+CHUNK_CHARS = 1500
+CHUNK_OVERLAP = 200
+# Only the end of a long command output is used as the query (errors show up last)
+QUERY_OUTPUT_CHARS = 2000
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "you", "your", "not",
+    "but", "can", "use", "all", "any", "its", "into", "has", "have", "will", "one", "our", "out",
+}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words and identifiers; snake_case and dotted names also yield their parts"""
+    terms = []
+    for word in re.findall(r"[a-z0-9_.]+", text.lower()):
+        word = word.strip("._")
+        if len(word) < 2:
+            continue
+        parts = [p for p in re.split(r"[._]", word) if len(p) > 1]
+        if len(parts) > 1:
+            terms.append(word)
+        terms.extend(p for p in parts if p not in _STOPWORDS)
+    return terms
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into ~max_chars chunks on paragraph boundaries, overlapping long splits"""
+    chunks, current = [], ""
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        while len(paragraph) > max_chars:
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars - overlap:]
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+def build_query(task_name: str, command_history: Sequence[Tuple[str, str]]) -> str:
+    """Retrieval query for the next prompt: the task plus the last command and the tail of its output"""
+    if not command_history:
+        return task_name
+    command, output = command_history[-1]
+    return f"{task_name}\n{command}\n{(output or '')[-QUERY_OUTPUT_CHARS:]}"
+
+class DocumentationIndex:
+    """BM25 index over one codex task's documentation chunks.
+
+    Documentation is chunked and indexed once, as it arrives; each prompt then
+    carries only the chunks that best match the current query instead of the
+    full text on every iteration.
+    """
+
+    def __init__(self):
+        self._chunks: List[Dict] = []
+        self._doc_freq: Counter = Counter()
+        self._total_length = 0
+        self.sources: List[str] = []
+
+    def add(self, source: str, text: str) -> int:
+        """Chunk and index one documentation source; returns the number of chunks added"""
+        if source in self.sources:
+            return 0
+        self.sources.append(source)
+        added = 0
+        for chunk in chunk_text(text):
+            terms = Counter(tokenize(chunk))
+            if not terms:
+                continue
+            length = sum(terms.values())
+            self._chunks.append({"source": source, "text": chunk, "terms": terms, "length": length})
+            self._doc_freq.update(terms.keys())
+            self._total_length += length
+            added += 1
+        return added
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def _score(self, chunk: Dict, query_terms: Counter) -> float:
+        n = len(self._chunks)
+        avg_length = self._total_length / n
+        score = 0.0
+        for term, query_count in query_terms.items():
+            tf = chunk["terms"].get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (n - self._doc_freq[term] + 0.5) / (self._doc_freq[term] + 0.5))
+            score += query_count * idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * chunk["length"] / avg_length))
+        return score
+
+    def select(self, query: str, k: int = DOCS_PROMPT_TOP_K,
+               token_budget: int = DOCS_PROMPT_TOKEN_BUDGET) -> List[Tuple[str, str]]:
+        """(source, text) of the top-k chunks for the query that fit in token_budget.
+
+        Ties (including no overlap at all) go to earlier chunks, so the start of
+        the documentation is used until the query says otherwise.
+        """
+        if not self._chunks or k <= 0:
+            return []
+        query_terms = Counter(tokenize(query))
+        ranked = sorted(range(len(self._chunks)), key=lambda i: (-self._score(self._chunks[i], query_terms), i))
+        selected, used = [], 0
+        for i in ranked:
+            if len(selected) >= k:
+                break
+            chunk = self._chunks[i]
+            cost = estimate_tokens(chunk["text"])
+            if used + cost > token_budget:
+                continue
+            selected.append((chunk["source"], chunk["text"]))
+            used += cost
+        return selected
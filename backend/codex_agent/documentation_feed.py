@@ -0,0 +1,43 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+
+class DocumentationFeed:
+    """Documentation that keeps arriving while a codex task is already running.
+
+    Research publishes one entry per finished browser (or knowledge-base hit);
+    the codex loop reads whatever has arrived before rendering each prompt.
+    """
+
+    def __init__(self):
+        self._docs: Dict[str, str] = {}
+        self._changed = asyncio.Event()
+        self.closed = False
+
+    def add(self, key: str, text: str) -> None:
+        """Add a documentation entry; later entries with the same key are ignored"""
+        if self.closed or not text or key in self._docs:
+            return
+        self._docs[key] = text
+        self._changed.set()
+
+    def close(self) -> None:
+        """Mark research as finished: no further entries will arrive"""
+        self.closed = True
+        self._changed.set()
+
+    async def wait_for_first(self, timeout: float) -> bool:
+        """Wait until an entry arrives, research finishes or timeout passes; True if any documentation is available"""
+        if not self._docs and not self.closed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return bool(self._docs)
+
+    def entries(self) -> List[Tuple[str, str]]:
+        """(key, text) pairs in arrival order"""
+        return list(self._docs.items())
+
+    def __len__(self) -> int:
+        return len(self._docs)
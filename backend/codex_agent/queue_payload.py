@@ -0,0 +1,53 @@
+import base64
+import json
+import os
+import uuid
+import zlib
+from typing import Dict, Optional, Tuple
+
+# Azure queue messages are capped at 64 KiB of text. Bodies above the compress
+# threshold are zlib-compressed inline; anything still above the inline cap is
+# uploaded to blob storage and only a reference (claim check) is queued.
+COMPRESS_THRESHOLD = int(os.getenv("QUEUE_COMPRESS_THRESHOLD", "4096"))
+MAX_INLINE_BYTES = int(os.getenv("QUEUE_MAX_INLINE_BYTES", str(48 * 1024)))
+OVERFLOW_CONTAINER = os.getenv("QUEUE_OVERFLOW_CONTAINER", "queueoverflow")
+
+ENCODING_ZLIB = "zlib"
+ENCODING_BLOB = "zlib+blob"
+
+def pack(body: Dict) -> Tuple[str, Optional[Tuple[str, bytes]]]:
+    """Encode a message body for the queue.
+
+    Returns (message_text, upload) where upload is a (blob_name, data) pair the
+    caller must upload to OVERFLOW_CONTAINER before sending message_text, or None.
+    Small bodies are sent as plain JSON so older workers can still read them.
+    """
+    raw = json.dumps(body)
+    if len(raw.encode()) <= COMPRESS_THRESHOLD:
+        return raw, None
+    compressed = zlib.compress(raw.encode(), 6)
+    envelope = {"message_id": body.get("message_id"), "encoding": ENCODING_ZLIB,
+                "data": base64.b64encode(compressed).decode()}
+    text = json.dumps(envelope)
+    if len(text) <= MAX_INLINE_BYTES:
+        return text, None
+    blob_name = f"{body.get('message_id') or 'msg'}-{uuid.uuid4().hex[:8]}.json.z"
+    envelope = {"message_id": body.get("message_id"), "encoding": ENCODING_BLOB, "blob": blob_name}
+    return json.dumps(envelope), (blob_name, compressed)
+
+def blob_ref(envelope: Dict) -> Optional[str]:
+    """Name of the overflow blob holding this message's body, if it was claim-checked"""
+    if envelope.get("encoding") == ENCODING_BLOB:
+        return envelope.get("blob")
+    return None
+
+def unpack(envelope: Dict, blob_data: Optional[bytes] = None) -> Dict:
+    """Decode a queue message parsed from JSON; blob_data is the downloaded overflow blob for claim-checked messages"""
+    encoding = envelope.get("encoding")
+    if encoding == ENCODING_ZLIB:
+        return json.loads(zlib.decompress(base64.b64decode(envelope["data"])))
+    if encoding == ENCODING_BLOB:
+        if blob_data is None:
+            raise ValueError(f"Message {envelope.get('message_id')} references blob {envelope.get('blob')} but no data was supplied")
+        return json.loads(zlib.decompress(blob_data))
+    return envelope
@@ -0,0 +1,207 @@
+"""
+Concurrent Python sandbox worker for the Azure queue transport.
+
+A drop-in alternative to the Node polling loop in sandbox_image/index.js:
+
+- receives commands in batches (only as many as there are free slots)
+- runs them concurrently, bounded by SANDBOX_WORKER_CONCURRENCY (default 2x cores)
+- serializes commands for the same project so one workspace is never mutated in parallel
+- extends message visibility while a command is queued or running, so long
+  builds are not redelivered to another worker
+- publishes responses (to the sender's reply_to queue when given) and
+  periodic heartbeats for in-flight commands
+- answers and removes a command that still fails after SANDBOX_WORKER_MAX_ATTEMPTS
+  deliveries, instead of retrying it forever
+
+Run inside the sandbox with:  python -m codex_agent.sandbox_worker
+"""
+import asyncio
+import logging
+import os
+import signal
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Dict, Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from .async_azure_queue import AsyncAzureQueueManager, close_shared_transport
+from .azure_queue import HEARTBEAT, HEARTBEAT_INTERVAL, HEARTBEAT_TAIL_LINES, heartbeat_tail, poll_intervals
+from .transports import PROJECTS_DIR, SandboxTransport, SubprocessTransport
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Deliveries of a failing command before it is answered with an error and removed
+SANDBOX_WORKER_MAX_ATTEMPTS = int(os.getenv("SANDBOX_WORKER_MAX_ATTEMPTS", "3"))
+
+class SandboxWorker:
+    """Consumes the command queue and executes commands with bounded, per-project-serialized concurrency"""
+
+    def __init__(
+        self,
+        queue: AsyncAzureQueueManager,
+        concurrency: Optional[int] = None,
+        projects_dir: str = PROJECTS_DIR,
+        visibility_timeout: int = 60,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        batch_size: int = 32,
+        transport: Optional[SandboxTransport] = None,
+        max_attempts: int = SANDBOX_WORKER_MAX_ATTEMPTS,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency or int(os.getenv("SANDBOX_WORKER_CONCURRENCY", str(2 * (os.cpu_count() or 1))))
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = f"worker-{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.projects_dir = projects_dir
+        self.transport = transport or SubprocessTransport(root=projects_dir)
+        self._project_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self.stats = {"received": 0, "completed": 0, "failed": 0}
+
+    def stop(self) -> None:
+        """Stop receiving new commands; in-flight commands are allowed to finish"""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Receive and dispatch commands until stop() is called"""
+        logger.info(f"{self.worker_id} started with concurrency {self.concurrency}")
+        intervals = poll_intervals()
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._inflight)
+            if free <= 0:
+                await asyncio.wait(list(self._inflight.values()), return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                batch = await self.queue.receive_commands(min(free, self.batch_size), self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"Failed to receive commands: {e}")
+                batch = []
+            if not batch:
+                await self._sleep(next(intervals))
+                continue
+            intervals = poll_intervals()  # work arrived: go back to fast polling
+            for payload, message in batch:
+                self.stats["received"] += 1
+                key = payload.get("message_id") or message.id
+                self._inflight[key] = asyncio.create_task(self._handle(payload, message))
+                self._inflight[key].add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        if self._inflight:
+            logger.info(f"Waiting for {len(self._inflight)} in-flight command(s) to finish")
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _keepalive(self, payload: Dict, state: Dict) -> None:
+        """Extend the command's visibility and publish heartbeats until state["done"] is set"""
+        started = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(state["done"].wait(), timeout=min(self.heartbeat_interval, self.visibility_timeout / 2))
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                state["message"] = await self.queue.extend_visibility(state["message"], self.visibility_timeout)
+                await self.queue.send_response({
+                    "message_id": payload.get("message_id"),
+                    "type": HEARTBEAT,
+                    "state": state["phase"],
+                    "elapsed": time.monotonic() - started,
+                    "output_bytes": state["output_bytes"],
+                    "tail": heartbeat_tail(state["tail"]),
+                    "worker_id": self.worker_id,
+                }, payload.get("reply_to"))
+            except Exception as e:
+                logger.warning(f"Keepalive failed for {payload.get('message_id')}: {e}")
+
+    async def _run(self, command: str, project_name: Optional[str], state: Dict) -> Dict:
+        """Execute a command while recording output size and tail lines for heartbeats"""
+        result = {"success": False, "stdout": "", "stderr": "", "error": "No result"}
+        async for chunk in self.transport.stream(command, project_name):
+            if chunk["type"] == "output":
+                state["output_bytes"] += len(chunk["data"].encode())
+                state["tail"].append(chunk["data"].rstrip("\n"))
+            else:
+                result = {k: v for k, v in chunk.items() if k != "type"}
+        return result
+
+    async def _respond(self, payload: Dict, result: Dict) -> None:
+        """Publish the final response, dropping it if the sender's reply queue is gone"""
+        try:
+            await self.queue.send_response({"message_id": payload.get("message_id"), **result}, payload.get("reply_to"))
+        except ResourceNotFoundError:
+            # The waiter timed out or its task ended and deleted the queue
+            logger.info(f"Reply queue gone for {payload.get('message_id')}, dropping the response")
+
+    async def _handle(self, payload: Dict, message) -> None:
+        message_id = payload.get("message_id")
+        project_name = payload.get("project_name")
+        state = {"message": message, "phase": "queued", "output_bytes": 0, "tail": deque(maxlen=HEARTBEAT_TAIL_LINES),
+                 "done": asyncio.Event()}
+        keepalive = asyncio.create_task(self._keepalive(payload, state))
+        try:
+            # Key by resolved workspace path; commands without a project share the root
+            workspace = os.path.normpath(os.path.join(self.projects_dir, project_name or ""))
+            try:
+                async with self._project_locks[workspace]:
+                    state["phase"] = "running"
+                    result = await self._run(payload.get("command", ""), project_name, state)
+            finally:
+                # Let an in-flight keepalive finish: it may be rotating the pop receipt,
+                # and no heartbeat may follow the response
+                state["done"].set()
+                await keepalive
+            await self._respond(payload, result)
+            await self.queue.complete_command(state["message"])
+            self.stats["completed" if result.get("success") else "failed"] += 1
+            logger.info(f"Completed {message_id} (success={result.get('success')})")
+        except Exception as e:
+            self.stats["failed"] += 1
+            if (message.dequeue_count or 0) < self.max_attempts:
+                # Leave the message to reappear after its visibility timeout for a retry
+                logger.error(f"Failed to process {message_id}: {e}")
+                return
+            logger.error(f"Giving up on {message_id} after {message.dequeue_count} attempts: {e}")
+            try:
+                await self._respond(payload, {"success": False, "stdout": "", "stderr": "",
+                                              "error": f"Command failed after {message.dequeue_count} attempts: {e}"})
+                await self.queue.complete_command(state["message"])
+            except Exception as e:
+                logger.error(f"Could not remove {message_id}: {e}")
+        finally:
+            keepalive.cancel()
+
+async def main() -> None:
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    if not connection_string:
+        raise ValueError("AZURE_STORAGE_CONNECTION_STRING environment variable is required")
+    queue = AsyncAzureQueueManager(connection_string)
+    worker = SandboxWorker(queue)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        await worker.run()
+    finally:
+        await queue.close()
+        await close_shared_transport()
+        logger.info(f"Worker stats: {worker.stats}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,394 @@
+"""
+Pluggable sandbox transports for the codex agent.
+
+Every transport runs a shell command in some sandbox and returns the same result
+dict the Azure queue worker produces ({"success", "stdout", "stderr", "error"}).
+The codex loop picks one per task from its container_type:
+
+    azure       - Azure Storage queues to a remote sandbox worker
+    local       - `docker exec` into the local sandbox-container
+    http        - the sandbox's HTTP /execute endpoint over a keep-alive session
+    subprocess  - bash on this host, in-process (tests and single-box deployments)
+
+Run `python -m codex_agent.transports --bench subprocess docker http` to compare
+round-trip latency side by side.
+"""
+import asyncio
+import codecs
+import os
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from .async_azure_queue import AsyncAzureQueueManager
+from .kernel_agent import ensure_container_running
+
+SANDBOX_URL = os.getenv("SANDBOX_URL", "http://localhost:3000")
+SANDBOX_CONTAINER = os.getenv("SANDBOX_CONTAINER", "sandbox-container")
+PROJECTS_DIR = "/projects"
+# stream() reads process output in chunks of this size and splits lines itself, so
+# one very long line (minified JS, base64) can't overflow StreamReader's line limit;
+# a line longer than this is emitted in pieces
+OUTPUT_CHUNK_BYTES = 65536
+
+class SandboxTransport:
+    """Base class for sandbox transports.
+
+    Subclasses implement _execute(); the base class tracks in-flight executions
+    so cancel() works uniformly, and provides a non-incremental stream().
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def _execute(self, command: str, project_name: Optional[str]) -> Dict:
+        raise NotImplementedError
+
+    async def execute(self, command: str, project_name: Optional[str] = None, execution_id: Optional[str] = None) -> Dict:
+        """Run a command and return its result dict; execution_id can be passed to cancel()"""
+        execution_id = execution_id or str(uuid.uuid4())
+        task = asyncio.ensure_future(self._execute(command, project_name))
+        self._inflight[execution_id] = task
+        try:
+            # wait() (unlike awaiting the task) lets a cancel() of this execution be
+            # told apart from cancellation of the caller
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            self._inflight.pop(execution_id, None)
+        if task.cancelled():
+            return {"success": False, "stdout": "", "stderr": "", "error": "Command cancelled"}
+        if task.exception():
+            return {"success": False, "stdout": "", "stderr": "", "error": str(task.exception())}
+        return task.result()
+
+    async def stream(self, command: str, project_name: Optional[str] = None, execution_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Yield {"type": "output", ...} chunks as they arrive, then a final {"type": "result", ...}.
+
+        Transports without incremental output yield only the final result.
+        """
+        result = await self.execute(command, project_name, execution_id)
+        yield {"type": "result", **result}
+
+    async def cancel(self, execution_id: str) -> bool:
+        """Cancel an in-flight execution; returns False if it is unknown or already finished"""
+        task = self._inflight.get(execution_id)
+        if not task or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def health(self) -> Dict:
+        """Return {"healthy": bool, ...} for this transport's sandbox"""
+        return {"healthy": True, "transport": self.name}
+
+    async def close(self) -> None:
+        """Cancel in-flight executions and release connections"""
+        for task in list(self._inflight.values()):
+            task.cancel()
+
+def _resolve_cwd(project_name: Optional[str], root: str = PROJECTS_DIR) -> Optional[str]:
+    """Resolve a project name or absolute path the same way the sandbox worker does"""
+    if not project_name:
+        return None
+    return project_name if os.path.isabs(project_name) else os.path.join(root, project_name)
+
+class _ProcessTransport(SandboxTransport):
+    """Shared implementation for transports that spawn a local process per command"""
+
+    def _argv(self, command: str, cwd: Optional[str]) -> List[str]:
+        raise NotImplementedError
+
+    def _process_cwd(self, cwd: Optional[str]) -> Optional[str]:
+        return None
+
+    async def _spawn(self, command: str, project_name: Optional[str]) -> asyncio.subprocess.Process:
+        cwd = _resolve_cwd(project_name)
+        return await asyncio.create_subprocess_exec(
+            *self._argv(command, cwd),
+            cwd=self._process_cwd(cwd),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    @staticmethod
+    def _result(returncode: int, stdout: str, stderr: str) -> Dict:
+        if returncode == 0:
+            return {"success": True, "stdout": stdout, "stderr": stderr}
+        error_msg = f"Command failed with return code {returncode}"
+        if stderr:
+            error_msg += f"\nError details: {stderr}"
+        return {"success": False, "stdout": stdout, "stderr": stderr, "error": error_msg}
+
+    async def _execute(self, command: str, project_name: Optional[str]) -> Dict:
+        process = await self._spawn(command, project_name)
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        return self._result(process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace"))
+
+    async def stream(self, command: str, project_name: Optional[str] = None, execution_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        execution_id = execution_id or str(uuid.uuid4())
+        process = await self._spawn(command, project_name)
+        queue: asyncio.Queue = asyncio.Queue()
+        collected = {"stdout": [], "stderr": []}
+
+        async def emit(stream_name: str, text: str):
+            collected[stream_name].append(text)
+            await queue.put({"type": "output", "stream": stream_name, "data": text})
+
+        async def pump(reader: asyncio.StreamReader, stream_name: str):
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            pending = ""
+            while True:
+                chunk = await reader.read(OUTPUT_CHUNK_BYTES)
+                pending += decoder.decode(chunk, final=not chunk)
+                lines = pending.split("\n")
+                pending = lines.pop()
+                for line in lines:
+                    await emit(stream_name, line + "\n")
+                if len(pending) >= OUTPUT_CHUNK_BYTES or (not chunk and pending):
+                    await emit(stream_name, pending)
+                    pending = ""
+                if not chunk:
+                    return
+
+        pumps = asyncio.gather(pump(process.stdout, "stdout"), pump(process.stderr, "stderr"))
+        self._inflight[execution_id] = pumps
+        try:
+            while not (pumps.done() and queue.empty()):
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=0.1)
+                except asyncio.TimeoutError:
+                    continue
+            if pumps.cancelled():
+                process.kill()
+                yield {"type": "result", "success": False, "stdout": "", "stderr": "", "error": "Command cancelled"}
+                return
+            if pumps.exception():
+                # Output was lost, so the exit code alone can't be reported as success
+                process.kill()
+                await process.wait()
+                yield {"type": "result", "success": False, "stdout": "".join(collected["stdout"]),
+                       "stderr": "".join(collected["stderr"]), "error": f"Reading command output failed: {pumps.exception()!r}"}
+                return
+            returncode = await process.wait()
+            yield {"type": "result", **self._result(returncode, "".join(collected["stdout"]), "".join(collected["stderr"]))}
+        finally:
+            self._inflight.pop(execution_id, None)
+            if process.returncode is None:
+                process.kill()
+
+class SubprocessTransport(_ProcessTransport):
+    """Runs commands with bash directly on this host; `root` stands in for /projects"""
+
+    name = "subprocess"
+
+    def __init__(self, root: str = os.getenv("LOCAL_SANDBOX_ROOT", PROJECTS_DIR)):
+        super().__init__()
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _argv(self, command: str, cwd: Optional[str]) -> List[str]:
+        return ["bash", "-c", command]
+
+    def _process_cwd(self, cwd: Optional[str]) -> Optional[str]:
+        if not cwd:
+            return self.root
+        if cwd == PROJECTS_DIR or cwd.startswith(PROJECTS_DIR + "/"):
+            return self.root + cwd[len(PROJECTS_DIR):]
+        return cwd
+
+class DockerExecTransport(_ProcessTransport):
+    """Runs commands in the local sandbox container via `docker exec`"""
+
+    name = "docker"
+
+    def __init__(self, container: str = SANDBOX_CONTAINER):
+        super().__init__()
+        self.container = container
+        self._container_ready = False
+        self._container_lock = asyncio.Lock()
+
+    async def _ensure_container(self) -> None:
+        """Start the sandbox container if needed, once per transport"""
+        async with self._container_lock:
+            if not self._container_ready:
+                await asyncio.to_thread(ensure_container_running)
+                self._container_ready = True
+
+    async def _spawn(self, command: str, project_name: Optional[str]) -> asyncio.subprocess.Process:
+        await self._ensure_container()
+        return await super()._spawn(command, project_name)
+
+    def _argv(self, command: str, cwd: Optional[str]) -> List[str]:
+        argv = ["docker", "exec"]
+        if cwd:
+            argv += ["-w", cwd]
+        return argv + [self.container, "bash", "-c", command]
+
+    async def health(self) -> Dict:
+        try:
+            await self._ensure_container()
+            process = await asyncio.create_subprocess_exec(
+                "docker", "exec", self.container, "true",
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+            )
+            healthy = await process.wait() == 0
+            # Re-check the container on the next command if it has gone away
+            self._container_ready = healthy
+            return {"healthy": healthy, "transport": self.name}
+        except Exception as e:
+            return {"healthy": False, "transport": self.name, "error": str(e)}
+
+class HttpSandboxTransport(SandboxTransport):
+    """Calls the sandbox's HTTP /execute endpoint over one keep-alive session"""
+
+    name = "http"
+
+    def __init__(self, base_url: str = SANDBOX_URL, timeout: float = 300):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=16, keepalive_timeout=60), timeout=self.timeout
+            )
+        return self._session
+
+    async def _execute(self, command: str, project_name: Optional[str]) -> Dict:
+        async with self._get_session().post(
+            f"{self.base_url}/execute", json={"command": command, "projectName": project_name}
+        ) as response:
+            data = await response.json(content_type=None)
+        data.setdefault("stdout", "")
+        data.setdefault("stderr", "")
+        return data
+
+    async def health(self) -> Dict:
+        try:
+            async with self._get_session().get(f"{self.base_url}/health") as response:
+                return {"healthy": response.status == 200, "transport": self.name, "status": response.status}
+        except Exception as e:
+            return {"healthy": False, "transport": self.name, "error": str(e)}
+
+    async def close(self) -> None:
+        await super().close()
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+class AzureQueueTransport(SandboxTransport):
+    """Sends commands through Azure Storage queues; cancel() stops waiting but cannot stop the remote command"""
+
+    name = "azure"
+
+    def __init__(self, queue: AsyncAzureQueueManager):
+        super().__init__()
+        self.queue = queue
+
+    async def _execute(self, command: str, project_name: Optional[str]) -> Dict:
+        return await self.queue.execute_command(command, project_name)
+
+    async def stream(self, command: str, project_name: Optional[str] = None, execution_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Yield the worker's heartbeats as {"type": "progress", ...} chunks, then the final result"""
+        execution_id = execution_id or str(uuid.uuid4())
+        progress: asyncio.Queue = asyncio.Queue()
+        task = asyncio.ensure_future(self.queue.execute_command(command, project_name, on_progress=progress.put_nowait))
+        self._inflight[execution_id] = task
+        try:
+            while not (task.done() and progress.empty()):
+                try:
+                    heartbeat = await asyncio.wait_for(progress.get(), timeout=0.1)
+                except asyncio.TimeoutError:
+                    continue
+                yield {**heartbeat, "type": "progress"}
+            if task.cancelled():
+                yield {"type": "result", "success": False, "stdout": "", "stderr": "", "error": "Command cancelled"}
+            elif task.exception():
+                yield {"type": "result", "success": False, "stdout": "", "stderr": "", "error": str(task.exception())}
+            else:
+                yield {"type": "result", **task.result()}
+        finally:
+            self._inflight.pop(execution_id, None)
+            if not task.done():
+                task.cancel()
+
+    async def health(self) -> Dict:
+        try:
+            properties = await self.queue.queue_client.get_queue_properties()
+            return {"healthy": True, "transport": self.name,
+                    "queue_depth": properties.approximate_message_count, **self.queue.get_metrics()}
+        except Exception as e:
+            return {"healthy": False, "transport": self.name, "error": str(e)}
+
+    async def close(self) -> None:
+        await super().close()
+        await self.queue.close()
+
+TRANSPORTS = {
+    "azure": AzureQueueTransport,
+    "local": DockerExecTransport,
+    "docker": DockerExecTransport,
+    "http": HttpSandboxTransport,
+    "subprocess": SubprocessTransport,
+}
+
+def create_transport(container_type: str, **kwargs) -> SandboxTransport:
+    """Build the transport registered for a container_type"""
+    try:
+        transport_cls = TRANSPORTS[container_type]
+    except KeyError:
+        raise ValueError(f"Unknown container type '{container_type}'. Expected one of: {', '.join(TRANSPORTS)}")
+    return transport_cls(**kwargs)
+
+async def benchmark_transport(transport: SandboxTransport, command: str = "true", iterations: int = 20) -> Dict:
+    """Measure sequential command round-trip latency (seconds) for one transport"""
+    latencies = []
+    failures = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = await transport.execute(command)
+        latencies.append(time.perf_counter() - start)
+        failures += 0 if result.get("success") else 1
+    latencies.sort()
+    return {
+        "transport": transport.name,
+        "iterations": iterations,
+        "failures": failures,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "mean": sum(latencies) / len(latencies),
+    }
+
+async def _main(names: List[str], command: str, iterations: int) -> None:
+    print(f"{'transport':<12}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'failures':>10}")
+    for name in names:
+        kwargs = {}
+        if name == "azure":
+            kwargs["queue"] = AsyncAzureQueueManager(os.environ["AZURE_STORAGE_CONNECTION_STRING"])
+        transport = create_transport(name, **kwargs)
+        try:
+            stats = await benchmark_transport(transport, command, iterations)
+            print(f"{name:<12}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['mean'] * 1000:>10.1f}{stats['failures']:>10}")
+        finally:
+            await transport.close()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark sandbox transports side by side")
+    parser.add_argument("--bench", nargs="+", default=["subprocess"], choices=sorted(TRANSPORTS))
+    parser.add_argument("--command", default="true")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(args.bench, args.command, args.iterations))
@@ -2,11 +2,29 @@
 Orchestrator package containing the orchestrator agent and tools for managing complex tasks.
 """
 
-from .orchestrator import Orchestrator, run_orchestrator
-from .tools import OrchestratorTools
+import importlib
+
+# Imported on first use, so that submodules such as orchestrator.github_client
+# can be imported without loading Semantic Kernel and the agent stack
+_EXPORTS = {
+    'Orchestrator': '.orchestrator',
+    'run_orchestrator': '.orchestrator',
+    'get_orchestrator': '.orchestrator',
+    'close_orchestrator': '.orchestrator',
+    'OrchestratorTools': '.tools',
+}
 
 __all__ = [
     'Orchestrator',
     'run_orchestrator',
+    'get_orchestrator',
+    'close_orchestrator',
     'OrchestratorTools',
-] 
\ No newline at end of file
+]
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
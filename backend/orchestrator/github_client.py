@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "3"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+# Longest we'll sleep for a primary rate-limit reset before giving up
+MAX_RATE_LIMIT_WAIT = float(os.getenv("GITHUB_MAX_RATE_LIMIT_WAIT", "60"))
+ETAG_CACHE_SIZE = 512
+# Methods that are safe to repeat after a dropped connection or a server error;
+# PATCH is left out because it may not be (this client sends none)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+
+class GitHubAPIError(Exception):
+    """Non-success response from the GitHub API"""
+
+    def __init__(self, status: int, body: Any, method: str, path: str):
+        super().__init__(f"GitHub {method} {path} failed with status {status}: {body}")
+        self.status = status
+        self.body = body
+
+# One aiohttp session (keep-alive pool) per event loop, shared by every client;
+# tokens are sent per request so clients for different users can share it
+_sessions: Dict[int, aiohttp.ClientSession] = {}
+
+# (token fingerprint, url) -> (etag, body); 304 answers don't count against the rate limit
+_etag_cache: "OrderedDict[Tuple[str, str], Tuple[str, Any]]" = OrderedDict()
+
+def _get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(id(loop))
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=GITHUB_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60),
+        )
+        _sessions[id(loop)] = session
+    return session
+
+async def close_github_session() -> None:
+    """Close the running loop's GitHub connection pool (call on app shutdown)"""
+    session = _sessions.pop(id(asyncio.get_running_loop()), None)
+    if session and not session.closed:
+        await session.close()
+
+class GitHubClient:
+    """Async GitHub REST client: pooled connections, ETag-conditional GETs,
+    rate-limit-aware retries and Git Data API commits."""
+
+    def __init__(self, token: str, base_url: str = GITHUB_API_URL, max_retries: int = GITHUB_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self._headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        self._cache_scope = hashlib.sha256(token.encode()).hexdigest()[:16]
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+
+    async def request(self, method: str, path: str, json: Optional[Dict] = None) -> Any:
+        """Send a request and return the parsed JSON body, raising GitHubAPIError on failure"""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        cache_key = (self._cache_scope, url)
+        headers = dict(self._headers)
+        cached = _etag_cache.get(cache_key) if method == "GET" else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        attempt = 0
+        while True:
+            self.stats["requests"] += 1
+            try:
+                async with _get_session().request(method, url, json=json, headers=headers) as response:
+                    if response.status == 304 and cached:
+                        self.stats["not_modified"] += 1
+                        _etag_cache.move_to_end(cache_key)
+                        return cached[1]
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        body = await response.text()
+                    if response.status < 300:
+                        if method == "GET" and response.headers.get("ETag"):
+                            _etag_cache[cache_key] = (response.headers["ETag"], body)
+                            _etag_cache.move_to_end(cache_key)
+                            if len(_etag_cache) > ETAG_CACHE_SIZE:
+                                _etag_cache.popitem(last=False)
+                        return body
+                    delay = self._retry_delay(method, response.status, response.headers, attempt)
+                    if delay is None:
+                        raise GitHubAPIError(response.status, body, method, path)
+            except aiohttp.ClientConnectionError as e:
+                # A POST/PATCH that lost its connection may already have been applied;
+                # only repeat it when the connection was never established
+                never_sent = isinstance(e, aiohttp.ClientConnectorError)
+                if attempt >= self.max_retries or (method not in IDEMPOTENT_METHODS and not never_sent):
+                    raise
+                delay = 2 ** attempt
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.info(f"GitHub {method} {path}: retrying in {delay:.1f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, method: str, status: int, headers, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the response is final"""
+        if attempt >= self.max_retries:
+            return None
+        if status in (403, 429):
+            if headers.get("Retry-After", "").isdigit():  # secondary rate limit
+                return float(headers["Retry-After"])
+            if headers.get("X-RateLimit-Remaining") == "0":
+                wait = float(headers.get("X-RateLimit-Reset", "0")) - time.time() + 1
+                return max(wait, 1.0) if wait <= MAX_RATE_LIMIT_WAIT else None
+            return None
+        # Server errors: retry reads, and writes that are safe to repeat
+        if status >= 500 and method in IDEMPOTENT_METHODS:
+            return 2 ** attempt + random.uniform(0, 0.5)
+        return None
+
+    async def get_repo(self, owner: str, repo: str) -> Dict:
+        return await self.request("GET", f"repos/{owner}/{repo}")
+
+    async def get_branch_sha(self, owner: str, repo: str, branch: str) -> str:
+        ref = await self.request("GET", f"repos/{owner}/{repo}/git/ref/heads/{branch}")
+        return ref["object"]["sha"]
+
+    async def commit_files(self, owner: str, repo: str, base_sha: str, files: Dict[str, str], message: str) -> str:
+        """Commit several text files on top of base_sha as one tree; returns the new commit SHA (no ref is moved)"""
+        base_commit = await self.request("GET", f"repos/{owner}/{repo}/git/commits/{base_sha}")
+        tree = await self.request("POST", f"repos/{owner}/{repo}/git/trees", json={
+            "base_tree": base_commit["tree"]["sha"],
+            "tree": [{"path": path, "mode": "100644", "type": "blob", "content": content}
+                     for path, content in files.items()],
+        })
+        commit = await self.request("POST", f"repos/{owner}/{repo}/git/commits", json={
+            "message": message,
+            "tree": tree["sha"],
+            "parents": [base_sha],
+        })
+        return commit["sha"]
+
+    async def create_branch(self, owner: str, repo: str, branch: str, sha: str) -> Dict:
+        return await self.request("POST", f"repos/{owner}/{repo}/git/refs", json={
+            "ref": f"refs/heads/{branch}",
+            "sha": sha,
+        })
+
+    async def create_pull_request(self, owner: str, repo: str, title: str, head: str, base: str, body: str = "") -> Dict:
+        return await self.request("POST", f"repos/{owner}/{repo}/pulls", json={
+            "title": title,
+            "head": head,
+            "base": base,
+            "body": body,
+        })
+
+    async def open_pull_request_with_files(self, owner: str, repo: str, files: Dict[str, str],
+                                           title: str, body: str = "", branch: Optional[str] = None) -> Dict:
+        """Commit files to a new branch off the default branch and open a PR for it"""
+        repo_info = await self.get_repo(owner, repo)
+        default_branch = repo_info["default_branch"]
+        base_sha = await self.get_branch_sha(owner, repo, default_branch)
+        commit_sha = await self.commit_files(owner, repo, base_sha, files, title)
+        branch = branch or f"auto-doc-{int(time.time())}"
+        # Point the new branch straight at the commit: no separate ref update needed
+        await self.create_branch(owner, repo, branch, commit_sha)
+        return await self.create_pull_request(owner, repo, title, branch, default_branch, body)
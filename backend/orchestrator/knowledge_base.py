@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from openai import AsyncOpenAI
+
+from codex_agent.doc_retrieval import chunk_text
+
+logger = logging.getLogger(__name__)
+
+DOCS_KB_DIR = Path(os.getenv("DOCS_KB_DIR", str(Path(__file__).parent.parent / "knowledge_base")))
+DOCS_KB_EMBEDDING_MODEL = os.getenv("DOCS_KB_EMBEDDING_MODEL", "text-embedding-3-small")
+# A facet counts as covered when its best chunk scores at least this (cosine similarity)
+DOCS_KB_MIN_SCORE = float(os.getenv("DOCS_KB_MIN_SCORE", "0.6"))
+DOCS_KB_MAX_AGE_DAYS = float(os.getenv("DOCS_KB_MAX_AGE_DAYS", "7"))
+DOCS_KB_TOP_K = int(os.getenv("DOCS_KB_TOP_K", "4"))
+
+class DocumentationKnowledgeBase:
+    """Local vector index of collected documentation chunks.
+
+    Chunks are embedded with the OpenAI embeddings API and stored with their
+    source URLs and fetch time in an append-only JSONL file, loaded into an
+    in-memory matrix for cosine-similarity search.
+    """
+
+    def __init__(self, directory: Path = DOCS_KB_DIR, model: str = DOCS_KB_EMBEDDING_MODEL):
+        self.path = Path(directory) / "chunks.jsonl"
+        self.model = model
+        self._client: Optional[AsyncOpenAI] = None
+        self._chunks: List[Dict[str, Any]] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._lock = asyncio.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        vectors = []
+        with self.path.open() as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                vectors.append(record.pop("embedding"))
+                self._chunks.append(record)
+        if vectors:
+            self._vectors = self._normalize(np.array(vectors, dtype=np.float32))
+        logger.info(f"Loaded {len(self._chunks)} documentation chunks from {self.path}")
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        if self._client is None:
+            self._client = AsyncOpenAI()
+        response = await self._client.embeddings.create(model=self.model, input=texts)
+        return self._normalize(np.array([d.embedding for d in response.data], dtype=np.float32))
+
+    async def add_documentation(self, text: str, task: str, facet: Optional[str] = None,
+                                source_urls: Optional[List[str]] = None) -> int:
+        """Chunk, embed and persist collected documentation; returns the number of chunks added"""
+        chunks = chunk_text(text)
+        if not chunks:
+            return 0
+        vectors = await self._embed(chunks)
+        fetched_at = time.time()
+        records = [{"id": uuid.uuid4().hex, "text": chunk, "task": task, "facet": facet,
+                    "source_urls": source_urls or [], "fetched_at": fetched_at} for chunk in chunks]
+        async with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as f:
+                for record, vector in zip(records, vectors):
+                    f.write(json.dumps({**record, "embedding": vector.tolist()}) + "\n")
+            self._chunks.extend(records)
+            self._vectors = vectors if self._vectors.size == 0 else np.vstack([self._vectors, vectors])
+        logger.info(f"Stored {len(records)} documentation chunks for facet '{facet}'")
+        return len(records)
+
+    async def search(self, queries: List[str], k: int = DOCS_KB_TOP_K,
+                     max_age_days: float = DOCS_KB_MAX_AGE_DAYS) -> List[List[Dict[str, Any]]]:
+        """Top-k fresh chunks (with a similarity score) for each query"""
+        if not self._chunks or not queries:
+            return [[] for _ in queries]
+        query_vectors = await self._embed(queries)
+        min_fetched = time.time() - max_age_days * 86400
+        fresh = np.array([c["fetched_at"] >= min_fetched for c in self._chunks])
+        scores = query_vectors @ self._vectors.T
+        scores[:, ~fresh] = -1.0
+        results = []
+        for row in scores:
+            top = np.argsort(row)[::-1][:k]
+            results.append([{**self._chunks[i], "score": float(row[i])} for i in top if row[i] > -1.0])
+        return results
+
+    async def coverage(self, task: str, facets: List[Dict[str, Any]],
+                       min_score: float = DOCS_KB_MIN_SCORE) -> List[Optional[List[Dict[str, Any]]]]:
+        """For each facet, the chunks that answer it, or None if it still needs research"""
+        hits = await self.search([f"{task}\n{facet['focus']}" for facet in facets])
+        return [chunks if chunks and chunks[0]["score"] >= min_score else None for chunks in hits]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"chunks": len(self._chunks), "path": str(self.path), "model": self.model}
+
+def format_chunks(chunks: List[Dict[str, Any]]) -> str:
+    """Render knowledge-base chunks as documentation text with their sources"""
+    parts = []
+    for chunk in chunks:
+        sources = ", ".join(chunk.get("source_urls") or []) or "unknown source"
+        fetched = time.strftime("%Y-%m-%d", time.localtime(chunk["fetched_at"]))
+        parts.append(f"{chunk['text']}\n(Source: {sources}, fetched {fetched})")
+    return "\n\n---\n\n".join(parts)
+
+_knowledge_base: Optional[DocumentationKnowledgeBase] = None
+
+def get_knowledge_base() -> DocumentationKnowledgeBase:
+    """Return the shared knowledge base, loading it from disk on first use"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        _knowledge_base = DocumentationKnowledgeBase()
+    return _knowledge_base
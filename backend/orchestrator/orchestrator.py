@@ -6,6 +6,7 @@ import json
 import logging
 from typing import Optional, Dict, Any
 import asyncio
+import time
 from dotenv import load_dotenv
 
 from .tools import OrchestratorTools
@@ -23,10 +24,15 @@ load_dotenv()
 class Orchestrator:
     """
     Simplified orchestrator agent class using Semantic Kernel to manage browser sessions for documentation collection.
+
+    Holds no per-request state: the kernel, chat service (and its HTTP connection
+    pool), tools and agent are shared, so one instance can serve concurrent
+    requests. Conversation state is passed in per call (see _invoke_agent).
     """
     
     def __init__(self):
         """Initialize the orchestrator with Semantic Kernel setup"""
+        started = time.perf_counter()
         self.kernel = Kernel()
         self.credentials = os.getenv("OPENAI_API_KEY")
         if not self.credentials:
@@ -41,7 +47,7 @@ class Orchestrator:
         self.kernel.add_service(self.service)
         
         # Add the orchestrator tools
-        self.orchestrator_tools = OrchestratorTools()
+        self.orchestrator_tools = OrchestratorTools(service=self.service)
         self.kernel.add_plugin(self.orchestrator_tools, plugin_name="orchestrator_tools")
         
         # Create the orchestrator agent (do not use self._get_system_prompt())
@@ -52,7 +58,15 @@ class Orchestrator:
             # instructions should be set from the Jinja template elsewhere
         )
         
-        logger.info("Orchestrator agent initialized successfully")
+        self.init_seconds = time.perf_counter() - started
+        self.requests_served = 0
+        logger.info(f"Orchestrator agent initialized successfully in {self.init_seconds * 1000:.1f}ms")
+
+    async def close(self) -> None:
+        """Close the chat service's HTTP client"""
+        client = getattr(self.service, "client", None)
+        if client is not None:
+            await client.close()
     
     async def orchestrate_task(
         self, 
@@ -227,6 +241,24 @@ class Orchestrator:
 
         return response.strip() if response else None
 
+# Application-scoped orchestrator, created at startup and reused by every request
+_orchestrator: Optional[Orchestrator] = None
+
+def get_orchestrator() -> Orchestrator:
+    """Return the shared orchestrator, creating it on first use"""
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = Orchestrator()
+    return _orchestrator
+
+async def close_orchestrator() -> None:
+    """Close the shared orchestrator's clients (call on application shutdown)"""
+    global _orchestrator
+    if _orchestrator is not None:
+        orchestrator, _orchestrator = _orchestrator, None
+        await orchestrator.close()
+        logger.info(f"Orchestrator closed after serving {orchestrator.requests_served} request(s)")
+
 # Convenience function for easy usage
 async def run_orchestrator(task_name: str, repo_info: Dict[str, Any], browser_count: int, github_token: Optional[str] = None, documentation: Optional[str] = None, pull_request_message: Optional[str] = None, pull_request_description: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -244,5 +276,8 @@ async def run_orchestrator(task_name: str, repo_info: Dict[str, Any], browser_co
     Returns:
         Dict[str, Any]: The orchestrator's response with browser URLs
     """
-    orchestrator = Orchestrator()
+    orchestrator = get_orchestrator()
+    orchestrator.requests_served += 1
+    if orchestrator.requests_served > 1:
+        logger.info(f"Reusing warm orchestrator (saved ~{orchestrator.init_seconds * 1000:.1f}ms of setup)")
     return await orchestrator.orchestrate_task(task_name, repo_info, browser_count, github_token, documentation, pull_request_message, pull_request_description)
@@ -0,0 +1,96 @@
+"""
+Research-to-code pipeline: run browser research and the codex task together.
+
+The sandbox is provisioned and the repository cloned while browsers are still
+starting; the codex loop begins as soon as the first documentation arrives (or
+PIPELINE_FIRST_DOC_TIMEOUT passes) and later documentation is added to its
+prompt as each browser finishes.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from codex_agent.codex_core_agent import prepare_workspace, run_codex_loop
+from codex_agent.transports import SandboxTransport
+from .tools import subscribe_documentation, unsubscribe_documentation
+
+logger = logging.getLogger(__name__)
+
+# Longest the codex loop waits for documentation before starting without it
+PIPELINE_FIRST_DOC_TIMEOUT = float(os.getenv("PIPELINE_FIRST_DOC_TIMEOUT", "300"))
+
+# Keep references to running pipelines so they aren't garbage collected mid-task
+_pipelines: Set[asyncio.Task] = set()
+
+async def _prepare(provision_sandbox: Callable[[], Awaitable[Optional[str]]], repo_url: str, project_name: str,
+                   container_type: str, broadcast_func, task_id: str) -> Tuple[SandboxTransport, str]:
+    connection_string = await provision_sandbox()
+    return await prepare_workspace(repo_url, project_name, container_type, connection_string, broadcast_func, task_id)
+
+async def _discard(workspace: "asyncio.Task[Tuple[SandboxTransport, str]]") -> None:
+    """Cancel an unneeded workspace, closing its transport if it was already set up"""
+    workspace.cancel()
+    try:
+        transport, _ = await workspace
+    except BaseException:
+        return
+    await transport.close()
+
+async def _run_codex(workspace: "asyncio.Task[Tuple[SandboxTransport, str]]", session_id: str, task_name: str,
+                     broadcast_func, task_id: str) -> None:
+    feed = subscribe_documentation(session_id)
+    try:
+        await broadcast_func("status", {"task_id": task_id, "message": "Waiting for the first documentation..."})
+        if await feed.wait_for_first(PIPELINE_FIRST_DOC_TIMEOUT):
+            logger.info(f"Pipeline {task_id}: first documentation arrived, starting codex loop")
+        else:
+            logger.info(f"Pipeline {task_id}: no documentation yet, starting codex loop without it")
+        try:
+            transport, project_path = await workspace
+        except Exception as e:
+            await broadcast_func("error", {"task_id": task_id, "status": "error", "message": str(e)})
+            return
+        try:
+            command_history = await run_codex_loop(transport, task_name, project_path, broadcast_func, task_id, feed)
+        finally:
+            await transport.close()
+        print(f"[INFO] Task {task_id} completed with {len(command_history)} commands")
+        await broadcast_func("completion", {
+            "task_id": task_id,
+            "status": "completed",
+            "message": "Task completed successfully"
+        })
+    except Exception as e:
+        print(f"[ERROR] Task {task_id} failed: {str(e)}")
+        await broadcast_func("error", {"task_id": task_id, "status": "error", "message": str(e)})
+    finally:
+        unsubscribe_documentation(session_id, feed)
+        if not workspace.done():
+            await _discard(workspace)
+
+async def start_research_to_code(task_name: str, repo_url: str, project_name: str, container_type: str,
+                                 provision_sandbox: Callable[[], Awaitable[Optional[str]]],
+                                 research: Awaitable[Dict[str, Any]], broadcast_func, task_id: str) -> Dict[str, Any]:
+    """Run research with the sandbox warming up alongside it.
+
+    provision_sandbox returns the sandbox connection string (None for local
+    transports); research is the orchestrator call that starts the browsers.
+    Returns the research result as soon as the browsers are running, tagged with
+    the codex task_id; the codex task continues in the background.
+    """
+    workspace = asyncio.create_task(_prepare(provision_sandbox, repo_url, project_name, container_type, broadcast_func, task_id))
+    try:
+        result = await research
+    except BaseException:
+        await _discard(workspace)
+        raise
+    session_id = result.get("session_id")
+    if not session_id:
+        logger.warning(f"Pipeline {task_id}: research did not start a session, dropping the sandbox")
+        await _discard(workspace)
+        return result
+    pipeline = asyncio.create_task(_run_codex(workspace, session_id, task_name, broadcast_func, task_id))
+    _pipelines.add(pipeline)
+    pipeline.add_done_callback(_pipelines.discard)
+    return {**result, "task_id": task_id, "pipeline": True}
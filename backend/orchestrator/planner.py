@@ -0,0 +1,120 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatPromptExecutionSettings
+from semantic_kernel.contents import ChatHistory
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_SIZE = 128
+MAX_SEED_QUERIES = 3
+MAX_CANDIDATE_URLS = 3
+PLAN_TIMEOUT = 20.0  # browsers wait on the plan, so don't let a slow LLM hold them up
+
+# Used when no LLM is available or planning fails; ordered so that the first
+# facets are the most valuable when only a few browsers are requested
+FALLBACK_FACETS = [
+    "official documentation and API references",
+    "tutorials and practical examples",
+    "community resources and best practices",
+    "release notes, changelogs and migration guides",
+    "GitHub issues, discussions and troubleshooting",
+    "configuration options and integration with related tools",
+    "performance and security considerations",
+    "sample projects and reference implementations",
+]
+
+PLANNER_PROMPT = """Split the documentation research for the task below into exactly {n} non-overlapping research facets, one per browser.
+Each facet must cover a different aspect or source type so no two browsers read the same pages.
+For each facet give a short focus description, up to {q} concrete web search queries to start from and
+up to {u} documentation page URLs you are confident exist (leave candidate_urls empty rather than guessing).
+
+TASK: {task}
+
+Respond with JSON only: {{"facets": [{{"focus": "...", "seed_queries": ["...", "..."], "candidate_urls": ["https://..."]}}]}}"""
+
+def fallback_facets(n: int) -> List[Dict[str, Any]]:
+    """Static facets for n browsers; beyond the built-in list, facets are split into numbered parts"""
+    if n == 1:
+        return [{"focus": "official documentation, tutorials, and best practices", "seed_queries": []}]
+    if n == 2:
+        return [{"focus": "official documentation and API references", "seed_queries": []},
+                {"focus": "tutorials, examples, and community resources", "seed_queries": []}]
+    facets = []
+    for i in range(n):
+        focus = FALLBACK_FACETS[i % len(FALLBACK_FACETS)]
+        if n > len(FALLBACK_FACETS):
+            focus += f" (part {i // len(FALLBACK_FACETS) + 1})"
+        facets.append({"focus": focus, "seed_queries": []})
+    return facets
+
+class FacetPlanner:
+    """Splits a research task into N distinct facets with seed queries.
+
+    Plans come from one LLM call per (task, N) and are cached (LRU); concurrent
+    requests for the same plan share a single call. Falls back to static
+    facets when no chat service is configured or the LLM answer is unusable.
+    """
+
+    def __init__(self, service=None, cache_size: int = PLAN_CACHE_SIZE):
+        self.service = service
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], asyncio.Future]" = OrderedDict()
+
+    async def plan(self, task: str, n: int) -> List[Dict[str, Any]]:
+        key = (" ".join(task.lower().split()), n)
+        future = self._cache.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._plan(task, n))
+            self._cache[key] = future
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+            logger.info(f"Using cached research plan for {n} browser(s)")
+        try:
+            return await asyncio.shield(future)
+        except Exception as e:
+            # Don't cache failures; the next request for this task retries the LLM
+            if self._cache.get(key) is future:
+                del self._cache[key]
+            logger.warning(f"Facet planning failed, using static facets: {e}")
+            return fallback_facets(n)
+
+    async def _plan(self, task: str, n: int) -> List[Dict[str, Any]]:
+        if self.service is None or n == 1:
+            return fallback_facets(n)
+        history = ChatHistory()
+        history.add_user_message(PLANNER_PROMPT.format(n=n, q=MAX_SEED_QUERIES, u=MAX_CANDIDATE_URLS, task=task))
+        settings = OpenAIChatPromptExecutionSettings(temperature=0.0, response_format={"type": "json_object"})
+        reply = await asyncio.wait_for(
+            self.service.get_chat_message_content(chat_history=history, settings=settings), PLAN_TIMEOUT
+        )
+        facets = self._parse(str(reply.content), n)
+        logger.info(f"Planned {n} research facets: {[f['focus'] for f in facets]}")
+        return facets
+
+    def _parse(self, content: str, n: int) -> List[Dict[str, Any]]:
+        facets = []
+        seen = set()
+        for item in json.loads(content).get("facets", []):
+            focus = str(item.get("focus", "")).strip()
+            if not focus or focus.lower() in seen:
+                continue
+            seen.add(focus.lower())
+            queries = [str(q).strip() for q in item.get("seed_queries", []) if str(q).strip()]
+            urls = [str(u).strip() for u in item.get("candidate_urls", []) if str(u).strip().startswith("http")]
+            facets.append({"focus": focus, "seed_queries": queries[:MAX_SEED_QUERIES],
+                           "candidate_urls": urls[:MAX_CANDIDATE_URLS]})
+        if not facets:
+            raise ValueError("LLM returned no facets")
+        # Pad a short plan with static facets it doesn't already cover
+        for facet in fallback_facets(n):
+            if len(facets) >= n:
+                break
+            if facet["focus"].lower() not in seen:
+                facets.append(facet)
+        return facets[:n]
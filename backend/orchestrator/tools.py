@@ -3,21 +3,80 @@ from typing import Annotated, Dict, Any, List, Optional
 import asyncio
 import logging
 import json
+import os
 import uuid
+from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 import re
 import requests, base64, time, re
 from urllib.parse import urlparse
 
+from .github_client import GitHubAPIError, GitHubClient
+from .knowledge_base import format_chunks, get_knowledge_base
+from .planner import FacetPlanner, fallback_facets
+from codex_agent.documentation_feed import DocumentationFeed
+from web_agent import stream_hub
+from web_agent.fast_fetch import FAST_FETCH_ENABLED, assign_candidates, fetch_facet
+from web_agent.run_budget import RUN_SEARCH_DEADLINE
+from web_agent.url_registry import drop_url_registry, get_url_registry
+
 logger = logging.getLogger(__name__)
 
 # Global storage for browser sessions
 browser_sessions = {}
 
+# Documentation aggregation: mark a session complete after this many seconds, or once
+# DOCS_FIRST_K browsers have finished (0 = wait for all), cancelling the rest
+DOCS_DEADLINE_SECONDS = float(os.getenv("DOCS_DEADLINE_SECONDS", "600"))
+DOCS_FIRST_K = int(os.getenv("DOCS_FIRST_K", "0"))
+# Browsers wrap up this many seconds before the session deadline, so their partial
+# documentation is returned instead of being lost to cancellation
+RUN_DEADLINE_MARGIN = 20.0
+
+# Codex tasks waiting on a session's documentation (research-to-code pipeline)
+documentation_feeds: Dict[str, List[DocumentationFeed]] = {}
+
+def _documentation_text(doc: Any) -> Optional[str]:
+    text = doc.get("response") if isinstance(doc, dict) else doc
+    if not text or str(text).startswith("Task failed:"):
+        return None
+    return str(text)
+
+def subscribe_documentation(session_id: str) -> DocumentationFeed:
+    """Feed of a session's documentation: what has been collected so far, then each browser's result as it finishes"""
+    feed = DocumentationFeed()
+    session = browser_sessions.get(session_id, {})
+    for key, doc in session.get("documentation", {}).items():
+        feed.add(key, _documentation_text(doc))
+    if session.get("status") == "completed" or session_id not in browser_sessions:
+        feed.close()
+    else:
+        documentation_feeds.setdefault(session_id, []).append(feed)
+    return feed
+
+def unsubscribe_documentation(session_id: str, feed: DocumentationFeed) -> None:
+    feeds = documentation_feeds.get(session_id)
+    if feeds and feed in feeds:
+        feeds.remove(feed)
+        if not feeds:
+            del documentation_feeds[session_id]
+
+def _publish_documentation(session_id: str, key: str, doc: Any) -> None:
+    for feed in documentation_feeds.get(session_id, ()):
+        feed.add(key, _documentation_text(doc))
+
+def _close_documentation_feeds(session_id: str) -> None:
+    for feed in documentation_feeds.pop(session_id, ()):
+        feed.close()
+
 class OrchestratorTools:
     """
     Simplified Semantic Kernel tools for the orchestrator agent to manage browser sessions for documentation collection.
     """
+
+    def __init__(self, service=None):
+        """service: optional chat completion service used to plan per-browser research facets"""
+        self.planner = FacetPlanner(service)
     
     @kernel_function(description="Start multiple browser sessions for documentation collection")
     async def start_multiple_browser_sessions(
@@ -34,6 +93,7 @@ class OrchestratorTools:
             browser_sessions[session_id] = {
                 "status": "starting",
                 "browsers": {},
+                "documentation": {},
                 "task": task,
                 "user_name": user_name or "Anonymous User"
             }
@@ -42,6 +102,26 @@ class OrchestratorTools:
             
             # Store documentation collection tasks
             documentation_tasks = []
+
+            # Plan one research facet per browser, answer what we can from the knowledge
+            # base, then over plain HTTP, and only dispatch browsers for the facets left
+            facets = await self.planner.plan(task, browser_count)
+            known_docs, facets = await self._answer_from_knowledge_base(task, facets)
+            browser_sessions[session_id]["documentation"].update(known_docs)
+            fetched_docs, facets = await self._answer_from_fast_fetch(task, facets)
+            browser_sessions[session_id]["documentation"].update(fetched_docs)
+            known_docs.update(fetched_docs)
+            if not facets:
+                browser_sessions[session_id]["status"] = "completed"
+                browser_sessions[session_id]["completion_reason"] = "fast_fetch" if fetched_docs else "knowledge_base"
+                logger.info(f"Answered session {session_id} without browsers ({len(fetched_docs)} facet(s) over HTTP)")
+                return json.dumps({
+                    "session_id": session_id,
+                    "browsers": {},
+                    "documentation": known_docs,
+                    "status": "completed"
+                })
+            browser_count = len(facets)
             
             # Start browser sessions in parallel
             async def start_single_browser(browser_index: int):
@@ -50,10 +130,10 @@ class OrchestratorTools:
                     
                     # Try to start Anchor browser session
                     try:
-                        from web_agent.anchor_browser.session_management.anchor_session_start import start_anchor_session
+                        from web_agent.anchor_browser.session_pool import get_session_pool
                         
-                        # Start the browser session
-                        session_info = start_anchor_session()
+                        # Lease a warm browser session (or start one if the pool is empty)
+                        session_info = await get_session_pool().lease()
                         cdp_url = session_info['data']['cdp_url']
                         live_view_url = session_info['data']['live_view_url']
                         browser_session_id = session_info['data']['id']
@@ -65,19 +145,24 @@ class OrchestratorTools:
                         raise  # Propagate the error instead of using a mock session
                     
                     # Create subtask for this browser
-                    subtask = self._create_subtask(task, browser_index, browser_count)
+                    subtask = self._create_subtask(task, browser_index, browser_count, facets[browser_index])
                     
-                    # Store session parameters for WebSocket handler using the main session_id, not browser_session_id
+                    # Register this browser as a sub-stream of the main session for the WebSocket handler.
+                    # The session is managed: its agents run here, the socket only subscribes to them.
                     import sys
                     if 'app' in sys.modules:
                         app_module = sys.modules['app']
                         if hasattr(app_module, 'web_agent_session_params'):
-                            app_module.web_agent_session_params[session_id] = {
+                            session_params = app_module.web_agent_session_params.setdefault(
+                                session_id, {"streams": {}, "managed": True}
+                            )
+                            session_params["streams"][f"browser_{browser_index}"] = {
                                 'user_task': subtask,
                                 'user_name': user_name or "Anonymous User",
-                                'cdp_url': cdp_url
+                                'cdp_url': cdp_url,
+                                'anchor_session_id': browser_session_id
                             }
-                            logger.info(f"Stored session params for WebSocket handler: {session_id}")
+                            logger.info(f"Stored stream params for WebSocket handler: {session_id}/browser_{browser_index}")
                         else:
                             logger.warning("web_agent_session_params not found in app module")
                     else:
@@ -87,9 +172,10 @@ class OrchestratorTools:
                     
                     # Create documentation collection task (but don't start it yet)
                     doc_task = self._run_documentation_collection(
-                        subtask, cdp_url, user_name, session_id, browser_index
+                        subtask, cdp_url, user_name, session_id, browser_index, browser_session_id,
+                        task=task, facet=facets[browser_index]["focus"]
                     )
-                    documentation_tasks.append(doc_task)
+                    documentation_tasks.append((browser_index, doc_task))
                     
                     return {
                         "browser_index": browser_index,
@@ -133,6 +219,7 @@ class OrchestratorTools:
             response_data = {
                 "session_id": session_id,
                 "browsers": browsers_info,
+                "documentation": known_docs,
                 "status": "running"
             }
             
@@ -141,19 +228,42 @@ class OrchestratorTools:
             # Start documentation collection in the background
             async def run_docs_bg():
                 logger.info("Starting documentation collection for all browsers (background)")
-                await asyncio.gather(*documentation_tasks)
-                # Wait a moment for all results to be stored
-                await asyncio.sleep(1)
-                # Collect all documentation results
-                all_documentation = {}
-                for browser_index in range(browser_count):
-                    browser_key = f"browser_{browser_index}"
-                    if browser_key in browser_sessions[session_id]["browsers"]:
-                        browser_data = browser_sessions[session_id]["browsers"][browser_key]
-                        if "documentation" in browser_data:
-                            all_documentation[browser_key] = browser_data["documentation"]
-                browser_sessions[session_id]["documentation"] = all_documentation
+                # Results stream into browser_sessions as each browser finishes; stop on
+                # the deadline or once first_k browsers are done, cancelling stragglers
+                tasks = {asyncio.create_task(coro): browser_index for browser_index, coro in documentation_tasks}
+                needed = min(DOCS_FIRST_K or len(tasks), len(tasks))
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + DOCS_DEADLINE_SECONDS
+                pending = set(tasks)
+                finished = 0
+                while pending and finished < needed:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                    # Only browsers that actually collected documentation count towards first_k
+                    finished += sum(1 for t in done if not t.cancelled() and t.exception() is None and t.result())
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                for task in pending:
+                    browser_data = browser_sessions[session_id]["browsers"].get(f"browser_{tasks[task]}")
+                    if browser_data is not None:
+                        browser_data["status"] = "cancelled"
+                if pending:
+                    reason = "first_k" if finished >= needed else "deadline"
+                    logger.info(f"Cancelled {len(pending)} straggling browser(s) for session {session_id} ({reason})")
+                else:
+                    reason = "all"
+                browser_sessions[session_id]["completion_reason"] = reason
+                registry = drop_url_registry(session_id)
+                if registry:
+                    browser_sessions[session_id]["url_stats"] = registry.stats()
+                    logger.info(f"URL dedupe for session {session_id}: {registry.stats()}")
                 browser_sessions[session_id]["status"] = "completed"
+                _close_documentation_feeds(session_id)
+                await stream_hub.publish(session_id, stream_hub.SESSION_STREAM, f"Documentation collection completed ({reason})", "done")
+                stream_hub.drop_session(session_id)
                 logger.info(f"Documentation collection completed and stored for session {session_id}")
             asyncio.create_task(run_docs_bg())
             
@@ -163,22 +273,87 @@ class OrchestratorTools:
             logger.error(f"Error starting multiple browser sessions: {str(e)}")
             return f"Error starting browser sessions: {str(e)}"
     
-    def _create_subtask(self, main_task: str, browser_index: int, total_browsers: int) -> str:
-        """Create a subtask for a specific browser based on the main task"""
-        if total_browsers == 1:
-            return f"Research and collect documentation for: {main_task}. Focus on official documentation, tutorials, and best practices. Visit 1-2 high-quality sources."
-        elif total_browsers == 2:
-            if browser_index == 0:
-                return f"Research and collect documentation for: {main_task}. Focus on official documentation and API references. Visit 1-2 authoritative sources."
-            else:
-                return f"Research and collect documentation for: {main_task}. Focus on tutorials, examples, and community resources. Visit 1-2 practical sources."
-        else:  # 3 browsers
-            if browser_index == 0:
-                return f"Research and collect documentation for: {main_task}. Focus on official documentation and API references. Visit 1-2 authoritative sources."
-            elif browser_index == 1:
-                return f"Research and collect documentation for: {main_task}. Focus on tutorials and practical examples. Visit 1-2 tutorial sources."
-            else:
-                return f"Research and collect documentation for: {main_task}. Focus on community resources and best practices. Visit 1-2 community sources."
+    async def _answer_from_knowledge_base(self, task: str, facets: List[Dict[str, Any]]):
+        """Split facets into documentation already in the knowledge base and facets still to research"""
+        try:
+            coverage = await get_knowledge_base().coverage(task, facets)
+        except Exception as e:
+            logger.warning(f"Knowledge base lookup failed, researching all facets: {e}")
+            return {}, facets
+        known_docs, missing = {}, []
+        for index, (facet, chunks) in enumerate(zip(facets, coverage)):
+            if chunks is None:
+                missing.append(facet)
+                continue
+            known_docs[f"knowledge_base_{index}"] = {
+                "response": format_chunks(chunks),
+                "timestamp": datetime.now().isoformat(),
+                "source": "knowledge_base",
+                "facet": facet["focus"]
+            }
+        if known_docs:
+            logger.info(f"Knowledge base covers {len(known_docs)} of {len(facets)} facets")
+        return known_docs, missing
+
+    async def _answer_from_fast_fetch(self, task: str, facets: List[Dict[str, Any]]):
+        """Split facets into documentation fetched over plain HTTP and facets that need a browser"""
+        if not FAST_FETCH_ENABLED or not facets:
+            return {}, facets
+        try:
+            candidates = await assign_candidates(task, facets)
+        except Exception as e:
+            logger.warning(f"Fast fetch candidate lookup failed, researching all facets with browsers: {e}")
+            return {}, facets
+        results = await asyncio.gather(*(fetch_facet(urls) for urls in candidates), return_exceptions=True)
+        fetched_docs, missing = {}, []
+        for index, (facet, result) in enumerate(zip(facets, results)):
+            if isinstance(result, Exception):
+                logger.warning(f"Fast fetch failed for facet '{facet['focus']}': {result}")
+                missing.append(facet)
+                continue
+            if result["status"] != "ok":
+                logger.info(f"Facet '{facet['focus']}' needs a browser: {result['reason']}")
+                missing.append(facet)
+                continue
+            fetched_docs[f"http_{index}"] = {
+                "response": result["markdown"],
+                "timestamp": datetime.now().isoformat(),
+                "source": "http_fetch",
+                "facet": facet["focus"],
+                "pages": result["pages"]
+            }
+            try:
+                await get_knowledge_base().add_documentation(result["markdown"], task, facet["focus"], result["source_urls"])
+            except Exception as e:
+                logger.warning(f"Could not store fetched documentation in the knowledge base: {e}")
+        if fetched_docs:
+            logger.info(f"Fast fetch answered {len(fetched_docs)} of {len(facets)} facets without a browser")
+        return fetched_docs, missing
+
+    async def _store_in_knowledge_base(self, web_agent_response: Dict[str, Any], task: str, facet: Optional[str],
+                                       session_id: str, agent_id: str) -> None:
+        """Keep collected documentation for later research requests"""
+        text = (web_agent_response or {}).get("response")
+        # Partial documentation would make the knowledge base skip this facet next time
+        if not text or text.startswith("Task failed:") or web_agent_response.get("truncated"):
+            return
+        try:
+            source_urls = get_url_registry(session_id).urls_for(agent_id)
+            await get_knowledge_base().add_documentation(text, task, facet, source_urls)
+        except Exception as e:
+            logger.warning(f"Could not store documentation in the knowledge base: {e}")
+
+    def _create_subtask(self, main_task: str, browser_index: int, total_browsers: int, facet: Optional[Dict[str, Any]] = None) -> str:
+        """Create a subtask for a specific browser from its planned research facet"""
+        facet = facet or fallback_facets(total_browsers)[browser_index]
+        subtask = f"Research and collect documentation for: {main_task}. Focus on {facet['focus']}. Visit 1-2 high-quality sources."
+        if facet.get("seed_queries"):
+            subtask += " Start from these searches: " + "; ".join(facet["seed_queries"]) + "."
+        if facet.get("candidate_urls"):
+            subtask += " Candidate pages: " + ", ".join(facet["candidate_urls"]) + "."
+        if total_browsers > 1:
+            subtask += f" You are browser {browser_index + 1} of {total_browsers}; other browsers cover the remaining aspects, so stay within your focus."
+        return subtask
     
     async def _run_documentation_collection(
         self, 
@@ -186,9 +361,18 @@ class OrchestratorTools:
         cdp_url: str, 
         user_name: Optional[str], 
         session_id: str, 
-        browser_index: int
+        browser_index: int,
+        browser_session_id: Optional[str] = None,
+        task: Optional[str] = None,
+        facet: Optional[str] = None
     ):
-        """Run documentation collection in the background"""
+        """Run documentation collection in the background, returning the browser to the pool afterwards.
+
+        Returns True when the browser collected usable documentation.
+        """
+        reusable = False
+        collected = False
+        stream_id = f"browser_{browser_index}"
         try:
             # Check if this is a mock session
             if cdp_url.startswith("ws://mock-browser.com"):
@@ -199,10 +383,16 @@ class OrchestratorTools:
             from web_agent.openai_test import run_search
             
             # Run the documentation collection
+            await stream_hub.publish(session_id, stream_id, "🚀 Starting documentation collection...", "status")
             web_agent_response = await run_search(
                 user_task=subtask,
                 user_name=user_name,
-                cdp_url=cdp_url
+                cdp_url=cdp_url,
+                session_id=session_id,
+                publish_thought_func=stream_hub.stream_publisher(stream_id),
+                url_registry=get_url_registry(session_id),
+                agent_id=stream_id,
+                deadline_seconds=min(RUN_SEARCH_DEADLINE, max(DOCS_DEADLINE_SECONDS - RUN_DEADLINE_MARGIN, RUN_DEADLINE_MARGIN))
             )
             
             
@@ -211,15 +401,31 @@ class OrchestratorTools:
             if session_id in browser_sessions:
                 browser_sessions[session_id]["browsers"][f"browser_{browser_index}"]["documentation"] = web_agent_response
                 browser_sessions[session_id]["browsers"][f"browser_{browser_index}"]["status"] = "completed"
+                browser_sessions[session_id]["browsers"][f"browser_{browser_index}"]["metrics"] = web_agent_response.get("metrics")
+                browser_sessions[session_id]["documentation"][f"browser_{browser_index}"] = web_agent_response
+                _publish_documentation(session_id, f"browser_{browser_index}", web_agent_response)
                 print(f"Orchestrator stored results for browser_{browser_index} in session {session_id}")
             
             logger.info(f"Documentation collection completed for browser {browser_index}")
+            await self._store_in_knowledge_base(web_agent_response, task or subtask, facet, session_id, stream_id)
+            if web_agent_response.get("truncated"):
+                await stream_hub.publish(session_id, stream_id, f"⏱️ Documentation collection stopped early ({web_agent_response.get('truncation_reason')}), keeping partial results", "done")
+            else:
+                await stream_hub.publish(session_id, stream_id, "✅ Documentation collection finished", "done")
+            reusable = True
+            collected = _documentation_text(web_agent_response) is not None
             
         except Exception as e:
             logger.error(f"Error in documentation collection for browser {browser_index}: {str(e)}")
             if session_id in browser_sessions:
                 browser_sessions[session_id]["browsers"][f"browser_{browser_index}"]["error"] = str(e)
                 browser_sessions[session_id]["browsers"][f"browser_{browser_index}"]["status"] = "failed"
+            await stream_hub.publish(session_id, stream_id, f"Error: {str(e)}", "error")
+        finally:
+            if browser_session_id:
+                from web_agent.anchor_browser.session_pool import get_session_pool
+                await get_session_pool().release(browser_session_id, reusable=reusable)
+        return collected
     
     @kernel_function(description="Get the status and results of browser sessions")
     async def get_browser_session_status(
@@ -251,69 +457,27 @@ class OrchestratorTools:
         Pushes `documentation.md` to a new branch and opens a PR.
         Returns the PR URL (string) or raises an exception on error.
         """
-        import requests
-        import time
-        import base64
         try:
-            # --- derive API endpoints ---
+            # --- derive owner/repo ---
             # Handle URLs that may include a trailing `.git`
             match = re.match(r"https://github\.com/([^/]+)/([^/]+?)(?:\.git)?$", repo_url)
             if not match:
                 return "Error creating pull request: Invalid repo_url format. Expected https://github.com/<owner>/<repo>"
             owner, repo = match.groups()
-            repo_api = f"https://api.github.com/repos/{owner}/{repo}"
-            headers = {
-                "Authorization": f"token {github_token}",
-                "Accept": "application/vnd.github.v3+json",
-            }
-
-            # --- get default branch SHA ---
-            repo_resp = requests.get(repo_api, headers=headers)
-            if not repo_resp.ok:
-                logger.error(f"GitHub API error (repo): {repo_resp.status_code} - {repo_resp.text}")
-                return f"Error fetching repo: {repo_resp.status_code} - {repo_resp.text}"
-            default_branch = repo_resp.json()["default_branch"]
-            sha_resp = requests.get(f"{repo_api}/git/ref/heads/{default_branch}", headers=headers)
-            if not sha_resp.ok:
-                logger.error(f"GitHub API error (sha): {sha_resp.status_code} - {sha_resp.text}")
-                return f"Error fetching branch SHA: {sha_resp.status_code} - {sha_resp.text}"
-            base_sha = sha_resp.json()["object"]["sha"]
 
-            # --- create temp branch ---
-            new_branch = f"auto-doc-{int(time.time())}"
-            branch_resp = requests.post(f"{repo_api}/git/refs", headers=headers, json={
-                "ref": f"refs/heads/{new_branch}",
-                "sha": base_sha,
-            })
-            if not branch_resp.ok:
-                logger.error(f"GitHub API error (branch): {branch_resp.status_code} - {branch_resp.text}")
-                return f"Error creating branch: {branch_resp.status_code} - {branch_resp.text}"
-
-            # --- add /documentation.md ---
-            content_b64 = base64.b64encode(documentation.encode()).decode()
-            file_resp = requests.put(f"{repo_api}/contents/documentation.md", headers=headers, json={
-                "message": commitMessage,
-                "content": content_b64,
-                "branch": new_branch,
-            })
-            if not file_resp.ok:
-                logger.error(f"GitHub API error (file): {file_resp.status_code} - {file_resp.text}")
-                return f"Error creating file: {file_resp.status_code} - {file_resp.text}"
-
-            # --- open PR ---
-            pr_resp = requests.post(f"{repo_api}/pulls", headers=headers, json={
-                "title": commitMessage,
-                "head": new_branch,
-                "base": default_branch,
-                "body": commitDescription,
-            })
-            if not pr_resp.ok:
-                logger.error(f"GitHub API error (PR): {pr_resp.status_code} - {pr_resp.text}")
-                return f"Error creating pull request: {pr_resp.status_code} - {pr_resp.text}"
-
-            pr = pr_resp.json()
+            # Branch, single-tree commit and PR via the pooled async client
+            client = GitHubClient(github_token)
+            pr = await client.open_pull_request_with_files(
+                owner, repo,
+                files={"documentation.md": documentation},
+                title=commitMessage,
+                body=commitDescription,
+            )
+            logger.info(f"GitHub requests for PR: {client.stats}")
             return pr["html_url"]
+        except GitHubAPIError as e:
+            logger.error(f"GitHub API error: {e.status} - {e.body}")
+            return f"Error creating pull request: {e.status} - {e.body}"
         except Exception as e:
             logger.error(f"Error creating pull request: {str(e)}")
             return f"Error creating pull request: {str(e)}"
-    
\ No newline at end of file
@@ -3,7 +3,17 @@ const bodyParser = require('body-parser');
 const morgan = require('morgan');
 const { spawn, execSync } = require('child_process');
 const path = require('path');
+const zlib = require('zlib');
+const crypto = require('crypto');
 const { QueueClient } = require('@azure/storage-queue');
+const { ContainerClient } = require('@azure/storage-blob');
+
+// Queue payload envelope (mirrors codex_agent/queue_payload.py): bodies above
+// the compress threshold are zlib-compressed, and anything still above the
+// inline cap is uploaded to blob storage with only a reference queued.
+const COMPRESS_THRESHOLD = parseInt(process.env.QUEUE_COMPRESS_THRESHOLD || '4096', 10);
+const MAX_INLINE_BYTES = parseInt(process.env.QUEUE_MAX_INLINE_BYTES || String(48 * 1024), 10);
+const OVERFLOW_CONTAINER = process.env.QUEUE_OVERFLOW_CONTAINER || 'queueoverflow';
 
 // Application bootstrap
 console.log(`Starting application at ${new Date().toISOString()}`);
@@ -21,7 +31,26 @@ try {
   process.exit(1);
 }
 
-function runCommand(cmd, opts = {}) {
+// Heartbeats for long queued commands: every HEARTBEAT_MS the worker extends the
+// command's visibility and sends {message_id, type: 'heartbeat', elapsed,
+// output_bytes, tail} on the response channel, always as plain JSON (never packed)
+// so waiters can recognise it; tail lines are capped to keep heartbeats small.
+const HEARTBEAT_MS = parseInt(process.env.HEARTBEAT_MS || '15000', 10);
+// Heartbeats expire after two intervals, so ones nobody consumes (the response was
+// already taken or the waiter gave up) don't pile up in the shared response queue
+const HEARTBEAT_TTL_SECONDS = Math.max(1, Math.ceil(2 * HEARTBEAT_MS / 1000));
+const VISIBILITY_TIMEOUT = 60;
+const HEARTBEAT_TAIL_LINES = 5;
+const HEARTBEAT_TAIL_LINE_CHARS = 200;
+
+function trackOutput(progress, text) {
+  if (!progress) return;
+  progress.outputBytes += Buffer.byteLength(text);
+  const lines = text.split('\n').filter(line => line.trim()).map(line => line.slice(0, HEARTBEAT_TAIL_LINE_CHARS));
+  progress.tail = progress.tail.concat(lines).slice(-HEARTBEAT_TAIL_LINES);
+}
+
+function runCommand(cmd, opts = {}, progress = null) {
   console.log(`Executing command: ${cmd} (cwd=${opts.cwd || 'default'})`);
   return new Promise((resolve, reject) => {
     const child = spawn(shellBin, ['-c', cmd], { ...opts, env: process.env });
@@ -30,11 +59,13 @@ function runCommand(cmd, opts = {}) {
     child.stdout.on('data', d => {
       const text = d.toString();
       stdout += text;
+      trackOutput(progress, text);
       console.log(`stdout: ${text.trim()}`);
     });
     child.stderr.on('data', d => {
       const text = d.toString();
       stderr += text;
+      trackOutput(progress, text);
       console.error(`stderr: ${text.trim()}`);
     });
     child.on('close', code => {
@@ -52,7 +83,6 @@ function runCommand(cmd, opts = {}) {
 (async () => {
   console.log('Initializing queues');
   const connStr = process.env.AZURE_STORAGE_CONNECTION_STRING;
-  console.log('AZURE_STORAGE_CONNECTION_STRING:', connStr); // Log the connection string at startup
   
   // Extract and log storage account name for verification
   try {
@@ -74,6 +104,48 @@ function runCommand(cmd, opts = {}) {
   console.log(`Using response queue: ${responseQueueName}`);
   const cmdQueue = new QueueClient(connStr, commandQueueName);
   const rspQueue = new QueueClient(connStr, responseQueueName);
+  const overflowContainer = new ContainerClient(connStr, OVERFLOW_CONTAINER);
+  let overflowReady = false;
+
+  async function packMessage(body) {
+    const raw = JSON.stringify(body);
+    if (Buffer.byteLength(raw) <= COMPRESS_THRESHOLD) return raw;
+    const compressed = zlib.deflateSync(Buffer.from(raw), { level: 6 });
+    const inline = JSON.stringify({ message_id: body.message_id, encoding: 'zlib', data: compressed.toString('base64') });
+    if (inline.length <= MAX_INLINE_BYTES) return inline;
+    if (!overflowReady) {
+      await overflowContainer.createIfNotExists();
+      overflowReady = true;
+    }
+    const blobName = `${body.message_id || 'msg'}-${crypto.randomBytes(4).toString('hex')}.json.z`;
+    await overflowContainer.getBlockBlobClient(blobName).uploadData(compressed);
+    console.log(`📦 Response ${body.message_id} overflowed to blob ${blobName} (${compressed.length} bytes)`);
+    return JSON.stringify({ message_id: body.message_id, encoding: 'zlib+blob', blob: blobName });
+  }
+
+  async function unpackMessage(envelope) {
+    if (envelope.encoding === 'zlib') {
+      return JSON.parse(zlib.inflateSync(Buffer.from(envelope.data, 'base64')).toString());
+    }
+    if (envelope.encoding === 'zlib+blob') {
+      const blob = overflowContainer.getBlockBlobClient(envelope.blob);
+      const data = await blob.downloadToBuffer();
+      await blob.deleteIfExists();
+      return JSON.parse(zlib.inflateSync(data).toString());
+    }
+    return envelope;
+  }
+
+  // Per-task reply queues: the sender may name a private response queue
+  // (always "<responseQueueName>-<task>") in the message's reply_to field.
+  const replyQueues = new Map();
+  function responseQueueFor(replyTo) {
+    if (!replyTo || !replyTo.startsWith(`${responseQueueName}-`)) return rspQueue;
+    if (!replyQueues.has(replyTo)) {
+      replyQueues.set(replyTo, new QueueClient(connStr, replyTo));
+    }
+    return replyQueues.get(replyTo);
+  }
   
   // Verify queues exist with retry logic (created by ARM template)
   async function verifyQueuesWithRetry(maxRetries = 10, baseDelay = 5000) {
@@ -169,48 +241,93 @@ function runCommand(cmd, opts = {}) {
   
   let consecutiveErrors = 0;
   const maxConsecutiveErrors = 5;
+
+  // Adaptive idle polling: re-poll immediately after work, then back off
+  // (with jitter) while the queue stays empty.
+  const minIdleDelay = parseInt(process.env.QUEUE_POLL_MIN_MS || '100', 10);
+  const maxIdleDelay = parseInt(process.env.QUEUE_POLL_MAX_MS || '2000', 10);
+  let idleDelay = minIdleDelay;
+  function nextIdleDelay() {
+    const delay = idleDelay * (0.8 + Math.random() * 0.4);
+    idleDelay = Math.min(idleDelay * 1.5, maxIdleDelay);
+    return delay;
+  }
   
   /**
    * Poll the command queue at intervals to process incoming messages.
    */
   async function pollQueue() {
+    let nextDelay = 0;
     try {
-      console.log('🔍 Polling for commands at', new Date().toISOString());
-      const { receivedMessageItems } = await cmdQueue.receiveMessages({ numberOfMessages: 1, visibilityTimeout: 30 });
+      const { receivedMessageItems } = await cmdQueue.receiveMessages({ numberOfMessages: 1, visibilityTimeout: VISIBILITY_TIMEOUT });
       
       // Reset error counter on successful poll
       consecutiveErrors = 0;
       
       if (receivedMessageItems.length === 0) {
-        console.log('📭 No messages, waiting...');
+        nextDelay = nextIdleDelay();
       } else {
+        idleDelay = minIdleDelay;
         for (const msg of receivedMessageItems) {
           console.log('Message received');
-          console.log('AZURE_STORAGE_CONNECTION_STRING (on command receive):', connStr);
           let payload, result;
+          let popReceipt = msg.popReceipt;
           try {
-            payload = JSON.parse(msg.messageText);
+            payload = await unpackMessage(JSON.parse(msg.messageText));
             console.log('Payload:', payload);
           } catch {
             console.error('Invalid JSON');
             result = { success: false, error: 'Bad JSON' };
           }
           if (!result) {
-            const { command, project_name, message_id } = payload;
+            const { command, project_name, message_id, reply_to } = payload;
             const cwd = project_name && (path.isAbsolute(project_name)
               ? project_name
               : path.join(PROJECTS_DIR, project_name));
+            const progress = { started: Date.now(), outputBytes: 0, tail: [] };
+            async function sendHeartbeat() {
+              try {
+                const updated = await cmdQueue.updateMessage(msg.messageId, popReceipt, undefined, VISIBILITY_TIMEOUT);
+                popReceipt = updated.popReceipt;
+                await responseQueueFor(reply_to).sendMessage(JSON.stringify({
+                  message_id,
+                  type: 'heartbeat',
+                  state: 'running',
+                  elapsed: (Date.now() - progress.started) / 1000,
+                  output_bytes: progress.outputBytes,
+                  tail: progress.tail
+                }), { messageTimeToLive: HEARTBEAT_TTL_SECONDS });
+              } catch (e) {
+                console.error('Heartbeat failed for', message_id, e.message);
+              }
+            }
+            // Ticks are chained so the last one can be awaited: it may still be
+            // rotating popReceipt or sending a heartbeat when the command ends
+            let heartbeatTick = Promise.resolve();
+            const heartbeat = setInterval(() => {
+              heartbeatTick = heartbeatTick.then(sendHeartbeat);
+            }, HEARTBEAT_MS);
             try {
-              const { stdout, stderr } = await runCommand(command, { cwd });
+              const { stdout, stderr } = await runCommand(command, { cwd }, progress);
               result = { success: true, stdout, stderr };
             } catch (e) {
               console.error('Command error:', e.message);
               result = { success: false, error: e.message };
+            } finally {
+              clearInterval(heartbeat);
+              await heartbeatTick;
+            }
+            try {
+              await responseQueueFor(reply_to).sendMessage(await packMessage({ message_id, ...result }));
+              console.log('Response sent for', message_id);
+            } catch (e) {
+              // Reply queue was deleted (task ended or timed out); drop the response
+              if (e.statusCode !== 404) throw e;
+              replyQueues.delete(reply_to);
+              console.log('Reply queue gone for', message_id);
             }
-            await rspQueue.sendMessage(JSON.stringify({ message_id, ...result }));
-            console.log('Response sent for', message_id);
           }
-          await cmdQueue.deleteMessage(msg.messageId, msg.popReceipt);
+          await cmdQueue.deleteMessage(msg.messageId, popReceipt);
           console.log('Message deleted');
         }
       }
@@ -238,8 +355,8 @@ function runCommand(cmd, opts = {}) {
       return;
     }
     
-    // Normal polling interval
-    setTimeout(pollQueue, 5000);
+    // Poll again right away after work, otherwise after the adaptive idle delay
+    setTimeout(pollQueue, nextDelay);
   }
   
   console.log('🏃 Starting queue polling...');
@@ -0,0 +1,91 @@
+"""Exercise the async GitHub client's PR flow against a local stub GitHub API.
+
+Run `python test_github_client.py`. The stub serves ETags, answers one request
+with a rate-limit response, and records every call, so the script checks
+conditional caching, retry/backoff and the Git Data API sequence without
+touching github.com.
+"""
+import asyncio
+import os
+
+from aiohttp import web
+
+os.environ.setdefault("GITHUB_API_URL", "http://127.0.0.1:8765")
+from orchestrator.github_client import GitHubClient, close_github_session  # noqa: E402
+
+calls = []
+rate_limited = {"done": False}
+
+def json_with_etag(request, body, etag):
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304)
+    return web.json_response(body, headers={"ETag": etag})
+
+async def get_repo(request):
+    calls.append("GET repo")
+    return json_with_etag(request, {"default_branch": "main"}, '"repo-v1"')
+
+async def get_ref(request):
+    calls.append("GET ref")
+    return json_with_etag(request, {"object": {"sha": "base123"}}, '"ref-v1"')
+
+async def get_commit(request):
+    calls.append("GET commit")
+    return json_with_etag(request, {"tree": {"sha": "tree000"}}, '"commit-v1"')
+
+async def create_tree(request):
+    calls.append("POST tree")
+    body = await request.json()
+    assert body["base_tree"] == "tree000" and len(body["tree"]) == 2, body
+    return web.json_response({"sha": "tree111"}, status=201)
+
+async def create_commit(request):
+    calls.append("POST commit")
+    body = await request.json()
+    assert body["parents"] == ["base123"] and body["tree"] == "tree111", body
+    return web.json_response({"sha": "commit222"}, status=201)
+
+async def create_ref(request):
+    calls.append("POST ref")
+    body = await request.json()
+    assert body["sha"] == "commit222", body
+    return web.json_response({"ref": body["ref"]}, status=201)
+
+async def create_pull(request):
+    calls.append("POST pull")
+    if not rate_limited["done"]:
+        rate_limited["done"] = True
+        return web.json_response({"message": "secondary rate limit"}, status=403, headers={"Retry-After": "1"})
+    return web.json_response({"html_url": "https://github.com/octo/demo/pull/1"}, status=201)
+
+async def main():
+    app = web.Application()
+    app.router.add_get("/repos/{owner}/{repo}", get_repo)
+    app.router.add_get("/repos/{owner}/{repo}/git/ref/heads/{branch}", get_ref)
+    app.router.add_get("/repos/{owner}/{repo}/git/commits/{sha}", get_commit)
+    app.router.add_post("/repos/{owner}/{repo}/git/trees", create_tree)
+    app.router.add_post("/repos/{owner}/{repo}/git/commits", create_commit)
+    app.router.add_post("/repos/{owner}/{repo}/git/refs", create_ref)
+    app.router.add_post("/repos/{owner}/{repo}/pulls", create_pull)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 8765).start()
+    try:
+        client = GitHubClient("test-token")
+        files = {"documentation.md": "# Docs", "docs/extra.md": "More"}
+        pr = await client.open_pull_request_with_files("octo", "demo", files, "Add docs", branch="docs-1")
+        assert pr["html_url"].endswith("/pull/1"), pr
+        assert calls.count("POST pull") == 2, calls  # retried after Retry-After
+        print(f"OK: first PR {pr['html_url']} ({client.stats})")
+
+        # Repo metadata and branch SHA are now served from the ETag cache (304s)
+        rate_limited["done"] = True
+        await client.open_pull_request_with_files("octo", "demo", files, "Add docs", branch="docs-2")
+        assert client.stats["not_modified"] >= 3, client.stats
+        print(f"OK: second PR with conditional requests ({client.stats})")
+    finally:
+        await close_github_session()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
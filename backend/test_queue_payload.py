@@ -0,0 +1,34 @@
+"""Round-trip large sandbox outputs through the queue against a local Azurite emulator.
+
+Start Azurite first (e.g. `docker run -p 10000:10000 -p 10001:10001 mcr.microsoft.com/azure-storage/azurite`),
+then run `python test_queue_payload.py`. This script plays the sandbox worker itself.
+"""
+import os
+from azure.core.exceptions import ResourceExistsError
+from codex_agent.azure_queue import AzureQueueManager
+
+conn_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "UseDevelopmentStorage=true")
+
+def main():
+    queue_mgr = AzureQueueManager(conn_str)
+    for client in (queue_mgr.queue_client, queue_mgr.response_queue):
+        try:
+            client.create_queue()
+        except ResourceExistsError:
+            pass
+
+    # plain JSON, zlib inline, and blob claim-check respectively
+    for label, size in (("small", 100), ("compressed", 200_000), ("claim-check", 400_000)):
+        print(f"\nTesting {label} output ({size} bytes):")
+        message_id = queue_mgr.send_command(f"generate {size} bytes")
+        command = queue_mgr.receive_command()
+        assert command and command["message_id"] == message_id, command
+        # random hex defeats compression so the largest case must overflow to blob
+        stdout = os.urandom(size // 2).hex() if label == "claim-check" else "x" * size
+        queue_mgr.send_response({"message_id": message_id, "success": True, "stdout": stdout, "stderr": ""})
+        result = queue_mgr.wait_for_response(message_id, timeout=30)
+        assert result["stdout"] == stdout, "stdout did not round-trip"
+        print(f"OK: {len(result['stdout'])} bytes in {result['rtt_seconds']:.3f}s")
+
+if __name__ == "__main__":
+    main()
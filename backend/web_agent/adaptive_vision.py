@@ -0,0 +1,186 @@
+"""
+Adaptive vision for the browser agent.
+
+Documentation pages are mostly text, so sending a full PNG screenshot to the
+model on every step costs far more tokens and upload time than it is worth.
+In "adaptive" mode a step only gets a screenshot when:
+
+- the page looks visually complex (little text, or canvas/video content), or
+- the agent asks for it (its last thought mentions something visual) or the
+  previous step failed.
+
+Screenshots that are sent are downscaled and reduced to a colour palette,
+staying PNG because browser-use labels them image/png. A screenshot
+whose perceptual hash matches the last one sent is dropped, because the
+model has already seen that page. Savings are reported per step and per run.
+
+BROWSER_VISION_MODE is "adaptive" (default), "always" (every step, still
+compressed) or "never" (DOM/text only).
+"""
+import base64
+import io
+import logging
+import math
+import os
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # screenshots are passed through unchanged
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+BROWSER_VISION_MODE = os.getenv("BROWSER_VISION_MODE", "adaptive")
+SCREENSHOT_MAX_WIDTH = int(os.getenv("BROWSER_SCREENSHOT_MAX_WIDTH", "1024"))
+# Palette size of sent screenshots (at most 256); text-heavy pages lose little at 256
+SCREENSHOT_COLORS = min(int(os.getenv("BROWSER_SCREENSHOT_COLORS", "256")), 256)
+# Screenshots whose 64-bit difference hashes differ in at most this many bits count as unchanged
+SCREENSHOT_HASH_DISTANCE = int(os.getenv("BROWSER_SCREENSHOT_HASH_DISTANCE", "4"))
+
+# Assumed screenshot size until the first real one is seen
+DEFAULT_VIEWPORT = (1280, 1100)
+# A page with less visible text than this is probably rendered visually (SPA shell, canvas, captcha)
+MIN_TEXT_CHARS = 400
+VISUAL_REQUEST = re.compile(r"\b(screenshot|image|picture|diagram|chart|visual(?:ly)?|icon|layout|look at the page|see the page)\b", re.I)
+
+PAGE_PROBE = """() => ({
+    text: document.body ? document.body.innerText.length : 0,
+    media: document.querySelectorAll('canvas, video').length
+})"""
+
+def image_tokens(width: int, height: int) -> int:
+    """OpenAI high-detail image token cost: fit in 2048x2048, shortest side to 768, 170 per 512px tile + 85"""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+def difference_hash(image) -> int:
+    """64-bit dHash: brightness gradients of a 9x8 grayscale thumbnail"""
+    pixels = list(image.convert("L").resize((9, 8)).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+class AdaptiveVision:
+    """Decides per step whether the agent sees a screenshot, and shrinks the ones it does see"""
+
+    def __init__(self, mode: str = BROWSER_VISION_MODE):
+        self.mode = mode if mode in ("adaptive", "always", "never") else "adaptive"
+        self._wanted = self.mode == "always"
+        self._step = 0
+        self._last_hash: Optional[int] = None
+        self._steps: Dict[int, Dict[str, Any]] = {}
+        self._full_tokens = image_tokens(*DEFAULT_VIEWPORT)
+        self.totals = {"screenshots_sent": 0, "screenshots_skipped": 0, "bytes_saved": 0, "tokens_saved": 0}
+
+    @contextmanager
+    def attach(self, agent):
+        """Route the agent's screenshots through this policy for the duration of a run"""
+        session = agent.browser_session
+        original = session.take_screenshot
+
+        async def take_screenshot(*args, **kwargs):
+            return await self._screenshot(original, *args, **kwargs)
+
+        # Instance attribute shadows the method; the session may be reused by later runs, so restore it
+        object.__setattr__(session, "take_screenshot", take_screenshot)
+        agent.settings.use_vision = self.mode != "never"
+        try:
+            yield self
+        finally:
+            session.__dict__.pop("take_screenshot", None)
+
+    async def before_step(self, agent) -> None:
+        """on_step_start hook: decide whether this step gets a screenshot"""
+        self._step = agent.state.n_steps
+        reason = None
+        if self.mode == "always":
+            reason = "always"
+        elif self.mode == "adaptive":
+            reason = self._agent_asked(agent) or await self._page_is_visual(agent)
+        self._wanted = reason is not None
+        if self._wanted:
+            self._steps[self._step] = {"screenshot": "requested", "reason": reason}
+        else:
+            # Never captured, so the saving is estimated from the last full-size screenshot
+            self._steps[self._step] = {"screenshot": "dom_only", "reason": None,
+                                       "tokens_saved": self._full_tokens, "estimated": True}
+            self.totals["screenshots_skipped"] += 1
+            self.totals["tokens_saved"] += self._full_tokens
+
+    def _agent_asked(self, agent) -> Optional[str]:
+        items = agent.state.history.history
+        if not items:
+            return None
+        last = items[-1]
+        if any(getattr(r, "error", None) for r in getattr(last, "result", None) or []):
+            return "previous_step_failed"
+        model_output = getattr(last, "model_output", None)
+        brain = getattr(model_output, "current_state", None) or model_output
+        text = " ".join(str(getattr(brain, f, None) or "") for f in ("thinking", "memory", "next_goal"))
+        return "agent_requested" if VISUAL_REQUEST.search(text) else None
+
+    async def _page_is_visual(self, agent) -> Optional[str]:
+        try:
+            page = await agent.browser_session.get_current_page()
+            if not page.url or page.url.startswith("about:"):
+                return None
+            probe = await page.evaluate(PAGE_PROBE)
+        except Exception as e:
+            logger.debug(f"Page probe failed, attaching a screenshot: {e}")
+            return "probe_failed"
+        if probe["media"]:
+            return "canvas_or_video"
+        if probe["text"] < MIN_TEXT_CHARS:
+            return "little_text"
+        return None
+
+    async def _screenshot(self, take_original, *args, **kwargs) -> Optional[str]:
+        if not self._wanted:
+            # Not even captured: saves the capture time too
+            return None
+        report = self._steps.setdefault(self._step, {"screenshot": "requested", "reason": None})
+        original = await take_original(*args, **kwargs)
+        if not original or Image is None:
+            return original
+        try:
+            image = Image.open(io.BytesIO(base64.b64decode(original)))
+            original_tokens = self._full_tokens = image_tokens(*image.size)
+            if image.width > SCREENSHOT_MAX_WIDTH:
+                image = image.resize((SCREENSHOT_MAX_WIDTH, round(image.height * SCREENSHOT_MAX_WIDTH / image.width)))
+            image_hash = difference_hash(image)
+            if self.mode == "adaptive" and self._last_hash is not None and \
+                    bin(image_hash ^ self._last_hash).count("1") <= SCREENSHOT_HASH_DISTANCE:
+                report.update(screenshot="unchanged", bytes_saved=len(original), tokens_saved=original_tokens)
+                self.totals["screenshots_skipped"] += 1
+                self.totals["bytes_saved"] += len(original)
+                self.totals["tokens_saved"] += original_tokens
+                return None
+            buffer = io.BytesIO()
+            # Still PNG: browser-use sends screenshots as data:image/png URLs
+            image.convert("RGB").quantize(colors=SCREENSHOT_COLORS).save(buffer, format="PNG", optimize=True)
+            compressed = base64.b64encode(buffer.getvalue()).decode()
+        except Exception as e:
+            logger.debug(f"Could not compress screenshot, sending original: {e}")
+            return original
+        self._last_hash = image_hash
+        tokens_saved = original_tokens - image_tokens(*image.size)
+        report.update(screenshot="sent", bytes_saved=len(original) - len(compressed), tokens_saved=tokens_saved)
+        self.totals["screenshots_sent"] += 1
+        self.totals["bytes_saved"] += len(original) - len(compressed)
+        self.totals["tokens_saved"] += tokens_saved
+        return compressed
+
+    def report(self, step: int) -> Optional[Dict[str, Any]]:
+        """What happened to the screenshot of a step, with its savings"""
+        return self._steps.get(step)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"mode": self.mode, **self.totals}
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import random
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+ANCHOR_API_URL = "https://api.anchorbrowser.io/v1"
+ANCHOR_MAX_CONCURRENCY = int(os.getenv("ANCHOR_MAX_CONCURRENCY", "8"))
+ANCHOR_TIMEOUT = float(os.getenv("ANCHOR_TIMEOUT", "30"))
+ANCHOR_MAX_RETRIES = int(os.getenv("ANCHOR_MAX_RETRIES", "3"))
+ANCHOR_BACKOFF_BASE = float(os.getenv("ANCHOR_BACKOFF_BASE", "0.5"))
+
+# Statuses worth retrying. Non-idempotent requests (session/profile creation)
+# only retry on 429, where the server guarantees nothing was created.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class AnchorAPIError(Exception):
+    """Non-success response from the Anchor API"""
+
+    def __init__(self, status: int, body: Any, method: str, path: str):
+        super().__init__(f"Anchor {method} {path} failed with status {status}: {body}")
+        self.status = status
+        self.body = body
+
+class AnchorClient:
+    """Async Anchor Browser API client with a keep-alive connection pool,
+    bounded concurrency, per-request timeouts and retry with backoff."""
+
+    def __init__(self, api_key: str, base_url: str = ANCHOR_API_URL, max_concurrency: int = ANCHOR_MAX_CONCURRENCY,
+                 timeout: float = ANCHOR_TIMEOUT, max_retries: int = ANCHOR_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = aiohttp.ClientSession(
+            headers={"anchor-api-key": api_key},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            connector=aiohttp.TCPConnector(limit=max_concurrency, keepalive_timeout=60),
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self._session.closed
+
+    async def close(self) -> None:
+        if not self._session.closed:
+            await self._session.close()
+
+    async def request(self, method: str, path: str, json: Optional[Dict] = None,
+                      idempotent: bool = True) -> Tuple[int, Any]:
+        """Send a request and return (status, body); body is the parsed JSON, or the raw text if it isn't JSON.
+
+        Transient failures are retried with jittered exponential backoff;
+        the final response is returned as-is for the caller to interpret.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    async with self._session.request(method, url, json=json) as response:
+                        retryable = response.status == 429 or (idempotent and response.status in RETRY_STATUSES)
+                        if not retryable or attempt >= self.max_retries:
+                            try:
+                                body = await response.json(content_type=None)
+                            except ValueError:
+                                body = await response.text()
+                            return response.status, body
+                        retry_after = response.headers.get("Retry-After")
+                print(f"[DEBUG] Anchor {method} {path} returned {response.status}, retrying (attempt {attempt + 1})")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # Only a failure to connect means the request was never sent; after a
+                # disconnect or timeout a non-idempotent request may have been applied
+                if attempt >= self.max_retries or (not idempotent and not isinstance(e, aiohttp.ClientConnectorError)):
+                    raise
+                retry_after = None
+                print(f"[DEBUG] Anchor {method} {path} failed ({type(e).__name__}: {e}), retrying (attempt {attempt + 1})")
+            attempt += 1
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else ANCHOR_BACKOFF_BASE * 2 ** (attempt - 1)
+            await asyncio.sleep(delay * (1 + random.uniform(0, 0.25)))
+
+# One client (and connection pool) per event loop
+_clients: Dict[int, AnchorClient] = {}
+
+def get_anchor_client() -> AnchorClient:
+    """Return the shared Anchor client of the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(id(loop))
+    if client is None or client.closed:
+        load_dotenv()
+        api_key = os.getenv('ANCHOR_API_KEY')
+        if not api_key:
+            raise ValueError('ANCHOR_API_KEY not set')
+        client = AnchorClient(api_key)
+        _clients[id(loop)] = client
+    return client
+
+async def close_anchor_client() -> None:
+    """Close the running loop's Anchor client (call on app shutdown)"""
+    client = _clients.pop(id(asyncio.get_running_loop()), None)
+    if client:
+        await client.close()
+
+async def anchor_request(method: str, path: str, json: Optional[Dict] = None, idempotent: bool = True) -> Any:
+    """Send a request with the shared client, raising AnchorAPIError unless it returns 200"""
+    status, body = await get_anchor_client().request(method, path, json=json, idempotent=idempotent)
+    if status != 200:
+        raise AnchorAPIError(status, body, method, path)
+    return body
+
+def run_sync(coro):
+    """Run an Anchor coroutine from synchronous code (CLI scripts), closing the client afterwards"""
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await close_anchor_client()
+    return asyncio.run(runner())
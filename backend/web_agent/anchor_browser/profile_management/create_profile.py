@@ -1,15 +1,6 @@
-import requests
-import os
-from dotenv import load_dotenv
-def create_anchor_profile(name: str, description: str, session_id: str = None, store_cache: bool = True):
-    
+from ..anchor_client import anchor_request
 
-    load_dotenv()
-    api_key = os.getenv('ANCHOR_API_KEY')
-    if not api_key:
-        raise ValueError('ANCHOR_API_KEY not set')
-
-    url = "https://api.anchorbrowser.io/v1/profiles"
+async def create_anchor_profile(name: str, description: str, session_id: str = None, store_cache: bool = True):
 
     payload = {
         "name": name,
@@ -19,14 +10,4 @@ def create_anchor_profile(name: str, description: str, session_id: str = None, s
         "store_cache": store_cache
     }
 
-    headers = {
-        "anchor-api-key": api_key,
-        "Content-Type": "application/json"
-    }
-
-    response = requests.request("POST", url, json=payload, headers=headers)
-
-    if response.status_code == 200:
-        return response.json()
-    else:
-        response.raise_for_status()
\ No newline at end of file
+    return await anchor_request("POST", "profiles", json=payload, idempotent=False)
@@ -1,28 +1,19 @@
-import requests
-import os
-from dotenv import load_dotenv
+"""
+End all Anchor browser sessions.
 
-def end_all_anchor_sessions():
-    
+Run as a module from backend/ (the relative imports need the package):
+    python -m web_agent.anchor_browser.session_management.anchor_browser_end_all_sessions
+"""
+from ..anchor_client import anchor_request, run_sync
 
-    load_dotenv()
-    api_key = os.getenv('ANCHOR_API_KEY')
-    if not api_key:
-        raise ValueError('ANCHOR_API_KEY not set')
+async def end_all_anchor_sessions():
 
-    url = "https://api.anchorbrowser.io/v1/sessions/all"
-    headers = {"anchor-api-key": api_key}
-
-    response = requests.request("DELETE", url, headers=headers)
-
-    if response.status_code == 200:
-        return {"data": {"status": "success"}}
-    else:
-        response.raise_for_status()
+    await anchor_request("DELETE", "sessions/all")
+    return {"data": {"status": "success"}}
 
 def main():
-    result = end_all_anchor_sessions()
+    result = run_sync(end_all_anchor_sessions())
     print("Result:", result)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,25 +1,22 @@
-import requests
-from dotenv import load_dotenv
-import os
+"""
+Start an Anchor browser session.
 
-def start_anchor_session():
+Run as a module from backend/ (the relative imports need the package):
+    python -m web_agent.anchor_browser.session_management.anchor_session_start
+"""
+from ..anchor_client import anchor_request, run_sync
 
-    load_dotenv()
-    api_key = os.getenv('ANCHOR_API_KEY')
-    if not api_key:
-        raise ValueError('ANCHOR_API_KEY not set')
+async def start_anchor_session():
 
-    response = requests.post(
-        "https://api.anchorbrowser.io/v1/sessions",
-        headers={
-            "anchor-api-key": api_key,
-            "Content-Type": "application/json",
-        },
+    response = await anchor_request(
+        "POST",
+        "sessions",
         json={
           "browser": {
             "headless": {"active": False} # Use headless false to view the browser when combining with browser-use
           }
-        }).json()
+        },
+        idempotent=False)
 
     # Access the data object from the response
     session_data = response["data"]
@@ -33,7 +30,7 @@ def start_anchor_session():
     }
 
 def main():
-    session_info = start_anchor_session()
+    session_info = run_sync(start_anchor_session())
     print("Session Info:", session_info)
 
 if __name__ == "__main__":
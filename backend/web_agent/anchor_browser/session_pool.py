@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from .session_management.anchor_browser_session_end import end_anchor_session
+from .session_management.anchor_session_start import start_anchor_session
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_POOL_SIZE = int(os.getenv("ANCHOR_POOL_SIZE", "2"))
+ANCHOR_POOL_IDLE_TTL = float(os.getenv("ANCHOR_POOL_IDLE_TTL", "300"))
+ANCHOR_POOL_LEASE_TIMEOUT = float(os.getenv("ANCHOR_POOL_LEASE_TIMEOUT", "1800"))
+ANCHOR_POOL_MAX_USES = int(os.getenv("ANCHOR_POOL_MAX_USES", "5"))
+RESET_TIMEOUT = 15.0
+REAP_INTERVAL = 30.0
+
+class PooledSession:
+    """An Anchor browser session tracked by the pool"""
+
+    def __init__(self, session_info: Dict):
+        data = session_info["data"]
+        self.id = data["id"]
+        self.cdp_url = data["cdp_url"]
+        self.live_view_url = data["live_view_url"]
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.leased_at: Optional[float] = None
+        self.uses = 0
+
+    def info(self) -> Dict:
+        """Same shape as start_anchor_session()"""
+        return {"data": {"id": self.id, "cdp_url": self.cdp_url, "live_view_url": self.live_view_url}}
+
+class BrowserSessionPool:
+    """Keeps pre-provisioned Anchor sessions warm and leases them out.
+
+    lease() hands out an idle session (or creates one on a miss) and refills
+    the pool in the background; release() resets the browser and returns it,
+    or ends it once it has been used max_uses times. A reaper ends sessions
+    idle longer than idle_ttl and leases held longer than lease_timeout, so
+    sessions nobody returns stop costing money. The reaper never refills:
+    an idle server drains to zero sessions and the next lease() warms the
+    pool up again.
+    """
+
+    def __init__(self, size: int = ANCHOR_POOL_SIZE, idle_ttl: float = ANCHOR_POOL_IDLE_TTL,
+                 lease_timeout: float = ANCHOR_POOL_LEASE_TIMEOUT, max_uses: int = ANCHOR_POOL_MAX_USES):
+        self.size = size
+        self.idle_ttl = idle_ttl
+        self.lease_timeout = lease_timeout
+        self.max_uses = max_uses
+        self._idle: Dict[str, PooledSession] = {}
+        self._leased: Dict[str, PooledSession] = {}
+        self._provisioning = 0
+        self._reaper: Optional[asyncio.Task] = None
+        self._background = set()
+        self.counters = {"created": 0, "hits": 0, "misses": 0, "returned": 0, "ended": 0, "reaped": 0, "create_failures": 0}
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def start(self) -> None:
+        """Fill the pool and start the reaper"""
+        self._ensure_reaper()
+        await self._refill()
+        logger.info(f"Browser session pool started with {len(self._idle)} idle session(s)")
+
+    async def lease(self) -> Dict:
+        """Lease a session; returns start_anchor_session()-shaped info"""
+        # The pool also works without start(); stale sessions must still be reaped
+        self._ensure_reaper()
+        if self._idle:
+            # Most recently used first: its CDP endpoint is the warmest
+            session = self._idle.pop(max(self._idle, key=lambda k: self._idle[k].last_used))
+            self.counters["hits"] += 1
+        else:
+            self.counters["misses"] += 1
+            session = await self._create()
+        session.leased_at = time.monotonic()
+        session.uses += 1
+        self._leased[session.id] = session
+        self._spawn(self._refill())
+        logger.info(f"Leased browser session {session.id} (use {session.uses})")
+        return session.info()
+
+    async def release(self, session_id: str, reusable: bool = True) -> None:
+        """Return a leased session; it is reset and kept warm, or ended if spent or broken"""
+        session = self._leased.pop(session_id, None)
+        if session is None:
+            return
+        if reusable and session.uses < self.max_uses and len(self._idle) < self.size:
+            try:
+                await asyncio.wait_for(self._reset(session), RESET_TIMEOUT)
+                session.last_used = time.monotonic()
+                session.leased_at = None
+                self._idle[session.id] = session
+                self.counters["returned"] += 1
+                logger.info(f"Returned browser session {session.id} to the pool")
+                return
+            except Exception as e:
+                logger.warning(f"Could not reset browser session {session.id}, ending it: {e}")
+        await self._end(session)
+        self._spawn(self._refill())
+
+    def forget_all(self) -> None:
+        """Drop tracked sessions that were ended elsewhere (e.g. end_all_anchor_sessions)"""
+        self._idle.clear()
+        self._leased.clear()
+
+    async def close(self) -> None:
+        """Stop the reaper and end every idle and leased session"""
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        for task in list(self._background):
+            task.cancel()
+        sessions = list(self._idle.values()) + list(self._leased.values())
+        self.forget_all()
+        await asyncio.gather(*(self._end(s) for s in sessions), return_exceptions=True)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "leased": len(self._leased),
+            "provisioning": self._provisioning,
+            "oldest_lease_seconds": max((now - s.leased_at for s in self._leased.values()), default=0.0),
+            **self.counters,
+        }
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _create(self) -> PooledSession:
+        self._provisioning += 1
+        try:
+            session = PooledSession(await start_anchor_session())
+            self.counters["created"] += 1
+            return session
+        except Exception:
+            self.counters["create_failures"] += 1
+            raise
+        finally:
+            self._provisioning -= 1
+
+    async def _refill(self) -> None:
+        missing = self.size - len(self._idle) - self._provisioning
+        if missing <= 0:
+            return
+        results = await asyncio.gather(*(self._create() for _ in range(missing)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, PooledSession):
+                self._idle[result.id] = result
+            else:
+                logger.warning(f"Failed to pre-provision browser session: {result}")
+
+    async def _reset(self, session: PooledSession) -> None:
+        """Close extra tabs, clear cookies and blank the page so the next lease starts clean"""
+        from web_agent.browser_contexts import get_browser_context_manager
+        from playwright.async_api import async_playwright
+
+        # Reuse run_search's open CDP connection when there is one
+        if await get_browser_context_manager().reset(session.cdp_url):
+            return
+
+        async with async_playwright() as p:
+            browser = await p.chromium.connect_over_cdp(session.cdp_url)
+            try:
+                context = browser.contexts[0] if browser.contexts else await browser.new_context()
+                pages = context.pages
+                for page in pages[1:]:
+                    await page.close()
+                page = pages[0] if pages else await context.new_page()
+                await context.clear_cookies()
+                await page.goto("about:blank")
+            finally:
+                # Only disconnects for CDP connections; the remote browser keeps running
+                await browser.close()
+
+    async def _end(self, session: PooledSession) -> None:
+        from web_agent.browser_contexts import get_browser_context_manager
+
+        await get_browser_context_manager().close(session.cdp_url)
+        try:
+            await end_anchor_session(session.id)
+            self.counters["ended"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to end browser session {session.id}: {e}")
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            expired = [s for s in self._idle.values() if now - s.last_used > self.idle_ttl]
+            expired += [s for s in self._leased.values() if now - s.leased_at > self.lease_timeout]
+            for session in expired:
+                self._idle.pop(session.id, None)
+                self._leased.pop(session.id, None)
+                self.counters["reaped"] += 1
+                logger.info(f"Reaping browser session {session.id}")
+                await self._end(session)
+
+# Application-scoped pool
+_pool: Optional[BrowserSessionPool] = None
+
+def get_session_pool() -> BrowserSessionPool:
+    """Return the shared session pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        _pool = BrowserSessionPool()
+    return _pool
+
+async def close_session_pool() -> None:
+    """End all pooled sessions (call on application shutdown)"""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
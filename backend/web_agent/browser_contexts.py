@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from browser_use import BrowserSession
+
+logger = logging.getLogger(__name__)
+
+# Close CDP connections nobody has used for this many seconds
+BROWSER_CONTEXT_IDLE_TTL = float(os.getenv("BROWSER_CONTEXT_IDLE_TTL", "120"))
+REAP_INTERVAL = 30.0
+
+class _Connection:
+    """An open browser-use session (Playwright CDP connection) for one CDP URL"""
+
+    def __init__(self, cdp_url: str, session: BrowserSession, connect_seconds: float):
+        self.cdp_url = cdp_url
+        self.session = session
+        self.connect_seconds = connect_seconds
+        self.last_used = time.monotonic()
+        self.leases = 0
+        self.uses = 0
+
+def _is_connected(session: BrowserSession) -> bool:
+    browser = getattr(session, "browser", None)
+    if browser is not None and hasattr(browser, "is_connected"):
+        return browser.is_connected()
+    return getattr(session, "browser_context", None) is not None
+
+class BrowserContextManager:
+    """Keeps one CDP connection open per CDP URL and hands out fresh tabs on it.
+
+    run_search used to build a new BrowserSession per call and never close it,
+    paying the CDP handshake every time and leaking connections. tab() reuses
+    the open connection (reconnecting if it dropped), opens a new tab for the
+    caller and closes the tabs it opened afterwards. Connections idle longer
+    than idle_ttl are closed by a reaper.
+    """
+
+    def __init__(self, idle_ttl: float = BROWSER_CONTEXT_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._connections: Dict[str, _Connection] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self.counters = {"connects": 0, "reuses": 0, "reconnects": 0, "tabs": 0, "idle_closed": 0, "connect_seconds": 0.0}
+
+    async def _connect(self, cdp_url: str) -> _Connection:
+        started = time.monotonic()
+        # keep_alive: agents must not stop a session other agents will reuse
+        session = BrowserSession(cdp_url=cdp_url, keep_alive=True)
+        await session.start()
+        elapsed = time.monotonic() - started
+        self.counters["connects"] += 1
+        self.counters["connect_seconds"] += elapsed
+        logger.info(f"Opened CDP connection to {cdp_url} in {elapsed:.2f}s")
+        return _Connection(cdp_url, session, elapsed)
+
+    async def _acquire(self, cdp_url: str) -> _Connection:
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+        async with self._locks.setdefault(cdp_url, asyncio.Lock()):
+            connection = self._connections.get(cdp_url)
+            if connection is not None and not _is_connected(connection.session):
+                logger.info(f"CDP connection to {cdp_url} dropped, reconnecting")
+                self.counters["reconnects"] += 1
+                await self._stop(connection)
+                connection = None
+            if connection is None:
+                connection = await self._connect(cdp_url)
+                self._connections[cdp_url] = connection
+            else:
+                self.counters["reuses"] += 1
+                logger.info(f"Reusing CDP connection to {cdp_url} (saved ~{self._average_connect_seconds():.2f}s)")
+            connection.leases += 1
+            connection.uses += 1
+            return connection
+
+    @asynccontextmanager
+    async def tab(self, cdp_url: str) -> AsyncIterator[BrowserSession]:
+        """Yield the shared session for cdp_url focused on a fresh tab; tabs opened meanwhile are closed on exit"""
+        connection = await self._acquire(cdp_url)
+        session = connection.session
+        context = getattr(session, "browser_context", None)
+        existing = {id(page) for page in context.pages} if context else set()
+        try:
+            await session.create_new_tab()
+            self.counters["tabs"] += 1
+            yield session
+        finally:
+            connection.leases -= 1
+            connection.last_used = time.monotonic()
+            if context is not None:
+                await self._close_new_tabs(context, existing)
+
+    async def _close_new_tabs(self, context, existing) -> None:
+        """Close tabs opened during a lease, blanking the last one instead of leaving the browser without pages"""
+        for page in [p for p in context.pages if id(p) not in existing]:
+            try:
+                if len(context.pages) > 1:
+                    await page.close()
+                else:
+                    await page.goto("about:blank")
+            except Exception as e:
+                logger.debug(f"Could not close tab: {e}")
+
+    async def reset(self, cdp_url: str) -> bool:
+        """Close extra tabs, clear cookies and blank the page over the open connection.
+        Returns False when there is no usable connection (the caller should connect itself)."""
+        connection = self._connections.get(cdp_url)
+        context = getattr(connection.session, "browser_context", None) if connection else None
+        if connection is None or connection.leases or context is None or not _is_connected(connection.session):
+            return False
+        pages = context.pages
+        for page in pages[1:]:
+            await page.close()
+        page = pages[0] if pages else await context.new_page()
+        await context.clear_cookies()
+        await page.goto("about:blank")
+        return True
+
+    async def close(self, cdp_url: str) -> None:
+        """Close the connection for a browser that is going away (e.g. its Anchor session ended)"""
+        connection = self._connections.pop(cdp_url, None)
+        self._locks.pop(cdp_url, None)
+        if connection is not None:
+            await self._stop(connection)
+
+    async def close_all(self) -> None:
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        connections = list(self._connections.values())
+        self._connections.clear()
+        self._locks.clear()
+        await asyncio.gather(*(self._stop(c) for c in connections), return_exceptions=True)
+
+    async def _stop(self, connection: _Connection) -> None:
+        # Disconnects only: the remote browser belongs to its Anchor session
+        session = connection.session
+        try:
+            if hasattr(session, "kill"):
+                await session.kill()
+            else:
+                session.keep_alive = False
+                await session.stop()
+        except Exception as e:
+            logger.debug(f"Error closing CDP connection to {connection.cdp_url}: {e}")
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            idle = [c for c in self._connections.values() if not c.leases and now - c.last_used > self.idle_ttl]
+            for connection in idle:
+                self.counters["idle_closed"] += 1
+                logger.info(f"Closing idle CDP connection to {connection.cdp_url}")
+                await self.close(connection.cdp_url)
+
+    def _average_connect_seconds(self) -> float:
+        return self.counters["connect_seconds"] / self.counters["connects"] if self.counters["connects"] else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "open_connections": len(self._connections),
+            "active_tabs": sum(c.leases for c in self._connections.values()),
+            "average_connect_seconds": round(self._average_connect_seconds(), 3),
+            # Each reuse skipped a handshake of roughly the average connect time
+            "estimated_seconds_saved": round(self.counters["reuses"] * self._average_connect_seconds(), 3),
+            **self.counters,
+        }
+
+# Application-scoped manager
+_manager: Optional[BrowserContextManager] = None
+
+def get_browser_context_manager() -> BrowserContextManager:
+    """Return the shared browser context manager, creating it on first use"""
+    global _manager
+    if _manager is None:
+        _manager = BrowserContextManager()
+    return _manager
+
+async def close_browser_context_manager() -> None:
+    """Close every open CDP connection (call on application shutdown)"""
+    global _manager
+    if _manager is not None:
+        manager, _manager = _manager, None
+        await manager.close_all()
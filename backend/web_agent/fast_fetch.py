@@ -0,0 +1,300 @@
+"""
+HTTP fast path for documentation research.
+
+Most research facets boil down to "open the official docs page and read it".
+Before the orchestrator spends an Anchor browser and a vision LLM loop on a
+facet, fetch_facet() tries the cheap route:
+
+1. resolve candidate URLs (the planner's candidate_urls and, if
+   FAST_FETCH_SEARCH_URL is set, the first results of a seed query; URLs named
+   in the task go to the first facet), each URL assigned to one facet only,
+2. fetch them concurrently over a pooled aiohttp session, with the page cache
+   in front (conditional requests for stale entries),
+3. convert the HTML to clean markdown.
+
+It hands off to a full browser (status "handoff" plus a reason) when a page
+needs JavaScript, sits behind a login, or the facet yields too little text.
+"""
+import asyncio
+import logging
+import os
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote_plus, urljoin, urlsplit
+
+import aiohttp
+
+from .page_cache import get_page_cache, urls_in_text
+from .url_registry import normalize_url
+
+logger = logging.getLogger(__name__)
+
+FAST_FETCH_ENABLED = os.getenv("FAST_FETCH_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+FAST_FETCH_TIMEOUT = float(os.getenv("FAST_FETCH_TIMEOUT", "10"))
+FAST_FETCH_MAX_PAGES = int(os.getenv("FAST_FETCH_MAX_PAGES", "3"))
+# A facet answered over HTTP needs at least this much markdown, else a browser takes over
+FAST_FETCH_MIN_CHARS = int(os.getenv("FAST_FETCH_MIN_CHARS", "1500"))
+# Optional HTML search endpoint for seed queries, e.g. https://html.duckduckgo.com/html/?q={query}
+FAST_FETCH_SEARCH_URL = os.getenv("FAST_FETCH_SEARCH_URL", "")
+MAX_RESPONSE_BYTES = 3 * 1024 * 1024
+# Below this a single page is treated as a JavaScript shell or an empty page
+MIN_PAGE_CHARS = 400
+USER_AGENT = "Mozilla/5.0 (compatible; docs-research-bot/1.0)"
+
+LOGIN_PATH = re.compile(r"/(login|log-in|signin|sign-in|sso|auth|oauth|account/login)(/|$)", re.I)
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "nav", "footer",
+             "aside", "form", "button", "select"}
+BLOCK_TAGS = {"p", "div", "section", "table", "ul", "ol", "dl", "blockquote", "figure", "br", "hr", "dt", "dd"}
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "source", "wbr", "area", "base", "col", "embed", "param", "track"}
+
+class _MarkdownConverter(HTMLParser):
+    """Single-pass HTML -> markdown. Prefers <main>/<article> content when the page has it."""
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.parts: List[str] = []
+        self.main_parts: List[str] = []
+        self.title = ""
+        self.signals = {"scripts": 0, "password_input": False, "noscript_js": False}
+        self._skip = 0
+        self._skip_tag: Optional[str] = None
+        self._main = 0
+        self._pre = 0
+        self._lists = 0
+        self._in_title = False
+        self._links: List[Tuple[int, int, Optional[str]]] = []
+
+    def _emit(self, text: str) -> None:
+        self.parts.append(text)
+        if self._main:
+            self.main_parts.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "script":
+            self.signals["scripts"] += 1
+        if tag == "input" and (attrs.get("type") or "").lower() == "password":
+            self.signals["password_input"] = True
+        if self._skip:
+            if tag == self._skip_tag and tag not in VOID_TAGS:
+                self._skip += 1
+            return
+        if tag in SKIP_TAGS:
+            self._skip, self._skip_tag = 1, tag
+            return
+        if tag == "title":
+            self._in_title = True
+        elif tag in ("main", "article"):
+            self._main += 1
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._emit("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self._emit("\n" + "  " * max(self._lists - 1, 0) + "- ")
+        elif tag in ("ul", "ol"):
+            self._lists += 1
+            self._emit("\n")
+        elif tag == "pre":
+            self._pre += 1
+            self._emit("\n\n```\n")
+        elif tag == "code" and not self._pre:
+            self._emit("`")
+        elif tag in ("td", "th"):
+            self._emit(" | ")
+        elif tag == "a":
+            href = attrs.get("href")
+            self._links.append((len(self.parts), len(self.main_parts), urljoin(self.base_url, href) if href else None))
+        elif tag in BLOCK_TAGS:
+            self._emit("\n\n" if tag in ("p", "blockquote", "table", "figure") else "\n")
+
+    def handle_endtag(self, tag):
+        if self._skip:
+            if tag == self._skip_tag:
+                self._skip -= 1
+            return
+        if tag == "title":
+            self._in_title = False
+        elif tag in ("main", "article"):
+            self._main = max(self._main - 1, 0)
+        elif tag in ("ul", "ol"):
+            self._lists = max(self._lists - 1, 0)
+            self._emit("\n")
+        elif tag == "pre":
+            self._pre = max(self._pre - 1, 0)
+            self._emit("\n```\n\n")
+        elif tag == "code" and not self._pre:
+            self._emit("`")
+        elif tag == "a" and self._links:
+            start, main_start, href = self._links.pop()
+            if href and href.startswith("http"):
+                self._wrap_link(self.parts, start, href)
+                if self._main:
+                    self._wrap_link(self.main_parts, main_start, href)
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6", "p", "blockquote", "table"):
+            self._emit("\n\n")
+        elif tag == "tr":
+            self._emit(" |\n")
+
+    @staticmethod
+    def _wrap_link(parts: List[str], start: int, href: str) -> None:
+        text = "".join(parts[start:]).strip()
+        if text:
+            del parts[start:]
+            parts.append(f"[{text}]({href})")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data.strip()
+            return
+        if self._skip:
+            if self._skip_tag == "noscript" and "javascript" in data.lower():
+                self.signals["noscript_js"] = True
+            return
+        self._emit(data if self._pre else re.sub(r"\s+", " ", data))
+
+    def markdown(self) -> str:
+        text = "".join(self.main_parts if len("".join(self.main_parts).strip()) >= MIN_PAGE_CHARS else self.parts)
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        text = re.sub(r"\n[ \t]+(?=[^-\s])", "\n", text)
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def html_to_markdown(html: str, base_url: str = "") -> Tuple[str, str, Dict[str, Any]]:
+    """(title, markdown, signals) for an HTML document; signals feed the hand-off decision"""
+    converter = _MarkdownConverter(base_url)
+    converter.feed(html)
+    converter.close()
+    return converter.title, converter.markdown(), converter.signals
+
+def handoff_reason(status: int, content_type: str, final_url: str, markdown: str, signals: Dict[str, Any]) -> Optional[str]:
+    """Why a fetched page needs a real browser, or None if the fast path's text is usable"""
+    if status in (401, 403) or LOGIN_PATH.search(urlsplit(final_url).path) or signals.get("password_input"):
+        return "login_required"
+    if status >= 400:
+        return f"http_{status}"
+    if content_type and not any(t in content_type for t in ("html", "text/plain", "markdown")):
+        return "unsupported_content"
+    if len(markdown) < MIN_PAGE_CHARS:
+        if signals.get("noscript_js") or signals.get("scripts", 0) >= 3:
+            return "javascript_required"
+        return "too_little_content"
+    return None
+
+# One pooled session per event loop, like the other HTTP clients
+_sessions: Dict[int, aiohttp.ClientSession] = {}
+
+def _get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(id(loop))
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=FAST_FETCH_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=32, limit_per_host=4, keepalive_timeout=30),
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,text/plain,text/markdown;q=0.9,*/*;q=0.5"},
+        )
+        _sessions[id(loop)] = session
+    return session
+
+async def close_fast_fetch_session() -> None:
+    """Close the running loop's fast-fetch connection pool (call on app shutdown)"""
+    session = _sessions.pop(id(asyncio.get_running_loop()), None)
+    if session and not session.closed:
+        await session.close()
+
+async def fetch_page(url: str, use_cache: bool = True) -> Dict[str, Any]:
+    """Fetch one page as markdown; the result's handoff is None when the text is usable"""
+    cache = get_page_cache() if use_cache else None
+    cached = cache.get(url) if cache else None
+    if cached:
+        return {"url": url, "title": cached.get("title"), "markdown": cached["content"], "handoff": None, "from_cache": True}
+    headers = {}
+    stale = cache.revalidate(url) if cache else None
+    if stale:
+        if stale.get("etag"):
+            headers["If-None-Match"] = stale["etag"]
+        if stale.get("last_modified"):
+            headers["If-Modified-Since"] = stale["last_modified"]
+    try:
+        async with _get_session().get(url, headers=headers, allow_redirects=True) as response:
+            if response.status == 304 and stale:
+                cache.refresh(url)
+                return {"url": url, "title": stale.get("title"), "markdown": stale["content"], "handoff": None, "from_cache": True}
+            content_type = response.headers.get("Content-Type", "").lower()
+            body = await response.content.read(MAX_RESPONSE_BYTES)
+            text = body.decode(response.charset or "utf-8", errors="replace")
+            final_url = str(response.url)
+            if "html" in content_type or text.lstrip()[:1] == "<":
+                title, markdown, signals = html_to_markdown(text, final_url)
+            else:
+                title, markdown, signals = "", text.strip(), {}
+            reason = handoff_reason(response.status, content_type, final_url, markdown, signals)
+            if reason is None and cache:
+                # Lookups use the requested URL, so redirected pages are stored under both
+                for cache_url in {url, final_url}:
+                    cache.put(cache_url, markdown, title=title, content_type="markdown", source="http",
+                              etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"))
+            return {"url": final_url, "title": title, "markdown": markdown, "handoff": reason, "from_cache": False}
+    except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError) as e:
+        logger.info(f"Fast fetch of {url} failed: {e!r}")
+        return {"url": url, "title": None, "markdown": "", "handoff": "fetch_failed", "from_cache": False}
+
+def _search_result_links(html: str, base_url: str) -> List[str]:
+    links = []
+    for href in re.findall(r'href="([^"]+)"', html):
+        href = urljoin(base_url, href.replace("&amp;", "&"))
+        # Search engines wrap results in redirect links carrying the target in a query parameter
+        query = parse_qs(urlsplit(href).query)
+        target = (query.get("uddg") or query.get("q") or query.get("u") or [href])[0]
+        if target.startswith("http") and normalize_url(target) and urlsplit(target).hostname != urlsplit(base_url).hostname:
+            links.append(target)
+    return links
+
+async def resolve_candidates(facet: Dict[str, Any]) -> List[str]:
+    """Candidate documentation URLs for one facet, most specific first"""
+    candidates = list(facet.get("candidate_urls") or [])
+    if FAST_FETCH_SEARCH_URL and facet.get("seed_queries") and len(candidates) < FAST_FETCH_MAX_PAGES:
+        search_url = FAST_FETCH_SEARCH_URL.format(query=quote_plus(facet["seed_queries"][0]))
+        try:
+            async with _get_session().get(search_url) as response:
+                candidates += _search_result_links(await response.text(), search_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.info(f"Fast fetch search failed: {e!r}")
+    return candidates
+
+async def assign_candidates(task: str, facets: List[Dict[str, Any]], limit: int = FAST_FETCH_MAX_PAGES) -> List[List[str]]:
+    """Candidate URLs per facet, each URL given to one facet only so facets don't answer from the same page.
+
+    URLs named in the task belong to the first facet (usually the official documentation).
+    """
+    resolved = await asyncio.gather(*(resolve_candidates(facet) for facet in facets))
+    if resolved:
+        resolved[0] = urls_in_text(task) + resolved[0]
+    assigned, seen = [], set()
+    for candidates in resolved:
+        urls = []
+        for url in candidates:
+            key = normalize_url(url)
+            if key and key not in seen and len(urls) < limit:
+                seen.add(key)
+                urls.append(url)
+        assigned.append(urls)
+    return assigned
+
+async def fetch_facet(urls: List[str], min_chars: int = FAST_FETCH_MIN_CHARS) -> Dict[str, Any]:
+    """Try to answer one research facet over plain HTTP from its assigned candidate URLs.
+
+    Returns {"status": "ok", "markdown", "pages", "source_urls"} or {"status": "handoff", "reason", "pages"}.
+    """
+    if not urls:
+        return {"status": "handoff", "reason": "no_candidate_urls", "pages": []}
+    pages = await asyncio.gather(*(fetch_page(url) for url in urls))
+    usable = [p for p in pages if p["handoff"] is None]
+    markdown = "\n\n---\n\n".join(f"# {p['title'] or p['url']}\nSource: {p['url']}\n\n{p['markdown']}" for p in usable)
+    summary = [{"url": p["url"], "handoff": p["handoff"], "chars": len(p["markdown"]), "from_cache": p["from_cache"]} for p in pages]
+    if len(markdown) < min_chars:
+        reasons = [p["handoff"] for p in pages if p["handoff"]]
+        # A login or JS wall is the more useful explanation than "too little"
+        reason = next((r for r in reasons if r in ("login_required", "javascript_required")), "too_little_content")
+        return {"status": "handoff", "reason": reason, "pages": summary}
+    return {"status": "ok", "markdown": markdown, "pages": summary, "source_urls": [p["url"] for p in usable]}
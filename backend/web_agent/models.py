@@ -1,15 +1,21 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 class WebAgentResponse(BaseModel):
     """Structured response format for web agent tasks"""
     response: str = Field(..., description="The response/result from the web agent task")
     timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp when the response was generated")
+    metrics: Optional[Dict[str, Any]] = Field(None, description="Step metrics for the run (see web_agent.step_events)")
+    truncated: bool = Field(False, description="True when the run stopped early and response is partial documentation")
+    truncation_reason: Optional[str] = Field(None, description="Why the run stopped early: deadline, token_budget, max_steps or error")
     
     def to_dict(self) -> dict:
         """Convert to dictionary for easy serialization"""
         return {
             "response": self.response,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp": self.timestamp.isoformat(),
+            "metrics": self.metrics,
+            "truncated": self.truncated,
+            "truncation_reason": self.truncation_reason
         }
\ No newline at end of file
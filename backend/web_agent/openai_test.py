@@ -3,7 +3,7 @@ from browser_use.llm import ChatOpenAI
 import os 
 from dotenv import load_dotenv
 from pydantic import SecretStr
-from browser_use import Agent, BrowserConfig, Browser, BrowserSession
+from browser_use import Agent, BrowserConfig, Browser
 import asyncio
 # COMMENTED OUT: Memory agent import to prevent Azure API key errors
 # from .master_agent import master_agent
@@ -11,6 +11,13 @@ import platform
 from typing import Optional
 from datetime import datetime
 from .models import WebAgentResponse
+from .url_registry import UrlRegistry
+from .browser_contexts import get_browser_context_manager
+from .step_events import StepEventRecorder
+from .adaptive_vision import AdaptiveVision
+from .page_cache import cached_pages_for, get_page_cache
+from .url_registry import normalize_url
+from .run_budget import RUN_SEARCH_DEADLINE, RUN_SEARCH_MAX_STEPS, RUN_SEARCH_TOKEN_BUDGET, RunBudget, partial_documentation
 # Import the streaming function - will be passed as parameter to avoid circular import
 
 # Load environment variables
@@ -40,8 +47,40 @@ llm = ChatOpenAI(
     timeout=None,
 )
 
+# Pages read by any browser are cached on disk; cached copies of the pages a task
+# names are put straight into the prompt so the agent doesn't spend steps on them
+PRESEED_PAGES = 3
+PRESEED_PAGE_CHARS = 8_000
+
+def cached_pages_prompt(task: str) -> str:
+    """Prompt section with cached copies of pages mentioned in the task, or ''"""
+    pages = cached_pages_for(task, PRESEED_PAGES)
+    if not pages:
+        return ""
+    print(f"[DEBUG] Page cache pre-seeded {len(pages)} page(s) for the task")
+    sections = [f"--- {page['url']} ({page.get('title') or 'untitled'}) ---\n{page['content'][:PRESEED_PAGE_CHARS]}" for page in pages]
+    return ("\n\nALREADY READ (cached copies of pages named in the task; use this text and do not navigate to these URLs):\n\n"
+            + "\n\n".join(sections))
+
+PAGE_TEXT_SCRIPT = "() => document.body ? document.body.innerText : ''"
+
+async def cache_current_page(page, validators: dict) -> None:
+    """Store the page's text in the page cache unless a fresh copy is already there"""
+    cache = get_page_cache()
+    url = page.url
+    if normalize_url(url) is None or cache.get(url) is not None:
+        return
+    try:
+        text = await page.evaluate(PAGE_TEXT_SCRIPT)
+        title = await page.title()
+    except Exception as e:
+        print(f"[DEBUG] Could not read page text for the cache: {e}")
+        return
+    etag, last_modified = validators.get(normalize_url(url), (None, None))
+    cache.put(url, text, title=title, etag=etag, last_modified=last_modified)
 
-async def run_search(user_task: str, cdp_url: str, user_name: Optional[str] = None, session_id: Optional[str] = None, publish_thought_func=None) -> dict:
+
+async def run_search(user_task: str, cdp_url: str, user_name: Optional[str] = None, session_id: Optional[str] = None, publish_thought_func=None, url_registry: Optional[UrlRegistry] = None, agent_id: Optional[str] = None, deadline_seconds: Optional[float] = None, token_budget: Optional[int] = None) -> dict:
     """
     Run the browser automation task with the given parameters.
     
@@ -50,10 +89,20 @@ async def run_search(user_task: str, cdp_url: str, user_name: Optional[str] = No
         cdp_url (str): The CDP URL for browser connection
         user_name (Optional[str]): The user name. Defaults to None.
         session_id (Optional[str]): The session id for streaming. Defaults to None.
+        url_registry (Optional[UrlRegistry]): Registry shared with the other browsers of the session,
+            used to skip pages another browser already covers. Defaults to None.
+        agent_id (Optional[str]): This browser's id in url_registry. Defaults to None.
+        deadline_seconds (Optional[float]): Wall-clock budget for the run. Defaults to RUN_SEARCH_DEADLINE.
+        token_budget (Optional[int]): Input-token budget for the run. Defaults to RUN_SEARCH_TOKEN_BUDGET.
         
     Returns:
-        dict: Structured response containing the task result and timestamp
+        dict: Structured response containing the task result and timestamp. When a budget runs out
+            (or the run fails after collecting something), response holds the partial documentation
+            and truncated is True.
     """
+    budget = RunBudget(deadline=deadline_seconds or RUN_SEARCH_DEADLINE, max_input_tokens=token_budget or RUN_SEARCH_TOKEN_BUDGET)
+    step_events = StepEventRecorder()
+    agent = None
     try:
    
         updated_task = user_task
@@ -77,72 +126,117 @@ Your goal is to:
 2. Visit 1-2 high-quality sources
 3. Gather comprehensive information needed to complete the task
 4. Focus on official documentation, tutorials, and best practices
-5. Do NOT complete the task yourself - only collect the documentation
+5. Do NOT complete the task yourself - only collect the documentation{cached_pages_prompt(user_task)}
 
 Please proceed with collecting the necessary documentation for this task."""
         
         print(f"Documentation Task: {documentation_prompt}")
         
-        # Configure and initialize browser
-        browser =BrowserSession(cdp_url=cdp_url)
-        
-        # Initialize and run agent
-        agent = Agent(
-            browser_session=browser,
-            task=documentation_prompt,
-            llm=llm,
-            use_vision=True,
-            save_conversation_path="logs/conversation"
-        )
+        # DOM-first: screenshots only for visual pages or when the agent asks, compressed and deduplicated
+        vision = AdaptiveVision()
 
         async def stream_steps(agent):
+            for event in step_events.collect(agent.state.history.history):
+                event["vision"] = vision.report(event["step"])
+                print(f"[DEBUG] Step {event['step']} at {event['url']}: {[a['name'] for a in event['actions']]}")
+                if session_id and publish_thought_func:
+                    await publish_thought_func(session_id, event)
+
+        async def track_navigation(agent):
+            # Back off pages another browser in this session already claimed
             page = await agent.browser_session.get_current_page()
-            current_url = page.url
+            url = page.url
+            if url_registry.claim(url, agent_id):
+                return
+            try:
+                await page.go_back()
+                url_registry.skipped(url, agent_id)
+                if hasattr(agent, "add_new_task"):
+                    agent.add_new_task(f"{url} is already covered by another browser. Do not revisit it; use a different source within your focus.")
+            except Exception as e:
+                print(f"[DEBUG] Could not leave duplicate page {url}: {e}")
+                url_registry.visited_anyway(url, agent_id)
+
+        # Reuse the open CDP connection for this browser and work in a fresh tab
+        async with get_browser_context_manager().tab(cdp_url) as browser:
+            # Initialize and run agent
+            agent = Agent(
+                browser_session=browser,
+                task=documentation_prompt,
+                llm=llm,
+                use_vision=vision.mode != "never",
+                save_conversation_path="logs/conversation"
+            )
+
+            # Remember ETag/Last-Modified of the documents this tab loads, for the page cache
+            validators = {}
+
+            def record_validators(response):
+                if response.request.resource_type == "document" and normalize_url(response.url):
+                    headers = response.headers
+                    validators[normalize_url(response.url)] = (headers.get("etag"), headers.get("last-modified"))
+
+            context = getattr(browser, "browser_context", None)
+            if context is not None:
+                context.on("response", record_validators)
+
+            async def on_step_end(agent):
+                await stream_steps(agent)
+                if url_registry:
+                    await track_navigation(agent)
+                await cache_current_page(await agent.browser_session.get_current_page(), validators)
+                # Stop before a step that would overrun the deadline or token budget
+                reason = budget.after_step(agent, step_events.metrics["input_tokens"])
+                if reason:
+                    print(f"[DEBUG] Stopping agent after step {agent.state.n_steps}: {reason} exhausted")
+
+            # Run the agent and get history
+            try:
+                with vision.attach(agent):
+                    # The deadline is also enforced mid-step, for pages that hang
+                    await asyncio.wait_for(
+                        agent.run(
+                            on_step_start=vision.before_step,
+                            on_step_end=on_step_end,
+                            max_steps=RUN_SEARCH_MAX_STEPS
+                        ),
+                        timeout=budget.remaining()
+                    )
+            except asyncio.TimeoutError:
+                budget.exhausted = "deadline"
+                print(f"[DEBUG] Run cancelled at the {budget.deadline:.0f}s deadline")
+            finally:
+                if context is not None:
+                    context.remove_listener("response", record_validators)
+            # Steps that ended without a hook call (e.g. the run stopped early)
+            await stream_steps(agent)
+            print(f"[DEBUG] Vision savings: {vision.summary()}")
+
+            # Get the final result from browser_use
             history = agent.state.history
-            model_thoughts = history.model_thoughts()
-            model_actions = history.model_actions()
-            print("[DEBUG] model_thoughts:", model_thoughts)
-            print("[DEBUG] model_actions:", model_actions)
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            step_num = len(model_actions)
-            msg_lines = [
-                f"🔄 [{timestamp}] Step {step_num}",
-                f"🌐 URL: {current_url}",
-            ]
-            if model_thoughts:
-                msg_lines.append(f"💭 Thought: {model_thoughts[-1]}")
-            if model_actions:
-                action = model_actions[-1]
-                # Use dict access for action fields
-                action_type = action.get('action', str(action)) if isinstance(action, dict) else getattr(action, 'action', str(action))
-                msg_lines.append(f"⚡ Action: {action_type}")
-                params = action.get('params') if isinstance(action, dict) else getattr(action, 'params', None)
-                if params:
-                    msg_lines.append(f"📝 Params: {params}")
-            msg_lines.append("-" * 60)
-            msg = "\n".join(msg_lines)
-            print("[DEBUG] Streaming message:", msg)
-            if session_id and publish_thought_func:
-                await publish_thought_func(session_id, msg)
-
-        # Run the agent and get history
-        history = await agent.run(
-            on_step_start=stream_steps,
-            max_steps=2
-        )
-        
-        # Get the final result from browser_use
-        final_result = history.final_result()
-        
-        # Return structured response as dict for API
-        return WebAgentResponse(response=final_result).dict()
+            final_result = history.final_result() if history.is_done() else None
+
+        metrics = {**step_events.summary(), "vision": vision.summary(), "budget": budget.summary(step_events.metrics["input_tokens"])}
+        if final_result:
+            # Return structured response as dict for API
+            return WebAgentResponse(response=final_result, metrics=metrics).dict()
+        reason = budget.exhausted or "max_steps"
+        partial = partial_documentation(history.history, reason)
+        if partial is None:
+            return WebAgentResponse(response=f"Task failed: research run stopped early ({reason}) without collecting documentation",
+                                    metrics=metrics, truncated=True, truncation_reason=reason).dict()
+        return WebAgentResponse(response=partial, metrics=metrics, truncated=True, truncation_reason=reason).dict()
         
     except Exception as e:
         error_msg = f"Error in run_search: {str(e)}"
         print(error_msg)
         if session_id and publish_thought_func:
             await publish_thought_func(session_id, f"Error: {str(e)}")
-        
+
+        # Keep whatever the agent collected before the failure
+        partial = partial_documentation(agent.state.history.history, "error") if agent is not None else None
+        if partial:
+            return WebAgentResponse(response=partial, metrics=step_events.summary(), truncated=True, truncation_reason="error").dict()
         # Return error response in structured format
         return WebAgentResponse(response=f"Task failed: {error_msg}").dict()
 
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .url_registry import normalize_url
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_DIR = Path(os.getenv("PAGE_CACHE_DIR", str(Path(__file__).parent.parent / "page_cache")))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", str(24 * 3600)))
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", "200"))
+# Longest page text kept per entry; documentation beyond this is rarely read by the agent
+MAX_PAGE_CHARS = 200_000
+URL_IN_TEXT = re.compile(r"https?://[^\s<>\"')\]]+")
+
+def urls_in_text(text: str) -> List[str]:
+    """http(s) URLs mentioned in free text, in order, without trailing punctuation"""
+    urls = []
+    for url in URL_IN_TEXT.findall(text or ""):
+        url = url.rstrip(".,;:!?")
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+class PageCache:
+    """Disk-backed cache of extracted page text keyed by normalized URL.
+
+    Each entry is one JSON file holding the page text (markdown or plain
+    text), its title and the ETag/Last-Modified validators it was served
+    with. Entries older than ttl are not returned by get() but stay
+    available to revalidate() so an HTTP fetcher can send a conditional
+    request. Total size is bounded by evicting least recently used entries.
+    """
+
+    def __init__(self, directory: Path = PAGE_CACHE_DIR, ttl: float = PAGE_CACHE_TTL,
+                 max_bytes: int = int(PAGE_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # key -> {size, last_access}, least recently used first
+        self._index: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._total_bytes = 0
+        # Browsers run in the event loop but HTTP fetches may use threads
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "stores": 0, "revalidated": 0, "evicted": 0}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.directory.exists():
+            return
+        entries = []
+        for path in self.directory.glob("*.json"):
+            stat = path.stat()
+            entries.append((stat.st_atime, path.stem, stat.st_size))
+        for last_access, name, size in sorted(entries):
+            self._index[name] = {"size": size, "last_access": last_access}
+            self._total_bytes += size
+        logger.info(f"Page cache: {len(self._index)} entries ({self._total_bytes / 1e6:.1f} MB) in {self.directory}")
+
+    @staticmethod
+    def key(url: str) -> Optional[str]:
+        normalized = normalize_url(url)
+        return hashlib.sha256(normalized.encode()).hexdigest() if normalized else None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._path(key).read_text())
+        except (OSError, ValueError):
+            self._drop(key)
+            return None
+
+    def _drop(self, key: str) -> None:
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry["size"]
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Fresh cached page for url, or None"""
+        key = self.key(url)
+        with self._lock:
+            if key is None or key not in self._index:
+                self.counters["misses"] += 1
+                return None
+            page = self._read(key)
+            if page is None or time.time() - page["fetched_at"] > self.ttl:
+                self.counters["stale" if page else "misses"] += 1
+                return None
+            self._index[key]["last_access"] = time.time()
+            self._index.move_to_end(key)
+            self.counters["hits"] += 1
+            return page
+
+    def revalidate(self, url: str) -> Optional[Dict[str, Any]]:
+        """Cached page for url regardless of age (for conditional requests), if it has validators"""
+        key = self.key(url)
+        with self._lock:
+            if key is None or key not in self._index:
+                return None
+            page = self._read(key)
+        if page and (page.get("etag") or page.get("last_modified")):
+            return page
+        return None
+
+    def refresh(self, url: str) -> None:
+        """Mark a stale entry fresh again after the server answered 304 Not Modified"""
+        key = self.key(url)
+        with self._lock:
+            page = self._read(key) if key in self._index else None
+            if page is None:
+                return
+            page["fetched_at"] = time.time()
+            self._write(key, page)
+            self.counters["revalidated"] += 1
+
+    def put(self, url: str, content: str, title: Optional[str] = None, content_type: str = "text",
+            etag: Optional[str] = None, last_modified: Optional[str] = None, source: str = "browser") -> bool:
+        """Store extracted page content; returns False for URLs that aren't cacheable"""
+        key = self.key(url)
+        if key is None or not content or not content.strip():
+            return False
+        page = {
+            "url": url,
+            "normalized_url": normalize_url(url),
+            "title": title,
+            "content": content[:MAX_PAGE_CHARS],
+            "content_type": content_type,
+            "etag": etag,
+            "last_modified": last_modified,
+            "source": source,
+            "fetched_at": time.time(),
+        }
+        with self._lock:
+            self._write(key, page)
+            self.counters["stores"] += 1
+            self._evict()
+        return True
+
+    def _write(self, key: str, page: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(page)
+        # Write-then-rename so readers never see a half-written entry
+        tmp = self._path(key).with_suffix(".tmp")
+        tmp.write_text(data)
+        tmp.replace(self._path(key))
+        previous = self._index.pop(key, None)
+        if previous:
+            self._total_bytes -= previous["size"]
+        self._index[key] = {"size": len(data), "last_access": time.time()}
+        self._total_bytes += len(data)
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._drop(key)
+            self.counters["evicted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._index), "bytes": self._total_bytes, "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl, **self.counters}
+
+_page_cache: Optional[PageCache] = None
+
+def get_page_cache() -> PageCache:
+    """Return the shared page cache, loading its index from disk on first use"""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache()
+    return _page_cache
+
+def cached_pages_for(text: str, limit: int = 3) -> List[Dict[str, Any]]:
+    """Fresh cached pages for the URLs mentioned in text (e.g. a research task)"""
+    cache = get_page_cache()
+    pages = []
+    for url in urls_in_text(text):
+        page = cache.get(url)
+        if page:
+            pages.append(page)
+            if len(pages) >= limit:
+                break
+    return pages
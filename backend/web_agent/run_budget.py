@@ -0,0 +1,98 @@
+"""
+Wall-clock and token budgets for a browser-agent run.
+
+RunBudget is checked after every agent step. It stops the agent early
+(agent.stop(), so the current step completes cleanly) when the next step
+would probably overrun the deadline, or when the input tokens spent so far
+plus another step's worth would exceed the token budget. The deadline is
+also enforced hard: run_search cancels the run once it has passed, for
+sites that hang in the middle of a step.
+
+Either way the run returns partial_documentation() — what the agent has
+extracted so far plus the cached text of the pages it read — with a
+truncation flag instead of an error string.
+"""
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .page_cache import get_page_cache
+
+RUN_SEARCH_MAX_STEPS = int(os.getenv("RUN_SEARCH_MAX_STEPS", "2"))
+RUN_SEARCH_DEADLINE = float(os.getenv("RUN_SEARCH_DEADLINE", "240"))
+RUN_SEARCH_TOKEN_BUDGET = int(os.getenv("RUN_SEARCH_TOKEN_BUDGET", "60000"))
+# Longest partial documentation returned; matches what a finished run typically returns
+PARTIAL_DOC_CHARS = 20_000
+# Characters of each visited page's cached text included in a partial result
+PARTIAL_PAGE_CHARS = 6_000
+
+class RunBudget:
+    """Deadline and input-token budget for one run_search call"""
+
+    def __init__(self, deadline: float = RUN_SEARCH_DEADLINE, max_input_tokens: int = RUN_SEARCH_TOKEN_BUDGET):
+        self.deadline = deadline
+        self.max_input_tokens = max_input_tokens
+        self.started = time.monotonic()
+        self.exhausted: Optional[str] = None
+        self._last_tokens = 0
+        self._last_step_end = self.started
+        self._slowest_step = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return max(self.deadline - self.elapsed(), 0.0)
+
+    def after_step(self, agent, input_tokens: int) -> Optional[str]:
+        """on_step_end check; stops the agent and returns the reason when another step won't fit"""
+        now = time.monotonic()
+        # Steps vary a lot in length; plan for the slowest one seen so far
+        self._slowest_step = max(self._slowest_step, now - self._last_step_end)
+        self._last_step_end = now
+        step_tokens = input_tokens - self._last_tokens
+        self._last_tokens = input_tokens
+        if now - self.started + self._slowest_step > self.deadline:
+            self.exhausted = "deadline"
+        elif input_tokens + step_tokens > self.max_input_tokens:
+            self.exhausted = "token_budget"
+        if self.exhausted:
+            agent.stop()
+        return self.exhausted
+
+    def summary(self, input_tokens: int) -> Dict[str, Any]:
+        return {
+            "deadline_seconds": self.deadline,
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "token_budget": self.max_input_tokens,
+            "input_tokens": input_tokens,
+            "exhausted": self.exhausted,
+        }
+
+def partial_documentation(history_items: List[Any], reason: str, max_chars: int = PARTIAL_DOC_CHARS) -> Optional[str]:
+    """Best documentation recoverable from an unfinished run, or None if it collected nothing"""
+    extracted, urls = [], []
+    for item in history_items:
+        for result in getattr(item, "result", None) or []:
+            content = getattr(result, "extracted_content", None)
+            if content and not getattr(result, "error", None) and content not in extracted:
+                extracted.append(content)
+        url = getattr(getattr(item, "state", None), "url", None)
+        if url and not url.startswith("about:") and url not in urls:
+            urls.append(url)
+
+    sections, pages = [], 0
+    if extracted:
+        sections.append("## Extracted so far\n\n" + "\n\n".join(extracted))
+    cache = get_page_cache()
+    for url in urls:
+        page = cache.get(url)
+        if page:
+            pages += 1
+            sections.append(f"## {page.get('title') or url}\nSource: {url}\n\n{page['content'][:PARTIAL_PAGE_CHARS]}")
+        else:
+            sections.append(f"## Visited\nSource: {url}")
+    if not extracted and not pages:
+        return None
+    header = f"Partial documentation: the research run stopped early ({reason}) after {len(history_items)} step(s).\n\n"
+    return (header + "\n\n".join(sections))[:max_chars]
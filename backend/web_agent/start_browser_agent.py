@@ -35,7 +35,7 @@ async def start_browser_agent(user_task: str, user_name: Optional[str] = None, e
     try:
         # Start the anchor browser session
         print("Starting Anchor Browser session...")
-        session_info = start_anchor_session()
+        session_info = await start_anchor_session()
         
         # Extract the CDP URL and live view URL
         cdp_url = session_info['data']['cdp_url']
@@ -48,7 +48,7 @@ async def start_browser_agent(user_task: str, user_name: Optional[str] = None, e
         
         # Call the run_search function with the CDP URL
         print(f"Executing task: {user_task}")
-        time.sleep(5)  # Optional delay for better readability
+        await asyncio.sleep(5)  # Optional delay for better readability
         await run_search(user_task=user_task, user_name=user_name, cdp_url=cdp_url)
         
         print("\nTask execution complete!")
@@ -57,7 +57,7 @@ async def start_browser_agent(user_task: str, user_name: Optional[str] = None, e
         # End all sessions if requested
         if end_all_sessions:
             print("\nEnding all Anchor Browser sessions...")
-            result = end_all_anchor_sessions()
+            result = await end_all_anchor_sessions()
             print(f"End all sessions result: {result}")
         
         return live_view_url
@@ -68,7 +68,7 @@ async def start_browser_agent(user_task: str, user_name: Optional[str] = None, e
         if end_all_sessions:
             try:
                 print("\nEnding all Anchor Browser sessions due to error...")
-                end_all_anchor_sessions()
+                await end_all_anchor_sessions()
             except Exception as end_error:
                 print(f"Error ending sessions: {str(end_error)}")
         raise
@@ -0,0 +1,93 @@
+"""
+Typed step events for the browser agent.
+
+StepEventRecorder keeps a cursor into the agent's history list and turns
+only the steps added since the last call into JSON-ready events:
+
+    {"step": 3, "url": "...", "title": "...",
+     "thought": {"evaluation": "...", "memory": "...", "next_goal": "..."},
+     "actions": [{"name": "go_to_url", "params": {"url": "..."}}],
+     "errors": [], "timings": {"started_at": 1718000000.0, "duration_seconds": 2.4},
+     "input_tokens": 5120}
+
+The same events are published to the session WebSocket (as "step" frames)
+and folded into per-run metrics.
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+def _thought(model_output) -> Optional[Dict[str, Any]]:
+    if model_output is None:
+        return None
+    # Older browser-use versions nest the reasoning under current_state
+    brain = getattr(model_output, "current_state", None) or model_output
+    thought = {
+        "thinking": getattr(brain, "thinking", None),
+        "evaluation": getattr(brain, "evaluation_previous_goal", None),
+        "memory": getattr(brain, "memory", None),
+        "next_goal": getattr(brain, "next_goal", None),
+    }
+    return {k: v for k, v in thought.items() if v} or None
+
+def _actions(model_output) -> List[Dict[str, Any]]:
+    actions = []
+    for action in getattr(model_output, "action", None) or []:
+        dumped = action.model_dump(exclude_unset=True) if hasattr(action, "model_dump") else dict(action)
+        for name, params in dumped.items():
+            if params is not None:
+                actions.append({"name": name, "params": params})
+    return actions
+
+class StepEventRecorder:
+    """Builds one event per new agent step and accumulates run metrics"""
+
+    def __init__(self):
+        self._cursor = 0
+        self._action_counts: Counter = Counter()
+        self.metrics = {"steps": 0, "actions": 0, "errors": 0, "step_seconds": 0.0, "input_tokens": 0}
+
+    def collect(self, history_items: List[Any]) -> List[Dict[str, Any]]:
+        """Events for the history items added since the last call (usually exactly one)"""
+        events = []
+        while self._cursor < len(history_items):
+            events.append(self._event(history_items[self._cursor], self._cursor + 1))
+            self._cursor += 1
+        return events
+
+    def _event(self, item: Any, position: int) -> Dict[str, Any]:
+        model_output = getattr(item, "model_output", None)
+        state = getattr(item, "state", None)
+        metadata = getattr(item, "metadata", None)
+        errors = [r.error for r in getattr(item, "result", None) or [] if getattr(r, "error", None)]
+        actions = _actions(model_output)
+        started = getattr(metadata, "step_start_time", None)
+        ended = getattr(metadata, "step_end_time", None)
+        duration = round(ended - started, 3) if started and ended else None
+        input_tokens = getattr(metadata, "input_tokens", None) or 0
+
+        self.metrics["steps"] += 1
+        self.metrics["actions"] += len(actions)
+        self.metrics["errors"] += len(errors)
+        self.metrics["step_seconds"] += duration or 0.0
+        self.metrics["input_tokens"] += input_tokens
+        self._action_counts.update(action["name"] for action in actions)
+
+        return {
+            "step": getattr(metadata, "step_number", None) or position,
+            "url": getattr(state, "url", None),
+            "title": getattr(state, "title", None),
+            "thought": _thought(model_output),
+            "actions": actions,
+            "errors": errors,
+            "timings": {"started_at": started, "duration_seconds": duration},
+            "input_tokens": input_tokens,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        steps = self.metrics["steps"]
+        return {
+            **self.metrics,
+            "step_seconds": round(self.metrics["step_seconds"], 3),
+            "average_step_seconds": round(self.metrics["step_seconds"] / steps, 3) if steps else 0.0,
+            "action_counts": dict(self._action_counts),
+        }
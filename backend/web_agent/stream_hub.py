@@ -0,0 +1,83 @@
+"""
+Multiplexes the step events of every browser in a web-agent session over
+one /ws/web-agent/{session_id} connection.
+
+Each browser publishes under its own sub-stream ID (e.g. "browser_0"); every
+event is sent as a JSON text frame:
+
+    {"session_id": "...", "stream": "browser_0", "seq": 12, "type": "step", "data": "..."}
+
+type is "status" for connection/lifecycle notices, "step" for agent steps
+(data is then a step event object, see web_agent.step_events),
+"error" for failures and "done" when a stream finishes. Events published
+before a socket connects are kept in a bounded backlog and replayed on
+subscribe, since orchestrated browsers start before the UI connects.
+"""
+import json
+import logging
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional, Set, Union
+
+from starlette.websockets import WebSocket, WebSocketState
+
+logger = logging.getLogger(__name__)
+
+BACKLOG_SIZE = 500
+SESSION_STREAM = "session"  # stream ID for session-wide notices
+
+_subscribers: Dict[str, Set[WebSocket]] = defaultdict(set)
+_backlogs: Dict[str, Deque[str]] = {}
+_sequence: Dict[str, int] = defaultdict(int)
+
+def frame(session_id: str, stream: str, data: Union[str, Dict[str, Any]], event_type: str = "step") -> str:
+    _sequence[session_id] += 1
+    return json.dumps({"session_id": session_id, "stream": stream, "seq": _sequence[session_id],
+                       "type": event_type, "data": data}, default=str)
+
+async def _send(websocket: WebSocket, text: str) -> bool:
+    try:
+        if websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.send_text(text)
+            return True
+    except Exception as e:
+        logger.debug(f"Dropping web-agent subscriber: {e}")
+    return False
+
+async def publish(session_id: str, stream: str, data: Union[str, Dict[str, Any]], event_type: str = "step") -> None:
+    """Send an event to every subscriber of the session and keep it for late subscribers"""
+    text = frame(session_id, stream, data, event_type)
+    _backlogs.setdefault(session_id, deque(maxlen=BACKLOG_SIZE)).append(text)
+    for websocket in list(_subscribers.get(session_id, ())):
+        if not await _send(websocket, text):
+            _subscribers[session_id].discard(websocket)
+
+def stream_publisher(stream: str):
+    """publish_thought_func for run_search that tags messages with a sub-stream ID"""
+    async def publish_thought(session_id: str, message: Union[str, Dict[str, Any]]) -> None:
+        event_type = "error" if isinstance(message, str) and message.startswith("Error:") else "step"
+        await publish(session_id, stream, message, event_type)
+    return publish_thought
+
+async def subscribe(session_id: str, websocket: WebSocket) -> None:
+    """Register a socket for the session and replay the backlog to it"""
+    for text in list(_backlogs.get(session_id, ())):
+        if not await _send(websocket, text):
+            return
+    _subscribers[session_id].add(websocket)
+
+def unsubscribe(session_id: str, websocket: WebSocket) -> None:
+    subscribers = _subscribers.get(session_id)
+    if subscribers is not None:
+        subscribers.discard(websocket)
+        if not subscribers:
+            del _subscribers[session_id]
+
+def subscriber_count(session_id: Optional[str] = None) -> int:
+    if session_id is not None:
+        return len(_subscribers.get(session_id, ()))
+    return sum(len(s) for s in _subscribers.values())
+
+def drop_session(session_id: str) -> None:
+    """Forget a finished session's backlog (connected sockets stay subscribed until they close)"""
+    _backlogs.pop(session_id, None)
+    _sequence.pop(session_id, None)
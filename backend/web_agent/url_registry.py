@@ -0,0 +1,93 @@
+import logging
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Search result pages are starting points every browser needs, never a claim
+SEARCH_ENGINES = {"google", "bing", "duckduckgo"}
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid"}
+
+def normalize_url(url: str) -> Optional[str]:
+    """Canonical form used for dedupe, or None for pages that can't be claimed"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.split(".")[0] in SEARCH_ENGINES or host == "search.yahoo.com":
+        return None
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not (k.lower().startswith("utm_") or k.lower() in TRACKING_PARAMS)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, query, ""))
+
+class UrlRegistry:
+    """Session-scoped record of which browser covers which URL.
+
+    The first browser to land on a page claims it; when another browser in
+    the same session reaches a claimed page it is told to skip it instead of
+    reading it again.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self._owners: Dict[str, str] = {}
+        self._visited: Dict[str, Set[str]] = {}
+        self.counters = {"claimed": 0, "duplicates_skipped": 0, "duplicate_visits": 0}
+
+    def claim(self, url: str, agent_id: str) -> bool:
+        """Claim url for agent_id; False if another browser already owns it"""
+        key = normalize_url(url)
+        if key is None:
+            return True
+        owner = self._owners.setdefault(key, agent_id)
+        if owner == agent_id:
+            if key not in self._visited:
+                self.counters["claimed"] += 1
+            self._visited.setdefault(key, set()).add(agent_id)
+            return True
+        return False
+
+    def skipped(self, url: str, agent_id: str) -> None:
+        """Record that agent_id backed off a page another browser owns"""
+        self.counters["duplicates_skipped"] += 1
+        logger.info(f"[{self.session_id}] {agent_id} skipped {url} (covered by {self.owner(url)})")
+
+    def visited_anyway(self, url: str, agent_id: str) -> None:
+        """Record a duplicate read that could not be avoided"""
+        key = normalize_url(url)
+        if key:
+            self._visited.setdefault(key, set()).add(agent_id)
+        self.counters["duplicate_visits"] += 1
+
+    def owner(self, url: str) -> Optional[str]:
+        key = normalize_url(url)
+        return self._owners.get(key) if key else None
+
+    def urls_for(self, agent_id: str) -> List[str]:
+        """Pages claimed by agent_id (its documentation sources)"""
+        return [url for url, owner in self._owners.items() if owner == agent_id]
+
+    def stats(self) -> Dict:
+        return {
+            "urls": len(self._owners),
+            "by_browser": {agent: sum(1 for o in self._owners.values() if o == agent)
+                           for agent in set(self._owners.values())},
+            **self.counters,
+        }
+
+# session_id -> registry shared by every browser in that session
+_registries: Dict[str, UrlRegistry] = {}
+
+def get_url_registry(session_id: str) -> UrlRegistry:
+    registry = _registries.get(session_id)
+    if registry is None:
+        registry = _registries[session_id] = UrlRegistry(session_id)
+    return registry
+
+def drop_url_registry(session_id: str) -> Optional[UrlRegistry]:
+    return _registries.pop(session_id, None)
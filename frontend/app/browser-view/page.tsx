@@ -36,6 +36,45 @@ interface SessionBrowser {
   error?: string;
 }
 
+interface StepEvent {
+  step: number;
+  url?: string;
+  title?: string;
+  thought?: { thinking?: string; evaluation?: string; memory?: string; next_goal?: string };
+  actions: { name: string; params: Record<string, unknown> }[];
+  errors: string[];
+  timings: { started_at?: number; duration_seconds?: number };
+  input_tokens?: number;
+  vision?: { screenshot: 'sent' | 'unchanged' | 'dom_only' | 'requested'; reason?: string; tokens_saved?: number; bytes_saved?: number };
+}
+
+interface WebAgentFrame {
+  session_id: string;
+  stream: string;
+  seq: number;
+  type: 'status' | 'step' | 'error' | 'done';
+  data: string | StepEvent;
+}
+
+function formatStepEvent(event: StepEvent): string {
+  const duration = event.timings?.duration_seconds != null ? ` (${event.timings.duration_seconds.toFixed(1)}s)` : '';
+  const lines = [`🔄 Step ${event.step}${duration}`];
+  if (event.url) lines.push(`🌐 URL: ${event.url}`);
+  const thought = event.thought?.next_goal || event.thought?.thinking || event.thought?.evaluation;
+  if (thought) lines.push(`💭 Thought: ${thought}`);
+  for (const action of event.actions) {
+    lines.push(`⚡ Action: ${action.name} ${JSON.stringify(action.params)}`);
+  }
+  if (event.vision) {
+    const saved = event.vision.tokens_saved ? `, ~${event.vision.tokens_saved} tokens saved` : '';
+    lines.push(`🖼️ Screenshot: ${event.vision.screenshot}${event.vision.reason ? ` (${event.vision.reason})` : ''}${saved}`);
+  }
+  for (const error of event.errors) {
+    lines.push(`❌ Error: ${error}`);
+  }
+  return lines.join('\n');
+}
+
 interface SessionData {
   browsers?: Record<string, SessionBrowser>;
   task?: string;
@@ -141,7 +180,7 @@ function BrowserViewContent() {
     return () => clearInterval(interval);
   }, [sessionId, taskCompleted]);
 
-  // Listen to web agent logs via WebSocket for the first browser session (robust debug version)
+  // Listen to web agent logs of all browser sessions via one multiplexed WebSocket
   useEffect(() => {
     // Get all session IDs from browsers
     const sessionIds = Object.values(browsers).map(b => b.session_id);
@@ -164,9 +203,19 @@ function BrowserViewContent() {
       console.log('WebSocket connected');
       setWaiting(true);
     };
+    // Every browser in the session streams over this socket; frames are tagged with a sub-stream ID
+    const multipleBrowsers = Object.keys(browsers).length > 1;
     socket.onmessage = (event) => {
       console.log('WebSocket message:', event.data);
-      setThoughtLines(prev => [...prev, event.data]);
+      let line = event.data as string;
+      try {
+        const frame: WebAgentFrame = JSON.parse(event.data);
+        const text = typeof frame.data === 'string' ? frame.data : formatStepEvent(frame.data);
+        line = multipleBrowsers && frame.stream !== 'session' ? `[${frame.stream}] ${text}` : text;
+      } catch {
+        // Plain-text message from an older backend
+      }
+      setThoughtLines(prev => [...prev, line]);
       setWaiting(false);
     };
     socket.onerror = (err) => {
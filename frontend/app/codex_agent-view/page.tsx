@@ -29,6 +29,7 @@ function CodexAgentViewContent() {
   const [executeStatus, setExecuteStatus] = useState<'idle' | 'loading' | 'completed' | 'error'>('idle');
   const [commandHistory, setCommandHistory] = useState<Array<{command: string, response: string, timestamp: string}>>([]);
   const [currentCommand, setCurrentCommand] = useState<string>('');
+  const [commandProgress, setCommandProgress] = useState<{elapsed?: number, outputBytes?: number, tail: string[]} | null>(null);
   const [pendingCommands, setPendingCommands] = useState<Array<{command: string, timestamp: string}>>([]);
   const [wsConnected, setWsConnected] = useState<boolean>(false);
   const [wsConnecting, setWsConnecting] = useState<boolean>(false);
@@ -85,7 +86,16 @@ function CodexAgentViewContent() {
           }]);
           
           setCurrentCommand(command);
+          setCommandProgress(null);
           console.log('Received command:', command);
+        } else if (data.type === 'progress') {
+          // Heartbeats carry elapsed/output_bytes/tail; streamed output carries new text
+          const newLines: string[] = data.data.tail || (data.data.output || '').split('\n').filter((line: string) => line.trim());
+          setCommandProgress(prev => ({
+            elapsed: data.data.elapsed ?? prev?.elapsed,
+            outputBytes: data.data.output_bytes ?? prev?.outputBytes,
+            tail: data.data.tail ? newLines : [...(prev?.tail || []), ...newLines].slice(-5)
+          }));
         } else if (data.type === 'response') {
           const response = data.data.stdout || data.data.output || data.data.stderr || 'No output';
           const timestamp = new Date().toLocaleTimeString();
@@ -104,6 +114,7 @@ function CodexAgentViewContent() {
           setPendingCommands(prev => prev.slice(1));
           
           setCurrentCommand('');
+          setCommandProgress(null);
           console.log('Received response:', response);
           
           // Check if task is completed
@@ -435,6 +446,16 @@ function CodexAgentViewContent() {
               <code className="text-sm bg-blue-100 dark:bg-blue-900/40 px-2 py-1 rounded">
                 {currentCommand}
               </code>
+              {commandProgress && (
+                <div className="mt-2 text-xs text-blue-700 dark:text-blue-300">
+                  {commandProgress.elapsed !== undefined && (
+                    <div>Running for {Math.round(commandProgress.elapsed)}s{commandProgress.outputBytes !== undefined && `, ${commandProgress.outputBytes} bytes of output`}</div>
+                  )}
+                  {commandProgress.tail.length > 0 && (
+                    <pre className="mt-1 whitespace-pre-wrap opacity-80">{commandProgress.tail.join('\n')}</pre>
+                  )}
+                </div>
+              )}
             </div>
           )}
           